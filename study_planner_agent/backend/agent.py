@@ -1,7 +1,9 @@
 import os
 import json
+import time
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from startup import LazyComponent
 
 # Simple agent wrapper that works with current Google ADK
 class SimpleAgent:
@@ -52,10 +54,10 @@ from enhanced_tools import (
     store_data,
     validate_study_inputs,
     analyze_productivity,
+    analyze_productivity_batch,
     check_upcoming_deadlines,
     suggest_focus_strategy,
     prepare_tutor_context,
-    create_calendar_events_from_study_plan,
     format_study_plan_as_table
 )
 
@@ -63,15 +65,31 @@ from rag.rag_tools import retrieve_from_rag, add_to_rag
 from prompts import *
 
 # --------------------------------------------------
-load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-MODEL = genai.GenerativeModel("gemini-2.5-flash")
+def _configure_gemini():
+    import google.generativeai as genai
+    
+    load_dotenv()
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai.GenerativeModel("gemini-2.5-flash")
+
+gemini = LazyComponent("gemini", _configure_gemini, budget_ms=2000)
+
+class LazyModel:
+    """Stands in for the Gemini model; configures it on the first generate_content call"""
+    def __init__(self, component: LazyComponent):
+        self._component = component
+    
+    def generate_content(self, *args, **kwargs):
+        return self._component.get().generate_content(*args, **kwargs)
+
+MODEL = LazyModel(gemini)
 
 # --------------------------------------------------
+# Plans are laid out locally by plan_solver; the LLM only rewrites task descriptions
 study_planner_agent = SimpleAgent(
     name="StudyPlannerAgent",
     model=MODEL,
-    system_prompt=STUDY_PLANNER_PROMPT,
+    system_prompt=PLAN_ENRICHMENT_PROMPT,
     tools=[store_data]
 )
 
@@ -110,6 +128,14 @@ progress_analyzer_agent = SimpleAgent(
     tools=[analyze_productivity, check_upcoming_deadlines]
 )
 
+# Class-wide analysis: one prompt covers a micro-batch of outlier students
+batch_progress_analyzer_agent = SimpleAgent(
+    name="BatchProgressAnalyzerAgent",
+    model=MODEL,
+    system_prompt=BATCH_PROGRESS_ANALYZER_PROMPT,
+    tools=[analyze_productivity_batch]
+)
+
 # --------------------------------------------------
 # Import autonomous agents
 from autonomous_agents import (
@@ -117,10 +143,32 @@ from autonomous_agents import (
     AutonomousTaskScheduler, 
     AutonomousBehaviorCoach
 )
-from blackboard import blackboard
+from blackboard import blackboard, StudyGoal
+from leader_election import LeaderElector, default_lock_path
+from scheduler import scheduler
+from plan_solver import solve_study_plan, plan_tasks
+from calendar_sync import sync_calendar
+
+# "auto": run autonomous loops only in the elected leader process (a request worker)
+# "external": serve requests only; the loops run in `python agent_runner.py`
+# "always": run them in every process; "off": serve requests only
+AUTONOMOUS_AGENTS_MODE = os.getenv("AUTONOMOUS_AGENTS", "auto").lower()
+
+# Partition used when a caller has no authenticated user
+DEFAULT_USER_ID = "anonymous"
+DIFFICULTY_PRIORITY = {"Hard": 1, "Medium": 2, "Easy": 3}
+
+# Whether /study-plan asks the LLM to enrich task descriptions (the request's "enrich" overrides)
+STUDY_PLAN_ENRICHMENT = os.getenv("STUDY_PLAN_ENRICHMENT", "off").lower() in ("on", "true", "1")
+
+# Batch progress analysis: students per LLM prompt, LLM calls per request, and the outlier rule
+BATCH_ANALYSIS_MICRO_BATCH = int(os.getenv("BATCH_ANALYSIS_MICRO_BATCH", "10"))
+BATCH_ANALYSIS_MAX_LLM_CALLS = int(os.getenv("BATCH_ANALYSIS_MAX_LLM_CALLS", "5"))
+BATCH_ANALYSIS_OUTLIER_Z = 2.0
+LOW_PROGRESS = 0.3
 
 class AgenticOrchestrator:
-    def __init__(self):
+    def __init__(self, mode: str = AUTONOMOUS_AGENTS_MODE):
         # Initialize autonomous agents
         self.progress_analyzer = AutonomousProgressAnalyzer(
             "ProgressAnalyzerAgent", MODEL, PROGRESS_ANALYZER_PROMPT, 
@@ -135,56 +183,122 @@ class AgenticOrchestrator:
             [suggest_focus_strategy]
         )
         
-        # Start autonomous loops
-        self.progress_analyzer.start_autonomous_loop()
-        self.task_scheduler.start_autonomous_loop()
-        self.behavior_coach.start_autonomous_loop()
+        self.mode = mode
+        self.leader = None
+        if mode == "always":
+            self._start_autonomous_loops()
+        elif mode == "auto":
+            self.leader = LeaderElector(
+                on_elected=self._start_autonomous_loops,
+                on_demoted=self._stop_autonomous_loops,
+                lock_path=os.getenv("AGENT_LEADER_LOCK") or default_lock_path(),
+                retry_interval=float(os.getenv("AGENT_LEADER_RETRY_SECONDS", "5"))
+            )
+            self.leader.start()
     
-    def plan_study(self, payload):
+    def _autonomous_agents(self):
+        return [self.progress_analyzer, self.task_scheduler, self.behavior_coach]
+    
+    def _start_autonomous_loops(self):
+        for autonomous_agent in self._autonomous_agents():
+            autonomous_agent.start_autonomous_loop()
+    
+    def _stop_autonomous_loops(self):
+        for autonomous_agent in self._autonomous_agents():
+            autonomous_agent.stop_autonomous_loop()
+    
+    def runs_autonomous_loops(self) -> bool:
+        """Whether this process is the one driving the autonomous agents"""
+        if self.leader is not None:
+            return self.leader.is_leader
+        return self.mode == "always"
+    
+    def _enrich_plan(self, plan_data) -> bool:
+        """Ask the LLM for richer task descriptions; the local plan is kept as-is on any failure"""
+        names = {}
+        for task in plan_data["daily_study_plan"]:
+            names.setdefault(task["task_name"], task["difficulty_level"])
+        response = study_planner_agent.run(json.dumps({
+            "tasks": [{"task_name": name, "difficulty_level": level} for name, level in names.items()]
+        }))
+        try:
+            descriptions = json.loads(response).get("descriptions", {})
+        except (json.JSONDecodeError, AttributeError):
+            return False
+        if not isinstance(descriptions, dict):
+            return False
+        
+        for task in plan_data["daily_study_plan"]:
+            description = descriptions.get(task["task_name"])
+            if isinstance(description, str) and description:
+                task["description"] = description
+        return bool(descriptions)
+    
+    def plan_study(self, payload, user_id: str = DEFAULT_USER_ID):
         """Human-initiated study planning with agentic follow-up and calendar integration"""
         try:
-            # Initial plan creation
-            plan_response = study_planner_agent.run(json.dumps(payload))
+            validation = validate_study_inputs(payload)
+            if "error" in validation:
+                return {
+                    "success": False,
+                    "error": validation["error"],
+                    "autonomous_monitoring": "error"
+                }
             
-            # Parse the JSON response
-            try:
-                plan_data = json.loads(plan_response)
-            except json.JSONDecodeError:
-                # Fallback if JSON parsing fails
-                plan_data = {
-                    "daily_study_plan": [],
-                    "general_reminders": [],
-                    "error": "Failed to parse study plan JSON",
-                    "raw_response": plan_response[:500] + "..." if len(plan_response) > 500 else plan_response
+            # Lay out the schedule locally (milliseconds), then optionally enrich the wording
+            started = time.perf_counter()
+            plan_data = solve_study_plan(payload)
+            solve_ms = (time.perf_counter() - started) * 1000
+            if plan_data["unscheduled"]:
+                return {
+                    "success": False,
+                    "error": "; ".join(f"{item['subject']}: {item['reason']}" for item in plan_data["unscheduled"]),
+                    "unscheduled": plan_data["unscheduled"],
+                    "autonomous_monitoring": "error"
                 }
+            enrich = payload.get("enrich")
+            if STUDY_PLAN_ENRICHMENT if enrich is None else enrich:
+                plan_data["descriptions_enriched"] = self._enrich_plan(plan_data)
             
-            # Store in blackboard for autonomous agents to monitor
-            blackboard.shared_context["current_study_plan"] = plan_data
-            blackboard.post_event("new_study_plan_created", payload, "human")
+            # Store in the student's partition for autonomous agents to monitor
+            partition = blackboard.get_partition(user_id)
+            partition.study_goals = [
+                StudyGoal(
+                    subject=subject.get("name", "General"),
+                    target_completion=subject.get("exam_date") or "",
+                    current_progress=0.0,
+                    priority=DIFFICULTY_PRIORITY.get(subject.get("difficulty"), 2),
+                    status="active"
+                )
+                for subject in payload.get("subjects", [])
+            ]
+            partition.set("current_study_plan", plan_data)
             
-            # Task manager processes the plan
-            tasks_response = task_manager_agent.run(json.dumps(plan_data))
+            # Bring the calendar in line with the new plan (only changed sessions are sent)
+            calendar_result, calendar_error = None, None
             try:
-                tasks_data = json.loads(tasks_response)
-            except json.JSONDecodeError:
-                tasks_data = plan_data  # Use original plan if task manager fails
+                calendar_result = sync_calendar(partition, plan_data)
+                partition.set("calendar_events", calendar_result)
+            except Exception as e:
+                calendar_error = e
             
-            blackboard.shared_context["current_tasks"] = tasks_data
+            # One save for the plan, calendar state and the deadline-bearing task per subject
+            blackboard.set_tasks(user_id, plan_tasks(plan_data), partition)
+            blackboard.post_event("new_study_plan_created", dict(payload, user_id=user_id), "human")
             
-            # Automatically create calendar events from the study plan
             try:
-                calendar_result = create_calendar_events_from_study_plan(plan_data)
-                blackboard.shared_context["calendar_events"] = calendar_result
+                if calendar_error is not None:
+                    raise calendar_error
                 
                 # Format the study plan as a table for better display
                 formatted_plan = format_study_plan_as_table(plan_data)
                 
                 return {
                     "success": True,
-                    "plan": json.dumps(plan_data),  # Keep as string for compatibility
-                    "study_plan": plan_data,  # Also provide as object
+                    "study_plan": plan_data,
                     "calendar_events": calendar_result,
                     "formatted_schedule": formatted_plan,
+                    "planner": {"solver": "local", "solve_ms": round(solve_ms, 2)},
                     "autonomous_monitoring": "enabled",
                     "message": "Study plan created with calendar integration and autonomous monitoring!"
                 }
@@ -192,9 +306,8 @@ class AgenticOrchestrator:
                 # If calendar integration fails, still return the plan
                 return {
                     "success": True,
-                    "plan": json.dumps(plan_data),
                     "study_plan": plan_data,
-                    "calendar_integration": {"status": "error", "message": str(e)},
+                    "calendar_events": {"status": "error", "message": str(e)},
                     "formatted_schedule": {"status": "error", "message": "Failed to format schedule"},
                     "autonomous_monitoring": "enabled",
                     "error": f"Calendar integration failed: {str(e)}"
@@ -203,11 +316,34 @@ class AgenticOrchestrator:
             return {
                 "success": False,
                 "error": f"Study plan creation failed: {str(e)}",
-                "plan": json.dumps({"error": str(e)}),
                 "autonomous_monitoring": "error"
             }
 
-    def upload_notes(self, payload):
+    def sync_calendar(self, plan_data, user_id: str = DEFAULT_USER_ID, token_data=None):
+        """Sync the student's calendar with a plan, sending only inserts, patches and deletes"""
+        if isinstance(plan_data, str):
+            plan_data = json.loads(plan_data)
+        partition = blackboard.get_partition(user_id)
+        result = sync_calendar(partition, plan_data, token_data)
+        partition.set("calendar_events", result)
+        blackboard.save_partition(partition)
+        return result
+    
+    def replan_study(self, change, user_id: str = DEFAULT_USER_ID):
+        """Incrementally revise the stored plan (missed task, new exam date, fewer hours)"""
+        change = {key: value for key, value in change.items() if value is not None}
+        result = blackboard.replan_study_plan(user_id, change, "human")
+        if result["status"] == "error":
+            return {"success": False, "error": result["message"]}
+        return {
+            "success": True,
+            "status": result["status"],
+            "diff": result["diff"],
+            "calendar_events": result.get("calendar"),
+            "study_plan": result["plan"]
+        }
+
+    def upload_notes(self, payload, user_id: str = DEFAULT_USER_ID):
         """Knowledge ingestion with autonomous processing and enhanced RAG integration"""
         try:
             # Process notes with enhanced tools first
@@ -225,7 +361,7 @@ class AgenticOrchestrator:
                 agent_data = {"raw_response": agent_result}
             
             # Notify autonomous agents about new knowledge
-            blackboard.post_event("new_knowledge_added", payload, "human")
+            blackboard.post_event("new_knowledge_added", dict(payload, user_id=user_id), "human")
             
             return {
                 "success": True,
@@ -266,11 +402,14 @@ class AgenticOrchestrator:
             "agent": "TutorAgent"
         }
 
-    def analyze_progress(self, payload):
+    def analyze_progress(self, payload, user_id: str = DEFAULT_USER_ID):
         """Manual progress check with enhanced analysis and autonomous monitoring"""
         try:
             # Get latest autonomous analysis
             latest_analysis = blackboard.shared_context.get("ProgressAnalyzerAgent_last_result", {})
+            student_avg = blackboard.progress_view().student_average(user_id, default=None)
+            if student_avg is not None:
+                latest_analysis = dict(latest_analysis, student_avg_progress=student_avg)
             
             # Run fresh analysis with enhanced tools
             from enhanced_tools import analyze_productivity
@@ -288,22 +427,27 @@ class AgenticOrchestrator:
             # Update progress in blackboard
             if "completed_tasks" in payload and "total_tasks" in payload:
                 progress = payload["completed_tasks"] / payload["total_tasks"]
-                blackboard.update_study_progress("overall", progress)
+                blackboard.update_study_progress("overall", progress, user_id)
                 
                 # Trigger autonomous agents if progress is concerning
                 if progress < 0.3:
                     blackboard.post_event("low_progress_detected", {
+                        "user_id": user_id,
                         "progress": progress,
                         "analysis": productivity_analysis
                     }, "manual_progress_check")
             
+            # Streak, velocity and forecast come from the history rollups, not the model
+            trends = blackboard.history_view().trend(user_id)
+            
             # Run the progress analyzer agent for additional insights
-            agent_analysis = progress_analyzer_agent.run(json.dumps(payload))
+            agent_analysis = progress_analyzer_agent.run(json.dumps(dict(payload, history=trends)))
             
             return {
                 "current_analysis": productivity_analysis,
                 "agent_insights": agent_analysis,
                 "autonomous_insights": latest_analysis,
+                "trends": trends,
                 "system_status": "autonomous_monitoring_active",
                 "recommendations": productivity_analysis.get("recommendations", []),
                 "completion_percentage": productivity_analysis.get("completion_percentage", 0),
@@ -318,8 +462,70 @@ class AgenticOrchestrator:
                 "system_status": "error"
             }
     
-    def get_system_status(self):
-        """Get status of all autonomous agents"""
+    def analyze_progress_batch(self, students, use_llm: bool = True):
+        """
+        Analyze a whole class; yields NDJSON-ready records. The local analysis
+        of every student is vectorized and streamed first, then the LLM looks
+        only at outliers (low progress, or far from the class mean), several
+        students per prompt and at most BATCH_ANALYSIS_MAX_LLM_CALLS prompts.
+        """
+        started = time.perf_counter()
+        analyses = analyze_productivity_batch(students)
+        outliers = [
+            i for i, analysis in enumerate(analyses)
+            if analysis["productivity_score"] < LOW_PROGRESS or abs(analysis["z_score"]) >= BATCH_ANALYSIS_OUTLIER_Z
+        ]
+        outlier_set = set(outliers)
+        scores = [analysis["productivity_score"] for analysis in analyses]
+        class_average = round(sum(scores) / len(scores), 2) if scores else 0.0
+        statuses = {}
+        for analysis in analyses:
+            statuses[analysis["status"]] = statuses.get(analysis["status"], 0) + 1
+        
+        micro_batches = [outliers[i:i + BATCH_ANALYSIS_MICRO_BATCH] for i in range(0, len(outliers), BATCH_ANALYSIS_MICRO_BATCH)]
+        llm_batches = micro_batches[:BATCH_ANALYSIS_MAX_LLM_CALLS] if use_llm else []
+        yield {
+            "type": "summary",
+            "students": len(students),
+            "class_average": class_average,
+            "status_counts": statuses,
+            "outliers": len(outliers),
+            "llm_calls": len(llm_batches),
+            "analysis_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+        
+        student_ids = [str(student.get("student_id", i)) for i, student in enumerate(students)]
+        
+        def record(i, agent_insights=None):
+            return dict(analyses[i], type="student", student_id=student_ids[i],
+                        outlier=i in outlier_set, agent_insights=agent_insights)
+        
+        for i in range(len(students)):
+            if i not in outlier_set:
+                yield record(i)
+        
+        for batch_number, batch in enumerate(micro_batches):
+            insights = {}
+            if batch_number < len(llm_batches):
+                response = batch_progress_analyzer_agent.run(json.dumps({
+                    "class_average": class_average,
+                    "students": [
+                        {"student_id": student_ids[i], "completed_tasks": students[i].get("completed_tasks", 0),
+                         "total_tasks": students[i].get("total_tasks", 1), "productivity_score": analyses[i]["productivity_score"]}
+                        for i in batch
+                    ]
+                }))
+                try:
+                    insights = json.loads(response).get("insights", {})
+                except (json.JSONDecodeError, AttributeError):
+                    print(f"Warning: batch progress analysis returned no insights: {response[:200]}")
+                if not isinstance(insights, dict):
+                    insights = {}
+            for i in batch:
+                yield record(i, insights.get(student_ids[i]))
+    
+    def get_status_view(self):
+        """The part of the status that changes only with a blackboard write: agents, events, context keys"""
         return {
             "agents": {name: {
                 "name": agent.name,
@@ -332,4 +538,41 @@ class AgenticOrchestrator:
             "shared_context_keys": list(blackboard.shared_context.keys())
         }
 
-orchestrator = AgenticOrchestrator()
+    def get_runtime_stats(self):
+        """Timings and counters that move without a blackboard write, and this worker's role"""
+        return {
+            "agent_performance": {
+                autonomous_agent.name: autonomous_agent.stats.snapshot()
+                for autonomous_agent in self._autonomous_agents()
+            },
+            "event_bus": blackboard.bus.stats(),
+            "scheduler": scheduler.stats(),
+            "deadlines": blackboard.deadlines.stats(),
+            "autonomous_leader": self.runs_autonomous_loops(),
+            "worker_pid": os.getpid()
+        }
+
+    def get_system_status(self):
+        """Get status of all autonomous agents"""
+        return dict(self.get_status_view(), **self.get_runtime_stats())
+
+    def shutdown(self):
+        """Leave the leader election and stop any autonomous loops in this process"""
+        if self.leader is not None:
+            self.leader.stop()
+        else:
+            self._stop_autonomous_loops()
+        if blackboard._history is not None:
+            blackboard.history.flush()
+
+# Built by the app's lifespan hook (or on first use), not at import time
+orchestrator_component = LazyComponent("orchestrator", AgenticOrchestrator, budget_ms=500)
+
+def get_orchestrator() -> AgenticOrchestrator:
+    return orchestrator_component.get()
+
+def __getattr__(name):
+    # Keeps "from agent import orchestrator" working, now lazily
+    if name == "orchestrator":
+        return get_orchestrator()
+    raise AttributeError(f"module 'agent' has no attribute '{name}'")
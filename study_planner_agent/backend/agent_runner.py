@@ -0,0 +1,35 @@
+"""
+Dedicated Process for the Autonomous Agents
+Runs the agent loops away from the request workers: start the API with
+AUTONOMOUS_AGENTS=external and BLACKBOARD_BACKEND=sqlite, then run
+`python agent_runner.py` beside it. Several runners may be started; they
+hold the leader election among themselves, so one is active and the rest
+stand by to take over
+"""
+import signal
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from agent import AgenticOrchestrator
+from blackboard import blackboard
+
+def run(stop: threading.Event) -> AgenticOrchestrator:
+    """Join the election and drive the agents until stop is set"""
+    if type(blackboard).__name__ != "SharedBlackboard":
+        print("⚠️ BLACKBOARD_BACKEND is not sqlite; the API workers will not see this process's agents")
+    orchestrator = AgenticOrchestrator(mode="auto")
+    try:
+        stop.wait()
+    finally:
+        orchestrator.shutdown()
+    return orchestrator
+
+if __name__ == "__main__":
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    print("🤖 Agent runner started; waiting for leadership")
+    run(stop)
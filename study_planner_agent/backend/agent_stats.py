@@ -0,0 +1,54 @@
+"""
+Rolling Performance Statistics for Autonomous Agents
+Fixed-size ring buffers so agent health tracking never grows with uptime
+"""
+from array import array
+from typing import Dict, Any
+
+class RollingStats:
+    """
+    EWMA of the self-evaluated performance score, plus windowed mean / p95
+    action latency and success rate over the last `window` cycles.
+    All storage is preallocated in __init__.
+    """
+
+    def __init__(self, window: int = 64, alpha: float = 0.2, initial_score: float = 1.0):
+        self.window = window
+        self.alpha = alpha
+        self.ewma_score = initial_score
+        self._latency = array("d", bytes(8 * window))
+        self._success = array("b", bytes(window))
+        self._count = 0
+
+    def record(self, latency: float, success: bool, score: float = None):
+        """Record one cycle; failed cycles count as score 0.0"""
+        slot = self._count % self.window
+        self._latency[slot] = latency
+        self._success[slot] = 1 if success else 0
+        self._count += 1
+
+        if not success:
+            score = 0.0
+        if score is not None:
+            self.ewma_score += self.alpha * (score - self.ewma_score)
+
+    def snapshot(self) -> Dict[str, Any]:
+        filled = min(self._count, self.window)
+        if not filled:
+            return {
+                "ewma_score": round(self.ewma_score, 3),
+                "latency_mean_ms": 0.0,
+                "latency_p95_ms": 0.0,
+                "success_rate": 1.0,
+                "samples": 0
+            }
+
+        latencies = sorted(self._latency[:filled])
+        p95 = latencies[min(filled - 1, int(0.95 * filled))]
+        return {
+            "ewma_score": round(self.ewma_score, 3),
+            "latency_mean_ms": round(1000 * sum(latencies) / filled, 2),
+            "latency_p95_ms": round(1000 * p95, 2),
+            "success_rate": round(sum(self._success[:filled]) / filled, 3),
+            "samples": self._count
+        }
@@ -1,10 +1,223 @@
-import firebase_admin
-from firebase_admin import credentials, auth
+"""
+Firebase Authentication
+The Firebase app is initialized once per process, however many modules use
+it, and verified ID tokens are cached by digest until they expire, so a
+repeat token costs a dictionary lookup instead of a signature check
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set
+
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-cred = credentials.Certificate("firebase_key.json")
-firebase_admin.initialize_app(cred)
+import clock
+from startup import LazyComponent
+
+def _init_firebase():
+    import firebase_admin
+    from firebase_admin import credentials
+
+    # Reuse an app someone else already initialized instead of failing on a second initialize_app
+    if firebase_admin._apps:
+        return firebase_admin.get_app()
+    cred = credentials.Certificate(os.getenv("FIREBASE_SERVICE_ACCOUNT", "firebase_key.json"))
+    return firebase_admin.initialize_app(cred)
+
+firebase = LazyComponent("firebase", _init_firebase, budget_ms=1000)
+
+# Firebase ID tokens expire an hour after they are issued
+ID_TOKEN_LIFETIME = 3600
+
+class VerifiedTokenCache:
+    """
+    LRU map of token digest -> verified claims, each entry valid until the
+    token's own exp claim. Only digests are kept, never the tokens.
+    revoke_user() drops a user's entries and rejects their tokens issued
+    before the revocation; revocation listeners are told about it.
+
+    With a shared revocations store (the SQLite blackboard), a revocation
+    made by one worker is also checked on every other worker's cache hits,
+    at the cost of one indexed read per authenticated request.
+    """
+
+    def __init__(self, max_entries: int = 10000, revocations=None):
+        self.max_entries = max_entries
+        self.revocations = revocations
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()  # digest -> (claims, exp)
+        self._by_user: Dict[str, Set[bytes]] = {}
+        self._revoked_before: Dict[str, float] = {}  # uid -> tokens issued before this are rejected
+        self._listeners = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=20).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[1] <= clock.now():
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Another worker may have revoked the user since this entry was cached
+        if self.revocations is not None and self.is_revoked(entry[0]):
+            self.revoke_token(token)
+            return None
+        return entry[0]
+
+    def put(self, token: str, claims: Dict[str, Any]):
+        exp = claims.get("exp")
+        if exp is None or exp <= clock.now():
+            return
+        key = self.digest(token)
+        uid = claims.get("uid") or claims.get("sub")
+        with self._lock:
+            self._entries[key] = (claims, float(exp))
+            self._entries.move_to_end(key)
+            if uid:
+                self._by_user.setdefault(uid, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: bytes):
+        claims, _ = self._entries.pop(key)
+        uid = claims.get("uid") or claims.get("sub")
+        keys = self._by_user.get(uid)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[uid]
+
+    def is_revoked(self, claims: Dict[str, Any]) -> bool:
+        uid = claims.get("uid") or claims.get("sub")
+        revoked_before = self._revoked_before.get(uid)
+        if self.revocations is not None:
+            shared = self.revocations.tokens_revoked_before(uid)
+            if shared is not None and (revoked_before is None or shared > revoked_before):
+                revoked_before = shared
+        return revoked_before is not None and claims.get("iat", 0) < revoked_before
+
+    def verify(self, token: str, verifier: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """Cached claims for token, or verifier(token) (which raises if invalid), cached"""
+        claims = self.get(token)
+        if claims is None:
+            claims = verifier(token)
+            if self.is_revoked(claims):
+                raise PermissionError("Token was issued before the user's sessions were revoked")
+            self.put(token, claims)
+        return claims
+
+    def add_revocation_listener(self, listener: Callable[[str], None]):
+        """listener(uid) is called after a user's tokens are revoked"""
+        self._listeners.append(listener)
+
+    def revoke_token(self, token: str):
+        with self._lock:
+            key = self.digest(token)
+            if key in self._entries:
+                self._drop(key)
+
+    def revoke_user(self, uid: str):
+        """Forget a user's cached tokens (sign-out, disabled account, revoked refresh tokens)"""
+        with self._lock:
+            for key in list(self._by_user.get(uid, ())):
+                self._drop(key)
+            now = int(clock.now())  # iat is in whole seconds
+            # Re-inserted so the dict stays in revocation order, oldest first
+            self._revoked_before.pop(uid, None)
+            self._revoked_before[uid] = now
+            # Once every token issued before a revocation has expired, it has nothing left to reject
+            while True:
+                stale_uid, revoked_at = next(iter(self._revoked_before.items()))
+                if revoked_at + ID_TOKEN_LIFETIME > now:
+                    break
+                del self._revoked_before[stale_uid]
+        if self.revocations is not None:
+            self.revocations.revoke_tokens(uid, now, now - ID_TOKEN_LIFETIME)
+        for listener in self._listeners:
+            listener(uid)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "revoked_users": len(self._revoked_before),
+                "hits": self.hits, "misses": self.misses}
+
+def _shared_revocations():
+    """The SQLite blackboard when workers share one, so a sign-out reaches all of them"""
+    if os.getenv("BLACKBOARD_BACKEND", "memory").lower() != "sqlite":
+        return None
+    from blackboard import blackboard
+    return blackboard
+
+token_cache = VerifiedTokenCache(
+    max_entries=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+    revocations=_shared_revocations()
+)
+
+def _verify_with_firebase(token: str) -> Dict[str, Any]:
+    from firebase_admin import auth as firebase_auth
+
+    firebase.get()
+    return firebase_auth.verify_id_token(token)
+
+def verify_token(token: str) -> Dict[str, Any]:
+    return token_cache.verify(token, _verify_with_firebase)
+
+def revoke_user(uid: str, revoke_refresh_tokens: bool = False):
+    """Revoke a user's sessions here and, optionally, their Firebase refresh tokens"""
+    if revoke_refresh_tokens:
+        from firebase_admin import auth as firebase_auth
+
+        firebase.get()
+        firebase_auth.revoke_refresh_tokens(uid)
+    token_cache.revoke_user(uid)
+
+# Status-stream tickets: EventSource cannot send an Authorization header, so the
+# stream URL carries a short-lived signed ticket instead of the ID token. Set
+# STREAM_TICKET_SECRET when several workers serve the app, so any one accepts it.
+STREAM_TICKET_TTL = int(os.getenv("STREAM_TICKET_TTL", "60"))
+_ticket_secret = os.getenv("STREAM_TICKET_SECRET", "").encode() or secrets.token_bytes(32)
+
+def _sign_ticket(payload: str) -> str:
+    return hmac.new(_ticket_secret, payload.encode(), hashlib.sha256).hexdigest()[:32]
+
+def issue_stream_ticket(uid: str) -> str:
+    """A ticket naming uid, valid for STREAM_TICKET_TTL seconds"""
+    payload = f"{uid}.{int(clock.now())}"
+    return f"{payload}.{_sign_ticket(payload)}"
+
+def verify_stream_ticket(ticket: str) -> str:
+    """The uid a ticket was issued to; raises ValueError if forged, expired or revoked"""
+    try:
+        uid, issued, signature = ticket.rsplit(".", 2)
+        issued_at = int(issued)
+    except ValueError:
+        raise ValueError("Malformed stream ticket")
+    if not hmac.compare_digest(signature, _sign_ticket(f"{uid}.{issued}")):
+        raise ValueError("Invalid stream ticket")
+    if clock.now() > issued_at + STREAM_TICKET_TTL:
+        raise ValueError("Stream ticket expired")
+    if token_cache.is_revoked({"uid": uid, "iat": issued_at}):
+        raise ValueError("Stream ticket was issued before the user's sessions were revoked")
+    return uid
 
 security = HTTPBearer()
 
@@ -12,8 +225,7 @@ def verify_firebase_token(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     try:
-        decoded_token = auth.verify_id_token(credentials.credentials)
-        return decoded_token
+        return verify_token(credentials.credentials)
     except Exception:
         raise HTTPException(
             status_code=401,
@@ -2,66 +2,87 @@
 Autonomous Agent Base Class
 Provides true agentic behavior with self-evaluation and goal-driven actions
 """
-import time
 import json
-import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from blackboard import blackboard, AgentStatus
-import google.generativeai as genai
+from scheduler import scheduler
+from agent_stats import RollingStats
 
 class AutonomousAgent(ABC):
+    # Event types (or fnmatch patterns) delivered to this agent's inbox
+    event_topics: Tuple[str, ...] = ()
+    # Whether the scheduler may jitter this agent's wake-ups
+    timer_jitter: bool = True
+    
     def __init__(self, name: str, model, system_prompt: str, tools: List):
         self.name = name
         self.model = model
         self.system_prompt = system_prompt
         self.tools = tools
         self.is_running = False
-        self.performance_history = []
+        self.scheduler = scheduler
+        self.stats = RollingStats()
+        self._action_started = None
         
         # Register with blackboard
         blackboard.register_agent(self.name)
+        self.inbox = blackboard.subscribe(self.name, self.event_topics) if self.event_topics else None
         
     def start_autonomous_loop(self):
-        """Start the agent's autonomous decision-making loop"""
+        """Start the agent's autonomous decision-making loop on the shared scheduler"""
         self.is_running = True
-        thread = threading.Thread(target=self._autonomous_loop, daemon=True)
-        thread.start()
+        self.scheduler.add_agent(self)
         
     def stop_autonomous_loop(self):
         """Stop the agent's autonomous loop"""
         self.is_running = False
+        self.scheduler.remove_agent(self.name)
+    
+    def wake_at(self, timestamp: float):
+        """Run the next cycle no later than timestamp"""
+        self.scheduler.wake(self.name, timestamp)
+        
+    def run_cycle(self) -> float:
+        """One autonomous evaluation; returns seconds until the next one"""
+        # Get current context from blackboard
+        context = blackboard.get_context_for_agent(self.name)
+        if self.inbox is not None:
+            blackboard.sync_events()
+            context["triggered_events"] = self.inbox.drain()
         
-    def _autonomous_loop(self):
-        """Main autonomous loop - runs continuously"""
-        while self.is_running:
-            try:
-                # Get current context from blackboard
-                context = blackboard.get_context_for_agent(self.name)
-                
-                # Evaluate if action is needed
-                if self._should_take_action(context):
-                    blackboard.update_agent_status(self.name, AgentStatus.WORKING)
-                    
-                    # Take autonomous action
-                    result = self._take_autonomous_action(context)
-                    
-                    # Evaluate performance
-                    performance = self._evaluate_performance(result, context)
-                    self.performance_history.append(performance)
-                    
-                    # Update blackboard with results
-                    self._update_blackboard(result)
-                    
-                    blackboard.update_agent_status(self.name, AgentStatus.IDLE)
-                
-                # Sleep before next evaluation
-                time.sleep(self._get_sleep_duration())
-                
-            except Exception as e:
-                print(f"Error in {self.name} autonomous loop: {e}")
-                blackboard.update_agent_status(self.name, AgentStatus.BLOCKED)
-                time.sleep(60)  # Wait before retrying
+        # Evaluate if action is needed
+        if self._should_take_action(context):
+            blackboard.update_agent_status(self.name, AgentStatus.WORKING)
+            
+            # Take autonomous action
+            self._action_started = time.perf_counter()
+            result = self._take_autonomous_action(context)
+            latency = time.perf_counter() - self._action_started
+            self._action_started = None
+            
+            # Evaluate performance
+            performance = self._evaluate_performance(result, context)
+            self.stats.record(latency, success=True, score=performance)
+            blackboard.update_agent_performance(self.name, self.stats.ewma_score)
+            
+            # Update blackboard with results
+            self._update_blackboard(result)
+            
+            blackboard.update_agent_status(self.name, AgentStatus.IDLE)
+        
+        # Wait before next evaluation
+        return self._get_sleep_duration()
+    
+    def on_cycle_error(self, error: Exception, retry_in: float):
+        """Called by the scheduler when run_cycle raises; it retries after retry_in seconds"""
+        print(f"Error in {self.name} autonomous loop: {error} (retrying in {retry_in:.0f}s)")
+        if self._action_started is not None:
+            self.stats.record(time.perf_counter() - self._action_started, success=False)
+            self._action_started = None
+            blackboard.update_agent_performance(self.name, self.stats.ewma_score)
+        blackboard.update_agent_status(self.name, AgentStatus.BLOCKED)
     
     @abstractmethod
     def _should_take_action(self, context: Dict[str, Any]) -> bool:
@@ -2,7 +2,7 @@
 Specific Autonomous Agent Implementations
 Each agent has unique autonomous behavior patterns
 """
-import time
+import clock
 from typing import Dict, Any
 from autonomous_agent import AutonomousAgent
 from blackboard import blackboard
@@ -10,34 +10,58 @@ from blackboard import blackboard
 class AutonomousProgressAnalyzer(AutonomousAgent):
     """Continuously monitors student progress and triggers interventions"""
     
+    event_topics = ("new_study_plan_created", "new_knowledge_added")
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Students already reported below threshold; reported again only after recovering
+        self._flagged = set()
+    
     def _should_take_action(self, context: Dict[str, Any]) -> bool:
+        # New plans or notes warrant a fresh look before the hourly cycle
+        if context.get("triggered_events"):
+            return True
+        
         # Check if enough time has passed since last analysis
         last_analysis = blackboard.shared_context.get("last_progress_analysis", 0)
-        return time.time() - last_analysis > 3600  # Every hour
+        return clock.now() - last_analysis > 3600  # Every hour
     
     def _take_autonomous_action(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        # Import tools locally to avoid circular imports
-        from enhanced_tools import analyze_productivity
-        
-        # Analyze current productivity
-        study_goals = context.get("study_goals", [])
-        
-        # Calculate overall progress
-        total_progress = sum(goal.get("current_progress", 0) for goal in study_goals)
-        avg_progress = total_progress / len(study_goals) if study_goals else 0
-        
-        # Check for concerning patterns
-        if avg_progress < 0.3:  # Less than 30% average progress
-            blackboard.post_event("low_productivity_detected", {
-                "average_progress": avg_progress,
-                "recommendation": "intervention_needed"
-            }, self.name)
+        # Students with no requests for a day are moved out of memory first
+        blackboard.partitions.evict_idle(86400)
+        
+        # Vectorized scan of every student's progress in the columnar store
+        cohort = blackboard.progress_view().analyze(threshold=0.3)
+        user_ids, averages, slopes = cohort["user_ids"], cohort["average"], cohort["slope"]
+        
+        # Students who fell below 30% average progress since the last scan get one batched post
+        below = {user_ids[i]: i for i in cohort["below"]}
+        newly_below = [i for user_id, i in below.items() if user_id not in self._flagged]
+        self._flagged = set(below)
+        if newly_below:
+            blackboard.post_events([
+                ("low_productivity_detected", {
+                    "user_id": user_ids[i],
+                    "average_progress": float(averages[i]),
+                    "trend_slope": float(slopes[i]),
+                    "recommendation": "intervention_needed"
+                })
+                for i in newly_below
+            ], self.name)
+        
+        cohort_avg = float(averages.mean()) if len(user_ids) else 0
         
         # Update blackboard
-        blackboard.shared_context["last_progress_analysis"] = time.time()
-        blackboard.shared_context["current_avg_progress"] = avg_progress
-        
-        return {"analysis_completed": True, "avg_progress": avg_progress}
+        blackboard.shared_context["last_progress_analysis"] = clock.now()
+        blackboard.shared_context["current_avg_progress"] = cohort_avg
+        
+        return {
+            "analysis_completed": True,
+            "avg_progress": cohort_avg,
+            "students_analyzed": len(user_ids),
+            "students_below_threshold": len(cohort["below"]),
+            "students_newly_flagged": len(newly_below)
+        }
     
     def _evaluate_performance(self, result: Dict[str, Any], context: Dict[str, Any]) -> float:
         # Performance based on accuracy of progress detection
@@ -49,40 +73,83 @@ class AutonomousProgressAnalyzer(AutonomousAgent):
 class AutonomousTaskScheduler(AutonomousAgent):
     """Automatically reschedules missed tasks and optimizes calendar"""
     
+    event_topics = ("deadline_approaching", "task_missed", "emergency_reschedule_needed", "tasks_updated")
+    # Deadline timers must fire on time, not +/- jitter
+    timer_jitter = False
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._indexed = False
+        blackboard.deadlines.on_earliest = self.wake_at
+    
     def _should_take_action(self, context: Dict[str, Any]) -> bool:
-        # Check for missed deadlines or rescheduling requests
-        recent_events = context.get("recent_events", [])
+        # Check for missed deadlines, rescheduling requests or new tasks
+        if context.get("triggered_events") or not self._indexed:
+            return True
         
-        for event in recent_events:
-            if event["type"] in ["deadline_approaching", "task_missed"]:
-                return True
-        
-        # Also check daily for optimization opportunities
-        last_optimization = blackboard.shared_context.get("last_schedule_optimization", 0)
-        return time.time() - last_optimization > 86400  # Daily
+        # Otherwise only when a deadline threshold timer is due
+        next_due = blackboard.deadlines.next_due()
+        return next_due is not None and next_due <= clock.now()
     
     def _take_autonomous_action(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        # Get upcoming deadlines
-        from enhanced_tools import check_upcoming_deadlines
-        
-        tasks_data = {"tasks": blackboard.shared_context.get("current_tasks", [])}
-        deadline_check = check_upcoming_deadlines(tasks_data)
+        from deadline_index import extract_tasks
+        
+        # Index every active student's tasks once; after that only changed students
+        if not self._indexed:
+            for partition in blackboard.active_partitions():
+                blackboard.deadlines.set_tasks(partition.user_id, extract_tasks(partition.shared_context.get("current_tasks")))
+            self._indexed = True
+        for event in context.get("triggered_events", []):
+            if event["type"] == "tasks_updated":
+                # Tasks saved by another worker process (a no-op for our own)
+                user_id = event["data"]["user_id"]
+                tasks = blackboard.get_partition(user_id).shared_context.get("current_tasks")
+                blackboard.deadlines.set_tasks(user_id, extract_tasks(tasks))
         
         actions_taken = []
-        
-        # Handle urgent deadlines
-        for alert in deadline_check.get("alerts", []):
+        for event in context.get("triggered_events", []):
+            change = self._plan_change(event)
+            if change is None:
+                continue
+            user_id = event["data"]["user_id"]
+            revision = blackboard.replan_study_plan(user_id, change, self.name)
+            if revision["status"] == "success":
+                actions_taken.append(f"Replanned {', '.join(revision['diff']['changed_days']) or 'plan'} for {user_id}")
+        
+        alerts = blackboard.deadlines.pop_due()
+        for alert in alerts:
             if alert["days_left"] <= 1:
                 # Request human approval for emergency rescheduling
                 blackboard.post_event("emergency_reschedule_needed", {
+                    "user_id": alert["user_id"],
                     "task": alert["task"],
+                    "subject": alert["subject"],
+                    "due_date": alert["due_date"],
                     "days_left": alert["days_left"]
                 }, self.name)
                 actions_taken.append(f"Emergency reschedule requested for {alert['task']}")
+            else:
+                blackboard.post_event("deadline_approaching", alert, self.name)
         
-        blackboard.shared_context["last_schedule_optimization"] = time.time()
+        blackboard.shared_context["last_schedule_optimization"] = clock.now()
         
-        return {"actions_taken": actions_taken, "deadlines_checked": len(deadline_check.get("alerts", []))}
+        return {"actions_taken": actions_taken, "deadlines_checked": len(alerts)}
+    
+    @staticmethod
+    def _plan_change(event: Dict[str, Any]):
+        """The incremental replan (if any) an inbox event calls for"""
+        data = event["data"]
+        if not data.get("user_id"):
+            return None
+        if event["type"] == "task_missed" and data.get("task_id") is not None:
+            return {"type": "missed_task", "task_id": data["task_id"]}
+        if event["type"] == "emergency_reschedule_needed" and data.get("subject") and data.get("due_date"):
+            # Keep the plan aimed at the exam date that raised the alarm, in case it moved
+            plan = blackboard.get_partition(data["user_id"]).shared_context.get("current_study_plan") or {}
+            for subject in plan.get("plan_inputs", {}).get("subjects", []):
+                if subject["name"] == data["subject"] and subject["exam_date"] not in (None, data["due_date"]):
+                    return {"type": "exam_date", "subject": data["subject"], "exam_date": data["due_date"]}
+        return None
     
     def _evaluate_performance(self, result: Dict[str, Any], context: Dict[str, Any]) -> float:
         # Performance based on proactive deadline management
@@ -90,27 +157,63 @@ class AutonomousTaskScheduler(AutonomousAgent):
         return min(1.0, len(actions) * 0.3)  # Up to 1.0 for multiple actions
     
     def _get_sleep_duration(self) -> int:
-        return 3600  # Check every hour
+        # Wake exactly at the next deadline threshold, checking in at least hourly
+        next_due = blackboard.deadlines.next_due()
+        if next_due is None:
+            return 3600
+        return min(3600, max(0.0, next_due - clock.now()))
 
 class AutonomousBehaviorCoach(AutonomousAgent):
     """Provides motivational interventions and focus strategies"""
     
+    event_topics = ("low_productivity_detected", "low_progress_detected")
+    
     def _should_take_action(self, context: Dict[str, Any]) -> bool:
         # React to low productivity events
-        recent_events = context.get("recent_events", [])
-        
-        for event in recent_events:
-            if event["type"] in ["low_productivity_detected", "low_progress_detected"]:
-                return True
+        if context.get("triggered_events"):
+            return True
         
         # Also provide daily motivation
         last_motivation = blackboard.shared_context.get("last_motivation", 0)
-        return time.time() - last_motivation > 86400  # Daily
+        return clock.now() - last_motivation > 86400  # Daily
     
     def _take_autonomous_action(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        # Analyze current situation
-        avg_progress = blackboard.shared_context.get("current_avg_progress", 0.5)
+        interventions = {}
+        progress = blackboard.progress_view()
+        
+        # The daily pass reaches every active student; events only the students they name
+        daily = clock.now() - blackboard.shared_context.get("last_motivation", 0) > 86400
+        if daily:
+            user_ids = [partition.user_id for partition in blackboard.active_partitions()]
+        else:
+            user_ids = list(dict.fromkeys(
+                event["data"]["user_id"] for event in context.get("triggered_events", [])
+                if event["data"].get("user_id")
+            ))
+        
+        for user_id in user_ids:
+            # Analyze current situation
+            avg_progress = progress.student_average(user_id)
+            strategy, message = self._choose_intervention(avg_progress)
+            
+            # Post motivational event
+            blackboard.post_event("motivation_provided", {
+                "user_id": user_id,
+                "strategy": strategy,
+                "message": message,
+                "progress_level": avg_progress
+            }, self.name)
+            interventions[user_id] = strategy
+        
+        if daily:
+            blackboard.shared_context["last_motivation"] = clock.now()
         
+        # Cohort-level strategy keeps the existing result shape for self-evaluation
+        strategy, message = self._choose_intervention(blackboard.shared_context.get("current_avg_progress", 0.5))
+        return {"strategy": strategy, "message": message, "interventions": interventions}
+    
+    @staticmethod
+    def _choose_intervention(avg_progress: float):
         # Generate appropriate intervention
         if avg_progress < 0.3:
             strategy = "intensive_support"
@@ -121,17 +224,7 @@ class AutonomousBehaviorCoach(AutonomousAgent):
         else:
             strategy = "maintenance"
             message = "Great work! Keep up the consistent effort."
-        
-        # Post motivational event
-        blackboard.post_event("motivation_provided", {
-            "strategy": strategy,
-            "message": message,
-            "progress_level": avg_progress
-        }, self.name)
-        
-        blackboard.shared_context["last_motivation"] = time.time()
-        
-        return {"strategy": strategy, "message": message}
+        return strategy, message
     
     def _evaluate_performance(self, result: Dict[str, Any], context: Dict[str, Any]) -> float:
         # Performance based on appropriateness of intervention
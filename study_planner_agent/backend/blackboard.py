@@ -3,11 +3,14 @@ Shared Blackboard for Inter-Agent Communication
 Implements the blackboard pattern for true agentic coordination
 """
 import json
-import time
-from typing import Dict, Any, List
+import os
+import threading
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+import clock
+
 class AgentStatus(Enum):
     IDLE = "idle"
     WORKING = "working"
@@ -31,12 +34,57 @@ class StudyGoal:
     priority: int
     status: str
 
+# Default reactions: event type -> agents to mark as working, with their new goal
+AGENT_REACTIONS = {
+    "low_productivity_detected": [("BehaviorCoachAgent", "improve_focus")],
+    "low_progress_detected": [("BehaviorCoachAgent", "improve_focus")],
+    "deadline_approaching": [("TaskManagerAgent", "reschedule_tasks")],
+    "emergency_reschedule_needed": [("TaskSchedulerAgent", "emergency_reschedule")],
+    "study_plan_needs_revision": [("StudyPlannerAgent", "revise_plan")],
+    "new_knowledge_added": [("ProgressAnalyzerAgent", "reassess_progress")],
+}
+
 class Blackboard:
     def __init__(self):
         self.agents: Dict[str, AgentState] = {}
         self.study_goals: List[StudyGoal] = []
         self.shared_context: Dict[str, Any] = {}
-        self.events: List[Dict[str, Any]] = []
+        from event_log import EventLog
+        self.events = EventLog(max_events=int(os.getenv("EVENT_LOG_MAX_EVENTS", "1000000")))
+        self._version = 0
+        self._change = threading.Condition()
+        
+        self._init_event_bus()
+        
+        self._progress = None  # columnar store, created on first use (imports NumPy)
+        self._history = None  # time-series store, likewise
+        
+        from deadline_index import DeadlineIndex
+        self.deadlines = DeadlineIndex()
+        
+        from partitions import PartitionManager, PartitionStore
+        self.partitions = PartitionManager(
+            PartitionStore(os.getenv("PARTITION_DB_PATH", "partitions.db")),
+            max_resident=int(os.getenv("PARTITION_MAX_RESIDENT", "1000")),
+            max_partition_bytes=int(os.getenv("PARTITION_MAX_BYTES", str(256 * 1024)))
+        )
+    
+    @property
+    def version(self) -> int:
+        """Monotonic counter bumped on every blackboard write"""
+        return self._version
+    
+    def _changed(self):
+        """Bump the version and wake up anyone waiting for a change"""
+        with self._change:
+            self._version += 1
+            self._change.notify_all()
+    
+    def wait_for_change(self, since_version: int, timeout: Optional[float] = None) -> int:
+        """Block until the version differs from since_version (or timeout) and return it"""
+        with self._change:
+            self._change.wait_for(lambda: self._version != since_version, timeout)
+            return self._version
         
     def register_agent(self, agent_name: str):
         """Register an agent with the blackboard"""
@@ -46,15 +94,23 @@ class Blackboard:
             current_goal="",
             last_action="initialized",
             performance_score=1.0,
-            timestamp=time.time()
+            timestamp=clock.now()
         )
+        self._changed()
     
     def update_agent_status(self, agent_name: str, status: AgentStatus, goal: str = ""):
         """Update agent status and current goal"""
         if agent_name in self.agents:
             self.agents[agent_name].status = status
             self.agents[agent_name].current_goal = goal
-            self.agents[agent_name].timestamp = time.time()
+            self.agents[agent_name].timestamp = clock.now()
+            self._changed()
+    
+    def update_agent_performance(self, agent_name: str, score: float):
+        """Record an agent's rolling performance score"""
+        if agent_name in self.agents:
+            self.agents[agent_name].performance_score = round(score, 3)
+            self._changed()
     
     def post_event(self, event_type: str, data: Dict[str, Any], source_agent: str):
         """Post an event that other agents can react to"""
@@ -62,28 +118,54 @@ class Blackboard:
             "type": event_type,
             "data": data,
             "source": source_agent,
-            "timestamp": time.time()
+            "timestamp": clock.now()
         }
         self.events.append(event)
+        self._changed()
         
         # Trigger reactions based on event type
         self._trigger_agent_reactions(event)
     
+    def post_events(self, events: List[Tuple[str, Dict[str, Any]]], source_agent: str):
+        """Post a batch of (event_type, data) pairs with a single change notification"""
+        now = clock.now()
+        posted = [{"type": event_type, "data": data, "source": source_agent, "timestamp": now}
+                  for event_type, data in events]
+        self.events.extend(posted)
+        self._changed()
+        for event in posted:
+            self._trigger_agent_reactions(event)
+    
+    def _init_event_bus(self):
+        from event_bus import EventBus
+        self.bus = EventBus()
+        for event_type, reactions in AGENT_REACTIONS.items():
+            self.bus.subscribe(
+                f"reaction:{event_type}", event_type,
+                handler=lambda event, reactions=reactions: self._react(reactions)
+            )
+    
+    def _react(self, reactions):
+        for agent_name, goal in reactions:
+            self.update_agent_status(agent_name, AgentStatus.WORKING, goal)
+    
+    def subscribe(self, name: str, patterns, handler=None, max_queue: int = 100):
+        """Subscribe to event types or wildcard patterns, returning the subscriber's inbox"""
+        return self.bus.subscribe(name, patterns, handler=handler, max_queue=max_queue)
+    
+    def sync_events(self) -> int:
+        """Deliver events posted by other processes (no-op for the in-process board)"""
+        return 0
+    
     def _trigger_agent_reactions(self, event: Dict[str, Any]):
         """Trigger appropriate agent reactions to events"""
-        event_type = event["type"]
-        
-        if event_type == "low_productivity_detected":
-            # Notify behavior coach
-            self.update_agent_status("BehaviorCoachAgent", AgentStatus.WORKING, "improve_focus")
-            
-        elif event_type == "deadline_approaching":
-            # Notify task scheduler to replan
-            self.update_agent_status("TaskManagerAgent", AgentStatus.WORKING, "reschedule_tasks")
-            
-        elif event_type == "study_plan_needs_revision":
-            # Notify study planner
-            self.update_agent_status("StudyPlannerAgent", AgentStatus.WORKING, "revise_plan")
+        self.bus.publish(event)
+    
+    def query_events(self, since: Optional[float] = None, until: Optional[float] = None,
+                     event_type: Optional[str] = None, source: Optional[str] = None,
+                     cursor: Optional[int] = None, limit: int = 100) -> Dict[str, Any]:
+        """Page through event history by time range, type and source"""
+        return self.events.query(since, until, event_type, source, cursor, limit)
     
     def get_context_for_agent(self, agent_name: str) -> Dict[str, Any]:
         """Get relevant context for a specific agent"""
@@ -94,15 +176,138 @@ class Blackboard:
             "shared_context": self.shared_context
         }
     
-    def update_study_progress(self, subject: str, progress: float):
-        """Update progress for a study goal"""
+    def get_partition(self, user_id: str):
+        """Get (loading if evicted) the blackboard partition of one student"""
+        return self.partitions.get(user_id)
+    
+    def save_partition(self, partition):
+        """Persist changes made to a student partition"""
+        self.partitions.save(partition)
+        self._changed()
+    
+    def active_partitions(self):
+        """Partitions of students active recently, for the autonomous agents to scan"""
+        return self.partitions.active()
+    
+    def set_tasks(self, user_id: str, tasks_data, partition=None):
+        """
+        Store a student's current tasks and index their due dates. Other
+        workers' task schedulers pick the change up from "tasks_updated".
+        Pass the partition when the caller holds one with unsaved changes:
+        it is saved once, with the tasks, instead of being overwritten by
+        a freshly loaded copy.
+        """
+        from deadline_index import extract_tasks
+        partition = partition if partition is not None else self.get_partition(user_id)
+        partition.set("current_tasks", tasks_data)
+        self.save_partition(partition)
+        dated = self.deadlines.set_tasks(user_id, extract_tasks(tasks_data))
+        self.post_event("tasks_updated", {"user_id": user_id, "dated_tasks": dated}, "system")
+    
+    def replan_study_plan(self, user_id: str, change: Dict[str, Any], source_agent: str = "system") -> Dict[str, Any]:
+        """
+        Apply a change (missed task, exam date, daily hours) to a student's
+        stored plan, re-laying out only the affected days; returns the diff
+        """
+        from plan_solver import replan, plan_tasks
+        from calendar_sync import sync_calendar
+        partition = self.get_partition(user_id)
+        plan = partition.shared_context.get("current_study_plan")
+        if not plan:
+            return {"status": "error", "message": "No study plan to revise"}
+        
+        result = replan(plan, change)
+        if result["status"] != "success":
+            return result
+        
+        partition.set("current_study_plan", result["plan"])
+        result["calendar"] = sync_calendar(partition, result["plan"])
+        partition.set("calendar_events", result["calendar"])
+        self.set_tasks(user_id, plan_tasks(result["plan"]), partition)
+        self.post_event("study_plan_revised", {
+            "user_id": user_id,
+            "change": change,
+            "changed_days": result["diff"]["changed_days"]
+        }, source_agent)
+        return result
+    
+    @property
+    def progress(self):
+        if self._progress is None:
+            from progress_store import ProgressStore
+            self._progress = ProgressStore()
+        return self._progress
+    
+    @property
+    def history(self):
+        if self._history is None:
+            from progress_history import ProgressHistory
+            self._history = ProgressHistory(os.getenv("PROGRESS_HISTORY_DIR", "progress_history"))
+        return self._history
+    
+    def record_progress(self, user_id: str, subject: str, progress: float):
+        """Add a progress sample to the columnar cohort store and the history"""
+        self.progress.record(user_id, subject, progress)
+        self.history.append(user_id, subject, progress)
+    
+    def progress_view(self):
+        """Columnar progress store covering every student, for cohort scans"""
+        return self.progress
+    
+    def history_view(self):
+        """Progress history with daily/weekly rollups, for trend queries"""
+        return self.history
+    
+    def add_goal(self, goal: StudyGoal):
+        """Add a board-wide study goal, replacing any goal for the same subject"""
+        self.study_goals[:] = [existing for existing in self.study_goals if existing.subject != goal.subject]
+        self.study_goals.append(goal)
+        self._changed()
+    
+    def update_goal(self, subject: str, **changes) -> Optional[StudyGoal]:
+        """Set fields of the board-wide goal for subject; returns it, or None if there is none"""
         for goal in self.study_goals:
             if goal.subject == subject:
+                for key, value in changes.items():
+                    setattr(goal, key, value)
+                self._changed()
+                return goal
+        return None
+    
+    def update_study_progress(self, subject: str, progress: float, user_id: Optional[str] = None):
+        """
+        Update progress for a study goal, in the student's partition when
+        user_id is given. A student's sample is recorded (once) even when
+        no goal matches the subject.
+        """
+        if user_id is None:
+            goal = self.update_goal(subject, current_progress=progress)
+        else:
+            self.record_progress(user_id, subject, progress)
+            partition = self.get_partition(user_id)
+            goal = next((goal for goal in partition.study_goals if goal.subject == subject), None)
+            if goal is not None:
                 goal.current_progress = progress
-                
-                # Trigger events based on progress
-                if progress < 0.3:  # Less than 30% progress
-                    self.post_event("low_progress_detected", {"subject": subject, "progress": progress}, "system")
+                self.save_partition(partition)
+        
+        # Trigger events based on progress
+        if goal is not None and progress < 0.3:  # Less than 30% progress
+            event_data = {"subject": subject, "progress": progress}
+            if user_id is not None:
+                event_data["user_id"] = user_id
+            self.post_event("low_progress_detected", event_data, "system")
+
+def create_blackboard() -> Blackboard:
+    """
+    Build the blackboard backend selected by BLACKBOARD_BACKEND.
+    "memory" (default) is per-process; "sqlite" is shared by every worker
+    process on the host through the file at BLACKBOARD_DB_PATH.
+    """
+    backend = os.getenv("BLACKBOARD_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        from shared_blackboard import SharedBlackboard
+        return SharedBlackboard(os.getenv("BLACKBOARD_DB_PATH", "blackboard.db"))
+    return Blackboard()
 
 # Global blackboard instance
-blackboard = Blackboard()
\ No newline at end of file
+blackboard = create_blackboard()
\ No newline at end of file
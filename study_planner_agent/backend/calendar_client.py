@@ -0,0 +1,179 @@
+"""
+Cached Google Calendar Client
+One Calendar service per user, built once from the discovery document that
+ships with google-api-python-client and reused with its (refreshed)
+credentials. Events are inserted through the batch endpoint, up to 50 per
+HTTP request, with a bounded number of batches in flight
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+SCOPES = ["https://www.googleapis.com/auth/calendar"]
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+DEFAULT_API_ROOT = "https://www.googleapis.com/"
+BATCH_LIMIT = 50  # Calendar API maximum calls per batch request
+
+def event_body(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Calendar event resource for one study task (times without an offset need a time_zone)"""
+    time_zone = {"timeZone": data["time_zone"]} if data.get("time_zone") else {}
+    return {
+        "summary": data.get("title", "Study Session"),
+        "description": data.get("description", ""),
+        "start": dict({"dateTime": data["start_time"]}, **time_zone),
+        "end": dict({"dateTime": data["end_time"]}, **time_zone),
+        "reminders": {
+            "useDefault": False,
+            "overrides": [
+                {"method": "popup", "minutes": 15},
+                {"method": "email", "minutes": 60}
+            ]
+        }
+    }
+
+class CalendarService:
+    """
+    One user's Calendar service. The service object is built once (static
+    discovery, no network); each worker thread gets its own authorized HTTP
+    connection, since httplib2 connections are not thread-safe, all sharing
+    the user's Credentials so a refresh is reused everywhere.
+    """
+
+    def __init__(self, credentials, api_root: Optional[str] = None, concurrency: int = 4):
+        from googleapiclient.discovery import build
+
+        self.credentials = credentials
+        self.api_root = api_root or DEFAULT_API_ROOT
+        self.batch_uri = self.api_root + "batch/calendar/v3"
+        self.concurrency = concurrency
+        client_options = {"api_endpoint": self.api_root + "calendar/v3/"} if api_root else None
+        self.service = build("calendar", "v3", credentials=credentials, static_discovery=True,
+                             cache_discovery=False, client_options=client_options)
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+
+    def _http(self):
+        http = getattr(self._local, "http", None)
+        if http is None:
+            import httplib2
+            from google_auth_httplib2 import AuthorizedHttp
+            http = self._local.http = AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=30))
+        return http
+
+    def _ensure_fresh(self):
+        # Refresh once up front instead of in every concurrent batch
+        if self.credentials.expired and self.credentials.refresh_token:
+            with self._refresh_lock:
+                if self.credentials.expired:
+                    from google.auth.transport.requests import Request
+                    self.credentials.refresh(Request())
+
+    def insert_event(self, data: Dict[str, Any], calendar_id: str = "primary",
+                     body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Insert one event, built by event_body(data) unless the caller passes its own body"""
+        self._ensure_fresh()
+        body = event_body(data) if body is None else body
+        return self.service.events().insert(calendarId=calendar_id, body=body).execute(http=self._http())
+
+    def execute_batch(self, requests: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Run prepared API requests through the batch endpoint. Returns one
+        {"response"} or {"error", "http_status"} dict per request, in order.
+        """
+        from googleapiclient.http import BatchHttpRequest
+
+        self._ensure_fresh()
+        results: List[Dict[str, Any]] = [{} for _ in requests]
+
+        def run_chunk(start: int):
+            def on_response(request_id, response, exception):
+                index = start + int(request_id)
+                if exception is None:
+                    results[index] = {"response": response}
+                else:
+                    results[index] = {"error": str(exception), "http_status": getattr(getattr(exception, "resp", None), "status", None)}
+
+            batch = BatchHttpRequest(callback=on_response, batch_uri=self.batch_uri)
+            for offset, request in enumerate(requests[start:start + BATCH_LIMIT]):
+                batch.add(request, request_id=str(offset))
+            try:
+                batch.execute(http=self._http())
+            except Exception as e:
+                for index in range(start, min(start + BATCH_LIMIT, len(requests))):
+                    if not results[index]:
+                        results[index] = {"error": str(e), "http_status": None}
+
+        starts = list(range(0, len(requests), BATCH_LIMIT))
+        if len(starts) <= 1 or self.concurrency <= 1:
+            for start in starts:
+                run_chunk(start)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(starts))) as pool:
+                list(pool.map(run_chunk, starts))
+        return results
+
+    def insert_events(self, events: List[Dict[str, Any]], calendar_id: str = "primary") -> List[Dict[str, Any]]:
+        """Insert many events with batch requests; results are in input order"""
+        events_api = self.service.events()
+        return self.execute_batch([events_api.insert(calendarId=calendar_id, body=event_body(data)) for data in events])
+
+class CalendarClientCache:
+    """
+    LRU map of user id -> CalendarService. A cached service is reused as
+    long as the caller's refresh token (or, without one, access token) is
+    the one it was built with; otherwise it is rebuilt.
+    """
+
+    def __init__(self, max_clients: int = 256, api_root: Optional[str] = None, concurrency: int = 4):
+        self.max_clients = max_clients
+        self.api_root = api_root
+        self.concurrency = concurrency
+        self._clients: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    @staticmethod
+    def _identity(token_data: Dict[str, Any]) -> str:
+        return token_data.get("refresh_token") or token_data["access_token"]
+
+    def get(self, user_id: str, token_data: Dict[str, Any]) -> CalendarService:
+        identity = self._identity(token_data)
+        with self._lock:
+            cached = self._clients.get(user_id)
+            if cached is not None and cached[0] == identity:
+                self._clients.move_to_end(user_id)
+                return cached[1]
+
+        from google.oauth2.credentials import Credentials
+        credentials = Credentials(
+            token=token_data["access_token"],
+            refresh_token=token_data.get("refresh_token"),
+            token_uri=TOKEN_URI,
+            client_id=token_data.get("client_id"),
+            client_secret=token_data.get("client_secret"),
+            scopes=SCOPES
+        )
+        client = CalendarService(credentials, self.api_root, self.concurrency)
+        with self._lock:
+            self.builds += 1
+            self._clients[user_id] = (identity, client)
+            self._clients.move_to_end(user_id)
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        return client
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._clients.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"clients": len(self._clients), "builds": self.builds}
+
+# Global cache shared by the calendar tools; CALENDAR_API_ROOT points it at a stand-in server
+calendar_clients = CalendarClientCache(
+    max_clients=int(os.getenv("CALENDAR_MAX_CLIENTS", "256")),
+    api_root=os.getenv("CALENDAR_API_ROOT") or None,
+    concurrency=int(os.getenv("CALENDAR_BATCH_CONCURRENCY", "4"))
+)
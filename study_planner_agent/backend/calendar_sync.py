@@ -0,0 +1,153 @@
+"""
+Incremental Calendar Sync
+Each student's partition keeps a map from plan task id to calendar event id
+and a hash of the event's content. A sync diffs the current plan against
+that map and sends only the inserts, patches and deletes it needs, so an
+unchanged plan costs no API calls and a one-task replan costs one
+"""
+import datetime
+import hashlib
+import json
+import os
+from typing import Dict, Any, List, Optional, Tuple
+
+from datetime_parsing import parse_date, parse_time
+from interval_index import IntervalIndex, find_overlaps
+
+SYNC_KEY = "calendar_sync"
+CALENDAR_TIME_ZONE = os.getenv("CALENDAR_TIME_ZONE", "UTC")
+
+def _iso(date: str, time_str: str) -> str:
+    moment = parse_time(time_str, "session_time") or datetime.time(9, 0)
+    return datetime.datetime.combine(parse_date(date, "session_date"), moment).isoformat()
+
+def task_key(task: Dict[str, Any]) -> str:
+    """Stable identity of a plan task: its id, or its name and slot for plans without ids"""
+    task_id = task.get("task_id", task.get("id"))
+    if task_id is not None:
+        return str(task_id)
+    slot = f"{task.get('task_name') or task.get('name')}|{task.get('date') or task.get('day_of_week')}|{task.get('start_time')}"
+    return hashlib.blake2b(slot.encode(), digest_size=8).hexdigest()
+
+def task_event(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Event data (see calendar_client.event_body) for one plan task"""
+    if task.get("date"):
+        start_time = _iso(task["date"], task.get("start_time", ""))
+        end_time = _iso(task["date"], task.get("end_time", "")) if task.get("end_time") else start_time
+    else:
+        from enhanced_tools import format_task_datetime
+        start_time = format_task_datetime(task.get("start_time", ""), task.get("day_of_week", ""))
+        end_time = format_task_datetime(task.get("end_time", ""), task.get("day_of_week", ""))
+    return {
+        "title": task.get("task_name") or task.get("name") or "Study Session",
+        "description": task.get("description", ""),
+        "start_time": start_time,
+        "end_time": end_time,
+        "time_zone": CALENDAR_TIME_ZONE
+    }
+
+def content_hash(event: Dict[str, Any]) -> str:
+    return hashlib.blake2b(json.dumps(event, sort_keys=True).encode(), digest_size=12).hexdigest()
+
+def plan_events(plan_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Desired events keyed by task; missed sessions are left off the calendar"""
+    tasks = plan_data.get("daily_study_plan") or plan_data.get("daily_tasks") or plan_data.get("tasks") or []
+    return {
+        task_key(task): task_event(task)
+        for task in tasks
+        if isinstance(task, dict) and task.get("status") != "missed"
+    }
+
+def diff_events(synced: Dict[str, List[str]], desired: Dict[str, Dict[str, Any]]) -> Tuple[List[str], List[str], List[str], int]:
+    """(keys to insert, keys to patch, keys to delete, unchanged count) against the synced map"""
+    inserts, patches, unchanged = [], [], 0
+    for key, event in desired.items():
+        entry = synced.get(key)
+        if entry is None:
+            inserts.append(key)
+        elif entry[1] != content_hash(event):
+            patches.append(key)
+        else:
+            unchanged += 1
+    deletes = [key for key in synced if key not in desired]
+    return inserts, patches, deletes, unchanged
+
+def find_conflicts(desired: Dict[str, Dict[str, Any]], busy: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Planned events that overlap each other or the student's busy times"""
+    conflicts = [
+        {"task": first, "conflicts_with": {"task": second}}
+        for first, second in find_overlaps((event["start_time"], event["end_time"], key) for key, event in desired.items())
+    ]
+    if busy:
+        index = IntervalIndex((item["start"], item["end"], item.get("title") or "Busy") for item in busy)
+        for key, event in desired.items():
+            for start, end, title in index.overlapping(event["start_time"], event["end_time"]):
+                conflicts.append({"task": key, "conflicts_with": {
+                    "busy": title,
+                    "start": datetime.datetime.fromtimestamp(start).isoformat(),
+                    "end": datetime.datetime.fromtimestamp(end).isoformat()
+                }})
+    return conflicts
+
+def sync_calendar(partition, plan_data: Dict[str, Any], token_data: Optional[Dict[str, Any]] = None,
+                  calendar_id: str = "primary", busy: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Bring the student's calendar in line with plan_data and update the map in
+    the partition (the caller saves it). Without token_data the calls are
+    simulated but the map is still kept, so results show what a real sync
+    would send. Failed calls leave their entry as it was, to retry next time.
+    Overlaps with busy times (default: the plan's own plan_inputs busy list)
+    and between sessions are reported under "conflicts".
+    """
+    state = partition.shared_context.get(SYNC_KEY) or {}
+    synced: Dict[str, List[str]] = dict(state.get("events", {}))
+    desired = plan_events(plan_data)
+    inserts, patches, deletes, unchanged = diff_events(synced, desired)
+    operations = [("insert", key) for key in inserts] + [("patch", key) for key in patches] + [("delete", key) for key in deletes]
+
+    live = bool(token_data and token_data.get("access_token"))
+    if live and operations:
+        from calendar_client import calendar_clients, event_body
+        service = calendar_clients.get(partition.user_id, token_data)
+        events_api = service.service.events()
+        requests = []
+        for operation, key in operations:
+            if operation == "insert":
+                requests.append(events_api.insert(calendarId=calendar_id, body=event_body(desired[key])))
+            elif operation == "patch":
+                requests.append(events_api.patch(calendarId=calendar_id, eventId=synced[key][0], body=event_body(desired[key])))
+            else:
+                requests.append(events_api.delete(calendarId=calendar_id, eventId=synced[key][0]))
+        results = service.execute_batch(requests)
+    else:
+        results = [{"response": {"id": f"demo-{key}"} if operation == "insert" else {}} for operation, key in operations]
+
+    errors = []
+    for (operation, key), result in zip(operations, results):
+        if "error" in result:
+            if result.get("http_status") in (404, 410):
+                # The event is gone from the calendar: forget it, so the next sync re-inserts if needed
+                synced.pop(key, None)
+            else:
+                errors.append({"operation": operation, "task": key, "error": result["error"]})
+            continue
+        if operation == "delete":
+            synced.pop(key, None)
+        else:
+            event_id = result["response"].get("id") if operation == "insert" else synced[key][0]
+            synced[key] = [event_id, content_hash(desired[key])]
+
+    partition.set(SYNC_KEY, {"events": synced, "calendar_id": calendar_id})
+    counts = {operation: sum(1 for op, _ in operations if op == operation) for operation in ("insert", "patch", "delete")}
+    return {
+        "status": "success" if not errors else "partial" if len(errors) < len(operations) else "error",
+        "message": f"Calendar synced: {counts['insert']} added, {counts['patch']} updated, {counts['delete']} removed, {unchanged} unchanged",
+        "events_created": counts["insert"],
+        "events_updated": counts["patch"],
+        "events_deleted": counts["delete"],
+        "events_unchanged": unchanged,
+        "api_calls": len(operations) if live else 0,
+        "errors": errors[:5],
+        "conflicts": find_conflicts(desired, plan_data.get("plan_inputs", {}).get("busy") if busy is None else busy),
+        "calendar_integration": "google" if live else "simulated"
+    }
@@ -0,0 +1,60 @@
+"""
+Injectable Clock for the Autonomous Agent System
+The blackboard, agents and scheduler read time through now()/sleep() here,
+so tests and simulations can swap in a VirtualClock and run days of agent
+activity in seconds
+"""
+import datetime
+import threading
+import time
+
+class SystemClock:
+    """Real wall-clock time"""
+
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+class VirtualClock:
+    """Deterministic clock that only moves when told to (sleep() advances it instantly)"""
+
+    def __init__(self, start: float = None):
+        self._now = time.time() if start is None else start
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    def advance(self, seconds: float):
+        with self._lock:
+            self._now += max(0.0, seconds)
+
+    def set_time(self, timestamp: float):
+        """Move forward to timestamp (never backwards)"""
+        with self._lock:
+            self._now = max(self._now, timestamp)
+
+_clock = SystemClock()
+
+def get_clock():
+    return _clock
+
+def set_clock(clock) -> object:
+    """Install a clock for the whole process and return the previous one"""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+def now() -> float:
+    return _clock.time()
+
+def sleep(seconds: float):
+    _clock.sleep(seconds)
+
+def today() -> datetime.date:
+    return datetime.date.fromtimestamp(_clock.time())
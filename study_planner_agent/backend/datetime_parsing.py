@@ -0,0 +1,143 @@
+"""
+Date and Time Parsing for Plans and Deadlines
+Precompiled regexes for the date and time formats tasks use, tried in the
+order that last worked for the same source (due dates, session times, ...),
+with repeated strings answered from an LRU memo instead of strptime chains
+"""
+import argparse
+import datetime
+import json
+import re
+import time
+from functools import lru_cache
+from typing import Dict, Optional
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%d-%m-%Y")
+TIME_FORMATS = ("%I:%M %p", "%H:%M")
+
+# (format, compiled pattern, group order) -- each pattern accepts what its strptime format accepts
+_DATE_PATTERNS = (
+    ("%Y-%m-%d", re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})"), (0, 1, 2)),
+    ("%m/%d/%Y", re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})"), (2, 0, 1)),
+    ("%d-%m-%Y", re.compile(r"(\d{1,2})-(\d{1,2})-(\d{4})"), (2, 1, 0)),
+)
+_TIME_PATTERNS = (
+    ("%I:%M %p", re.compile(r"(\d{1,2}):(\d{1,2})\s+([AaPp][Mm])")),
+    ("%H:%M", re.compile(r"(\d{1,2}):(\d{1,2})")),
+)
+
+# Source -> index of the pattern that parsed its last value
+_date_sniffed: Dict[str, int] = {}
+_time_sniffed: Dict[str, int] = {}
+
+def _ordered(patterns, sniffed: Dict[str, int], source: str):
+    first = sniffed.get(source, 0)
+    return [(first, patterns[first])] + [(i, p) for i, p in enumerate(patterns) if i != first]
+
+@lru_cache(maxsize=8192)
+def _parse_date_text(text: str, source: str) -> Optional[datetime.date]:
+    for i, (_, pattern, order) in _ordered(_DATE_PATTERNS, _date_sniffed, source):
+        match = pattern.fullmatch(text)
+        if match is None:
+            continue
+        parts = match.groups()
+        try:
+            parsed = datetime.date(int(parts[order[0]]), int(parts[order[1]]), int(parts[order[2]]))
+        except ValueError:
+            return None  # right shape, impossible date; the formats do not overlap
+        _date_sniffed[source] = i
+        return parsed
+    return None
+
+@lru_cache(maxsize=4096)
+def _parse_time_text(text: str, source: str) -> Optional[datetime.time]:
+    for i, (_, pattern) in _ordered(_TIME_PATTERNS, _time_sniffed, source):
+        match = pattern.fullmatch(text)
+        if match is None:
+            continue
+        hour, minute = int(match.group(1)), int(match.group(2))
+        if pattern.groups == 3:
+            if not 1 <= hour <= 12:
+                return None
+            hour = hour % 12 + (12 if match.group(3).lower() == "pm" else 0)
+        if hour > 23 or minute > 59:
+            return None
+        _time_sniffed[source] = i
+        return datetime.time(hour, minute)
+    return None
+
+def parse_date(value, source: str = "default") -> Optional[datetime.date]:
+    """A date in any of DATE_FORMATS (or a date/datetime), or None"""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if not isinstance(value, str) or not value:
+        return None
+    return _parse_date_text(value.strip(), source)
+
+def parse_time(value, source: str = "default") -> Optional[datetime.time]:
+    """A time of day in any of TIME_FORMATS, or None"""
+    if isinstance(value, datetime.time):
+        return value
+    if not isinstance(value, str) or not value:
+        return None
+    return _parse_time_text(value.strip(), source)
+
+def cache_info() -> Dict[str, Dict[str, int]]:
+    return {
+        "dates": _parse_date_text.cache_info()._asdict(),
+        "times": _parse_time_text.cache_info()._asdict()
+    }
+
+def _strptime_chain(value: str, formats) -> Optional[datetime.datetime]:
+    # The previous approach, kept for the benchmark
+    for parse_format in formats:
+        try:
+            return datetime.datetime.strptime(value.strip(), parse_format)
+        except ValueError:
+            continue
+    return None
+
+def benchmark(tasks: int = 20000, seed: int = 7) -> Dict[str, float]:
+    """Per-task cost (microseconds) of parsing a due date and start/end times, before and after"""
+    import random
+    rng = random.Random(seed)
+    start = datetime.date(2025, 1, 1)
+    rows = []
+    for _ in range(tasks):
+        day = start + datetime.timedelta(days=rng.randrange(120))
+        due = rng.choice([day.strftime("%Y-%m-%d"), day.strftime("%m/%d/%Y"), day.strftime("%d-%m-%Y")])
+        hour = rng.randrange(8, 20)
+        rows.append((due, f"{(hour - 1) % 12 + 1:02d}:{rng.choice(['00', '30'])} {'AM' if hour < 12 else 'PM'}",
+                     f"{hour + 1}:{rng.choice(['00', '30'])}"))
+
+    began = time.perf_counter()
+    for due, start_time, end_time in rows:
+        _strptime_chain(due, DATE_FORMATS)
+        _strptime_chain(start_time, TIME_FORMATS)
+        _strptime_chain(end_time, TIME_FORMATS)
+    strptime_seconds = time.perf_counter() - began
+
+    _parse_date_text.cache_clear()
+    _parse_time_text.cache_clear()
+    began = time.perf_counter()
+    for due, start_time, end_time in rows:
+        parse_date(due, "benchmark")
+        parse_time(start_time, "benchmark")
+        parse_time(end_time, "benchmark")
+    parsed_seconds = time.perf_counter() - began
+
+    return {
+        "tasks": tasks,
+        "strptime_us_per_task": round(1e6 * strptime_seconds / tasks, 3),
+        "parsing_us_per_task": round(1e6 * parsed_seconds / tasks, 3),
+        "speedup": round(strptime_seconds / parsed_seconds, 1) if parsed_seconds else None,
+        "cache": cache_info()
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark task date/time parsing")
+    parser.add_argument("--tasks", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.tasks), indent=2))
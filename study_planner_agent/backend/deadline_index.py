@@ -0,0 +1,165 @@
+"""
+Deadline Index with Threshold Timers
+Task due dates are parsed once when a student's tasks are stored, and each
+task gets timers for the "3 days / 2 days / 1 day left" thresholds in one
+heap, so the task scheduler wakes exactly when an alert is due
+"""
+import datetime
+import heapq
+import itertools
+import threading
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+import clock
+from datetime_parsing import parse_date
+
+THRESHOLDS = (3, 2, 1)  # days left, loosest first
+
+def parse_due_date(value) -> Optional[datetime.date]:
+    """Parse a task due date in any of the accepted formats, or None"""
+    return parse_date(value, "due_date")
+
+def extract_tasks(tasks_data) -> List[Dict[str, Any]]:
+    """
+    Task dicts from stored current_tasks, which is either a list of tasks or
+    the task manager's JSON object with a "tasks" list in it
+    """
+    if isinstance(tasks_data, dict):
+        tasks_data = tasks_data.get("tasks", [])
+    if not isinstance(tasks_data, list):
+        return []
+    return [task for task in tasks_data if isinstance(task, dict)]
+
+def urgency_for(days_left: int) -> str:
+    return "critical" if days_left <= 1 else "urgent" if days_left <= 2 else "upcoming"
+
+def _midnight(day: datetime.date) -> float:
+    return datetime.datetime.combine(day, datetime.time()).timestamp()
+
+class _Deadline:
+    __slots__ = ("user_id", "title", "due_date", "subject", "generation")
+
+    def __init__(self, user_id: str, title: str, due_date: datetime.date, subject: Optional[str], generation: int):
+        self.user_id = user_id
+        self.title = title
+        self.due_date = due_date
+        self.subject = subject
+        self.generation = generation
+
+class DeadlineIndex:
+    """
+    Heap of (fire_at, seq, key, days_left, generation) threshold timers.
+    set_tasks() costs O(log N) per new task; tasks that are unchanged keep
+    their timers, removed ones leave stale heap items that are skipped (and
+    compacted away once they outnumber the live ones). A task already inside
+    a threshold when added fires that threshold immediately, once.
+    on_earliest(fire_at) is called when a new timer becomes the next one due.
+    """
+
+    def __init__(self, on_earliest: Optional[Callable[[float], None]] = None):
+        self.on_earliest = on_earliest
+        self._heap: List[Tuple[float, int, Tuple[str, str, str], int, int]] = []
+        self._deadlines: Dict[Tuple[str, str, str], _Deadline] = {}
+        self._user_keys: Dict[str, set] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.unparsed = 0
+
+    def set_tasks(self, user_id: str, tasks: List[Dict[str, Any]]) -> int:
+        """Replace the indexed tasks of one student; returns how many have a due date"""
+        today = clock.today()
+        now = clock.now()
+        earliest = None
+        with self._lock:
+            previous = self._user_keys.get(user_id, set())
+            keys = set()
+            for task in tasks:
+                due_date = parse_due_date(task.get("due_date") or task.get("deadline"))
+                if due_date is None:
+                    if task.get("due_date") or task.get("deadline"):
+                        self.unparsed += 1
+                    continue
+                title = task.get("title") or task.get("task") or task.get("name") or "Unnamed task"
+                key = (user_id, title, due_date.isoformat())
+                keys.add(key)
+                if key in previous:
+                    continue
+
+                deadline = _Deadline(user_id, title, due_date, task.get("subject"), next(self._counter))
+                self._deadlines[key] = deadline
+                days_left = (due_date - today).days
+                # Tightest threshold the task is already inside, which alerts once, right away
+                current = max(days_left, min(THRESHOLDS))
+                for threshold in THRESHOLDS:
+                    if days_left > threshold:
+                        fire_at = _midnight(due_date - datetime.timedelta(days=threshold))
+                    elif threshold == current:
+                        fire_at = now
+                    else:
+                        continue
+                    heapq.heappush(self._heap, (fire_at, next(self._counter), key, threshold, deadline.generation))
+                    if earliest is None or fire_at < earliest:
+                        earliest = fire_at
+
+            for key in previous - keys:
+                del self._deadlines[key]
+            if keys:
+                self._user_keys[user_id] = keys
+            else:
+                self._user_keys.pop(user_id, None)
+            if len(self._heap) > 64 + 4 * len(self._deadlines):
+                self._compact()
+
+        if earliest is not None and self.on_earliest is not None and earliest <= self.next_due():
+            self.on_earliest(earliest)
+        return len(keys)
+
+    def _compact(self):
+        self._heap = [item for item in self._heap if self._live(item)]
+        heapq.heapify(self._heap)
+
+    def _live(self, item) -> bool:
+        deadline = self._deadlines.get(item[2])
+        return deadline is not None and deadline.generation == item[4]
+
+    def next_due(self) -> Optional[float]:
+        """When the next threshold timer fires, or None"""
+        with self._lock:
+            while self._heap and not self._live(self._heap[0]):
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Alerts for every threshold timer due by now, earliest first"""
+        now = clock.now() if now is None else now
+        today = datetime.date.fromtimestamp(now)
+        alerts = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                item = heapq.heappop(self._heap)
+                if not self._live(item):
+                    continue
+                deadline = self._deadlines[item[2]]
+                days_left = (deadline.due_date - today).days
+                alerts.append({
+                    "user_id": deadline.user_id,
+                    "task": deadline.title,
+                    "subject": deadline.subject,
+                    "days_left": days_left,
+                    "due_date": deadline.due_date.strftime("%Y-%m-%d"),
+                    "urgency": urgency_for(days_left)
+                })
+        return alerts
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def stats(self) -> Dict[str, Any]:
+        next_due = self.next_due()
+        return {
+            "tasks": len(self._deadlines),
+            "students": len(self._user_keys),
+            "timers": len(self._heap),
+            "next_due_in": None if next_due is None else max(0.0, next_due - clock.now()),
+            "unparsed_dates": self.unparsed
+        }
@@ -3,10 +3,12 @@ import json
 import base64
 import io
 from typing import Dict, Any, List
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
 import os
 
+import clock
+from datetime_parsing import parse_time
+from deadline_index import parse_due_date, urgency_for
+
 # Add PDF processing imports
 try:
     import pypdf
@@ -96,11 +98,44 @@ def generate_productivity_recommendations(score: float, status: str) -> List[str
     
     return recommendations
 
+PRODUCTIVITY_STATUSES = ("low", "good", "excellent")
+
+def analyze_productivity_batch(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    analyze_productivity over a whole class at once: scores and statuses are
+    computed as arrays, and each status's recommendations are built once and
+    shared. Each result also carries the score's z-score within the class.
+    """
+    import numpy as np
+
+    completed = np.array([row.get("completed_tasks", 0) for row in rows], dtype=np.float64)
+    total = np.array([row.get("total_tasks", 1) for row in rows], dtype=np.float64)
+    scores = np.round(np.divide(completed, total, out=np.zeros_like(completed), where=total > 0), 2)
+    status_index = (scores >= 0.5).astype(np.int8) + (scores >= 0.75)
+    spread = scores.std() if len(scores) else 0.0
+    z_scores = (scores - scores.mean()) / spread if spread > 0 else np.zeros_like(scores)
+
+    recommendations = {status: generate_productivity_recommendations(0.0, status) for status in PRODUCTIVITY_STATUSES}
+    results = []
+    for score, index, z_score, remaining in zip(scores.tolist(), status_index.tolist(), z_scores.tolist(),
+                                                (total - completed).astype(int).tolist()):
+        status = PRODUCTIVITY_STATUSES[index]
+        results.append({
+            "productivity_score": score,
+            "status": status,
+            "insight": "Student is highly consistent" if status == "excellent" else "Needs better focus and consistency",
+            "recommendations": recommendations[status],
+            "completion_percentage": score * 100,
+            "tasks_remaining": remaining,
+            "z_score": round(z_score, 2)
+        })
+    return results
+
 def check_upcoming_deadlines(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Enhanced deadline checking with better date parsing and urgency levels.
     """
-    today = datetime.date.today()
+    today = clock.today()
     alerts = []
 
     for task in data.get("tasks", []):
@@ -109,28 +144,19 @@ def check_upcoming_deadlines(data: Dict[str, Any]) -> Dict[str, Any]:
             continue
 
         try:
-            # Try different date formats
-            try:
-                due_date = datetime.datetime.strptime(due_date_str, "%Y-%m-%d").date()
-            except ValueError:
-                try:
-                    due_date = datetime.datetime.strptime(due_date_str, "%m/%d/%Y").date()
-                except ValueError:
-                    try:
-                        due_date = datetime.datetime.strptime(due_date_str, "%d-%m-%Y").date()
-                    except ValueError:
-                        print(f"Warning: Could not parse date format: {due_date_str}")
-                        continue
+            due_date = parse_due_date(due_date_str)
+            if due_date is None:
+                print(f"Warning: Could not parse date format: {due_date_str}")
+                continue
             
             days_left = (due_date - today).days
 
             if days_left <= 3:
-                urgency = "critical" if days_left <= 1 else "urgent" if days_left <= 2 else "upcoming"
                 alerts.append({
                     "task": task.get("title", "Unnamed task"),
                     "days_left": days_left,
                     "due_date": due_date.strftime("%Y-%m-%d"),
-                    "urgency": urgency
+                    "urgency": urgency_for(days_left)
                 })
         except Exception as e:
             print(f"Error processing task deadline: {e}")
@@ -213,76 +239,6 @@ def log_agent_action(data: Dict[str, Any]) -> Dict[str, str]:
         "agent": data.get("agent", "unknown")
     }
 
-def create_calendar_events_from_study_plan(study_plan_data: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Enhanced Google Calendar integration - creates events from study plan.
-    Handles both simple and complex JSON structures.
-    """
-    try:
-        # Parse study plan data
-        if isinstance(study_plan_data, str):
-            plan_data = json.loads(study_plan_data)
-        else:
-            plan_data = study_plan_data
-        
-        # Extract tasks from different possible structures
-        tasks = []
-        
-        if "daily_study_plan" in plan_data:
-            # Handle complex structure
-            tasks = plan_data["daily_study_plan"]
-        elif "daily_tasks" in plan_data:
-            tasks = plan_data["daily_tasks"]
-        elif "tasks" in plan_data:
-            tasks = plan_data["tasks"]
-        else:
-            return {"status": "error", "message": "No tasks found in study plan"}
-        
-        # For demo mode, simulate calendar creation
-        created_events = []
-        for task in tasks:
-            # Handle different task structures
-            if "task_name" in task:
-                # Complex structure
-                event_data = {
-                    "id": task.get("task_id", len(created_events) + 1),
-                    "title": task.get("task_name", "Study Session"),
-                    "description": task.get("description", ""),
-                    "start_time": format_task_datetime(task.get("start_time", ""), task.get("day_of_week", "")),
-                    "end_time": format_task_datetime(task.get("end_time", ""), task.get("day_of_week", "")),
-                    "duration": task.get("estimated_duration_minutes", 60),
-                    "priority": task.get("priority", "Medium"),
-                    "category": task.get("category", "Study"),
-                    "day": task.get("day_of_week", "Unscheduled")
-                }
-            else:
-                # Simple structure
-                event_data = {
-                    "id": task.get("id", len(created_events) + 1),
-                    "title": task.get("name", "Study Session"),
-                    "description": task.get("description", ""),
-                    "start_time": parse_task_time(task.get("deadline", "")),
-                    "duration": task.get("estimated_duration_minutes", 60),
-                    "priority": task.get("priority", "Medium"),
-                    "category": task.get("category", "Study")
-                }
-            
-            created_events.append(event_data)
-        
-        return {
-            "status": "success",
-            "message": f"Created {len(created_events)} calendar events",
-            "events_created": len(created_events),
-            "events": created_events[:5],  # Return first 5 for preview
-            "calendar_integration": "simulated"  # In demo mode
-        }
-        
-    except Exception as e:
-        return {
-            "status": "error",
-            "message": f"Failed to create calendar events: {str(e)}"
-        }
-
 def format_task_datetime(time_str: str, day_str: str) -> str:
     """
     Format task time and day into ISO datetime string.
@@ -309,14 +265,8 @@ def format_task_datetime(time_str: str, day_str: str) -> str:
         
         target_date = today + datetime.timedelta(days=days_ahead)
         
-        # Parse time (assuming format like "09:00 AM")
-        try:
-            time_obj = datetime.datetime.strptime(time_str, "%I:%M %p").time()
-        except ValueError:
-            try:
-                time_obj = datetime.datetime.strptime(time_str, "%H:%M").time()
-            except ValueError:
-                time_obj = datetime.time(9, 0)  # Default to 9:00 AM
+        # Parse time (assuming format like "09:00 AM"), defaulting to 9:00 AM
+        time_obj = parse_time(time_str, "task_time") or datetime.time(9, 0)
         
         # Combine date and time
         result_datetime = datetime.datetime.combine(target_date.date(), time_obj)
@@ -325,26 +275,6 @@ def format_task_datetime(time_str: str, day_str: str) -> str:
     except Exception:
         return datetime.datetime.now().isoformat()
 
-def parse_task_time(deadline_str: str) -> str:
-    """
-    Parse task deadline string into ISO format datetime.
-    """
-    if not deadline_str:
-        return datetime.datetime.now().isoformat()
-    
-    try:
-        # Handle formats like "Monday 09:00 AM - 10:30 AM"
-        if " - " in deadline_str:
-            start_part = deadline_str.split(" - ")[0]
-            # For demo, create a datetime for next occurrence of the day
-            today = datetime.datetime.now()
-            # Simple parsing - in production, use more sophisticated date parsing
-            return (today + datetime.timedelta(days=1)).replace(hour=9, minute=0).isoformat()
-        else:
-            return datetime.datetime.now().isoformat()
-    except:
-        return datetime.datetime.now().isoformat()
-
 def create_calendar_event(data: dict) -> Dict[str, Any]:
     """
     Creates a single Google Calendar event.
@@ -362,36 +292,11 @@ def create_calendar_event(data: dict) -> Dict[str, Any]:
                 "mode": "demo"
             }
         
-        # Real Google Calendar integration
-        creds = Credentials(
-            token=data["access_token"],
-            refresh_token=data.get("refresh_token"),
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=data.get("client_id"),
-            client_secret=data.get("client_secret"),
-            scopes=["https://www.googleapis.com/auth/calendar"]
-        )
-
-        service = build("calendar", "v3", credentials=creds)
-
-        event = {
-            "summary": data.get("title", "Study Session"),
-            "description": data.get("description", ""),
-            "start": {"dateTime": data["start_time"]},
-            "end": {"dateTime": data["end_time"]},
-            "reminders": {
-                "useDefault": False,
-                "overrides": [
-                    {"method": "popup", "minutes": 15},
-                    {"method": "email", "minutes": 60}
-                ]
-            }
-        }
-
-        created_event = service.events().insert(
-            calendarId="primary",
-            body=event
-        ).execute()
+        # Real Google Calendar integration, through the user's cached service
+        from calendar_client import calendar_clients, event_body
+        
+        event = event_body(data)
+        created_event = calendar_clients.get(data["user_id"], data).insert_event(data, body=event)
 
         return {
             "event_id": created_event["id"],
@@ -0,0 +1,127 @@
+"""
+Topic-based Pub/Sub for Blackboard Events
+Agents subscribe to event types or wildcard patterns; each posted event is
+routed through a per-topic dispatch table into bounded subscriber queues
+"""
+import fnmatch
+import threading
+from collections import deque
+from typing import Dict, Any, List, Callable, Optional, Tuple
+
+class Subscription:
+    """
+    One subscriber's inbox. Events are queued up to max_queue; when full the
+    oldest queued event is dropped (or the new one, with drop_newest=True)
+    and counted, so a slow agent can never block or bloat the publisher.
+    An optional handler runs inline at publish time for cheap reactions.
+    """
+
+    def __init__(self, name: str, patterns: Tuple[str, ...],
+                 handler: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 max_queue: int = 100, drop_newest: bool = False):
+        self.name = name
+        self.patterns = patterns
+        self.handler = handler
+        self.max_queue = max_queue
+        self.drop_newest = drop_newest
+        self.delivered = 0
+        self.dropped = 0
+        self._queue: deque = deque()
+        self._lock = threading.Lock()
+
+    def deliver(self, event: Dict[str, Any], inline: bool = True):
+        if self.handler is not None:
+            if inline:
+                self.handler(event)
+                self.delivered += 1
+            return
+
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                if self.drop_newest:
+                    return
+                self._queue.popleft()
+            self._queue.append(event)
+            self.delivered += 1
+
+    def drain(self, max_items: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Take queued events (oldest first) off the inbox"""
+        with self._lock:
+            count = len(self._queue) if max_items is None else min(max_items, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "patterns": list(self.patterns),
+            "pending": self.pending(),
+            "max_queue": self.max_queue,
+            "delivered": self.delivered,
+            "dropped": self.dropped
+        }
+
+class EventBus:
+    """
+    Dispatch table from event type to subscribers. Exact topics are a dict
+    lookup; wildcard patterns are resolved once per new topic and cached, so
+    publishing costs one dict lookup plus one append per interested subscriber.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[str, Subscription] = {}
+        self._routes: Dict[str, Tuple[Subscription, ...]] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, name: str, patterns, handler: Optional[Callable[[Dict[str, Any]], None]] = None,
+                  max_queue: int = 100, drop_newest: bool = False) -> Subscription:
+        """Subscribe name to one pattern or a list of patterns (fnmatch wildcards allowed)"""
+        if isinstance(patterns, str):
+            patterns = (patterns,)
+        subscription = Subscription(name, tuple(patterns), handler, max_queue, drop_newest)
+        with self._lock:
+            self._subscriptions[name] = subscription
+            self._routes = {}
+        return subscription
+
+    def unsubscribe(self, name: str):
+        with self._lock:
+            self._subscriptions.pop(name, None)
+            self._routes = {}
+
+    def _resolve(self, topic: str) -> Tuple[Subscription, ...]:
+        with self._lock:
+            route = tuple(
+                subscription for subscription in self._subscriptions.values()
+                if any(fnmatch.fnmatchcase(topic, pattern) for pattern in subscription.patterns)
+            )
+            self._routes[topic] = route
+            return route
+
+    def publish(self, event: Dict[str, Any], inline: bool = True) -> int:
+        """
+        Route an event to its subscribers and return how many were reached.
+        inline=False skips inline handlers (used when re-delivering events
+        whose reactions already ran in another process).
+        """
+        route = self._routes.get(event["type"])
+        if route is None:
+            route = self._resolve(event["type"])
+
+        self.published += 1
+        for subscription in route:
+            try:
+                subscription.deliver(event, inline)
+            except Exception as e:
+                print(f"Error delivering {event['type']} to {subscription.name}: {e}")
+        return len(route)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "published": self.published,
+            "topics_routed": len(self._routes),
+            "subscribers": {name: sub.stats() for name, sub in self._subscriptions.items()}
+        }
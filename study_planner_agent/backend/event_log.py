@@ -0,0 +1,126 @@
+"""
+Time-Indexed Event History
+Keeps blackboard events sorted by timestamp with per-type and per-source
+indexes so time-range queries are bisect lookups, plus a replay utility
+"""
+import bisect
+import threading
+from collections.abc import Sequence
+from typing import Dict, Any, List, Optional
+
+class EventLog(Sequence):
+    """
+    Append-only, list-compatible event history. Every event gets a sequence
+    id ("id") that doubles as the pagination cursor. Timestamps are indexed
+    in a parallel sorted list (out-of-order clocks are clamped so the index
+    stays sorted and appends stay O(1)). The oldest events are trimmed in
+    chunks once max_events is exceeded.
+    """
+
+    def __init__(self, max_events: int = 1_000_000):
+        self.max_events = max_events
+        self._events: List[Dict[str, Any]] = []
+        self._timestamps: List[float] = []
+        self._by_type: Dict[str, List[int]] = {}
+        self._by_source: Dict[str, List[int]] = {}
+        self._base = 0  # sequence id of self._events[0]
+        self._lock = threading.Lock()
+
+    def append(self, event: Dict[str, Any]):
+        with self._lock:
+            seq = self._base + len(self._events)
+            event["id"] = seq
+            timestamp = event["timestamp"]
+            if self._timestamps and timestamp < self._timestamps[-1]:
+                timestamp = self._timestamps[-1]
+            self._events.append(event)
+            self._timestamps.append(timestamp)
+            self._by_type.setdefault(event["type"], []).append(seq)
+            self._by_source.setdefault(event["source"], []).append(seq)
+
+            if len(self._events) > self.max_events:
+                self._trim(max(1, self.max_events // 10))
+
+    def extend(self, events: List[Dict[str, Any]]):
+        for event in events:
+            self.append(event)
+
+    def _trim(self, count: int):
+        del self._events[:count]
+        del self._timestamps[:count]
+        self._base += count
+        for index in (self._by_type, self._by_source):
+            for key in list(index):
+                seqs = index[key]
+                del seqs[:bisect.bisect_left(seqs, self._base)]
+                if not seqs:
+                    del index[key]
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __getitem__(self, index):
+        return self._events[index]
+
+    def __iter__(self):
+        return iter(list(self._events))
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None,
+              event_type: Optional[str] = None, source: Optional[str] = None,
+              cursor: Optional[int] = None, limit: int = 100) -> Dict[str, Any]:
+        """
+        Events with since <= timestamp < until, optionally filtered by type and
+        source, oldest first. Pass the returned next_cursor to get the next page.
+        """
+        with self._lock:
+            # Time range -> sequence range [lo, hi)
+            lo = self._base if since is None else self._base + bisect.bisect_left(self._timestamps, since)
+            hi = self._base + len(self._events)
+            if until is not None:
+                hi = self._base + bisect.bisect_left(self._timestamps, until)
+            if cursor is not None:
+                lo = max(lo, cursor)
+
+            if event_type is None and source is None:
+                seqs = range(lo, min(hi, lo + limit + 1))
+            else:
+                # Walk the narrower index and check the other filter per event
+                candidates = []
+                if event_type is not None:
+                    candidates.append(self._by_type.get(event_type, []))
+                if source is not None:
+                    candidates.append(self._by_source.get(source, []))
+                index = min(candidates, key=len)
+                seqs = []
+                for position in range(bisect.bisect_left(index, lo), bisect.bisect_left(index, hi)):
+                    seq = index[position]
+                    event = self._events[seq - self._base]
+                    if (event_type is None or event["type"] == event_type) and \
+                            (source is None or event["source"] == source):
+                        seqs.append(seq)
+                        if len(seqs) > limit:
+                            break
+
+            page = [self._events[seq - self._base] for seq in seqs]
+
+        next_cursor = page[limit]["id"] if len(page) > limit else None
+        return {"events": page[:limit], "next_cursor": next_cursor}
+
+def replay_events(board, since: Optional[float] = None, until: Optional[float] = None,
+                  event_type: Optional[str] = None, source: Optional[str] = None,
+                  page_size: int = 500) -> int:
+    """
+    Feed a recorded range of events back through the blackboard's event bus
+    so agents react to them again. Replayed events are marked "replayed" and
+    are not appended to the history a second time.
+    """
+    replayed = 0
+    cursor = None
+    while True:
+        page = board.events.query(since, until, event_type, source, cursor, page_size)
+        for event in page["events"]:
+            board.bus.publish(dict(event, replayed=True))
+            replayed += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return replayed
@@ -0,0 +1,93 @@
+"""
+Conditional GETs for Blackboard Views
+Views such as /system-status are built and serialized once per blackboard
+version, compressed once per encoding, and answered with 304 Not Modified
+when the client already holds the current version (ETag / If-None-Match)
+"""
+import gzip
+import json
+import os
+import secrets
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+MIN_COMPRESS_BYTES = int(os.getenv("HTTP_MIN_COMPRESS_BYTES", "1024"))
+# Part of every ETag: versions count per process, so a tag from another worker never validates here
+INSTANCE_ID = secrets.token_hex(4)
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """"br" or "gzip" if the client accepts it (br only with the brotli package installed)"""
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if "br" in accepted and _brotli() is not None:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+class VersionedView:
+    """
+    One view's response body, rebuilt only when the version it was built
+    at changes. Compressed variants are made on first request and kept
+    until the next rebuild. build() must only return state that changes
+    with the version (no timings, counters or worker identity), or a 304
+    would keep serving stale values.
+    """
+
+    def __init__(self, name: str, build: Callable[[], Dict[str, Any]], instance_id: str = INSTANCE_ID):
+        self.name = name
+        self.build = build
+        self.instance_id = instance_id
+        self._version: Optional[int] = None
+        self._bodies: Dict[Optional[str], bytes] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.not_modified = 0
+
+    def etag(self, version: int) -> str:
+        return f'"{self.name}-{self.instance_id}-{version}"'
+
+    def body(self, version: int, encoding: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+        """(body, content encoding) for this version, building and compressing at most once each"""
+        with self._lock:
+            if self._version != version:
+                payload = json.dumps(self.build(), default=str).encode()
+                self._version, self._bodies = version, {None: payload}
+                self.builds += 1
+            raw = self._bodies[None]
+            if encoding is None or len(raw) < MIN_COMPRESS_BYTES:
+                return raw, None
+            if encoding not in self._bodies:
+                if encoding == "br":
+                    self._bodies[encoding] = _brotli().compress(raw, quality=5)
+                else:
+                    self._bodies[encoding] = gzip.compress(raw, compresslevel=6)
+            return self._bodies[encoding], encoding
+
+    def respond(self, request: Request, version: int) -> Response:
+        etag = self.etag(version)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        body, encoding = self.body(version, negotiate_encoding(request.headers.get("accept-encoding", "")))
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"version": self._version, "builds": self.builds, "not_modified": self.not_modified}
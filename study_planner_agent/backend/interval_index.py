@@ -0,0 +1,142 @@
+"""
+Interval Index for Sessions and Calendar Events
+Half-open [start, end) intervals sorted by start, with each node of the
+implicit balanced tree over that order holding the latest end below it, so
+overlap queries skip whole subtrees. Used for conflict checks and free-slot
+search over busy calendars and planned sessions
+"""
+import bisect
+import datetime
+from typing import Any, Iterable, List, Optional, Tuple
+
+Interval = Tuple[float, float, Any]
+
+def to_timestamp(value) -> float:
+    """Epoch seconds for a timestamp, datetime or ISO string (naive values are local time)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value.timestamp()
+
+class IntervalIndex:
+    """
+    overlapping() costs O((k + 1) log n) for k results. Intervals added
+    after the last build go to a small unsorted buffer that is scanned
+    linearly and merged into the tree once it outgrows ~sqrt(n).
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[Any, Any, Any]] = ()):
+        self._starts: List[float] = []
+        self._ends: List[float] = []
+        self._items: List[Any] = []
+        self._subtree_end: List[float] = []
+        self._pending: List[Interval] = []
+        for interval in intervals:
+            start, end = interval[0], interval[1]
+            self._pending.append((to_timestamp(start), to_timestamp(end), interval[2] if len(interval) > 2 else None))
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self._starts) + len(self._pending)
+
+    def add(self, start, end, item: Any = None):
+        start, end = to_timestamp(start), to_timestamp(end)
+        if end <= start:
+            return
+        self._pending.append((start, end, item))
+        if len(self._pending) > max(32, int(len(self._starts) ** 0.5)):
+            self._build()
+
+    def _build(self):
+        intervals = sorted(
+            [interval for interval in zip(self._starts, self._ends, self._items)]
+            + [interval for interval in self._pending if interval[1] > interval[0]],
+            key=lambda interval: (interval[0], interval[1])
+        )
+        self._starts = [interval[0] for interval in intervals]
+        self._ends = [interval[1] for interval in intervals]
+        self._items = [interval[2] for interval in intervals]
+        self._pending = []
+        # subtree_end[mid] = latest end in the implicit subtree rooted at mid
+        self._subtree_end = list(self._ends)
+        order = []
+        stack = [(0, len(intervals))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            order.append((lo, mid, hi))
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+        for lo, mid, hi in reversed(order):
+            if lo < mid:
+                self._subtree_end[mid] = max(self._subtree_end[mid], self._subtree_end[(lo + mid) // 2])
+            if mid + 1 < hi:
+                self._subtree_end[mid] = max(self._subtree_end[mid], self._subtree_end[(mid + 1 + hi) // 2])
+
+    def overlapping(self, start, end) -> List[Interval]:
+        """Intervals overlapping [start, end), ordered by start"""
+        start, end = to_timestamp(start), to_timestamp(end)
+        limit = bisect.bisect_left(self._starts, end)  # only these can start before `end`
+        found = []
+        stack = [(0, len(self._starts))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi or lo >= limit:
+                continue
+            mid = (lo + hi) // 2
+            if self._subtree_end[mid] <= start:
+                continue  # nothing below here ends after `start`
+            stack.append((lo, mid))
+            if mid < limit:
+                if self._ends[mid] > start:
+                    found.append(mid)
+                stack.append((mid + 1, hi))
+        result = [(self._starts[i], self._ends[i], self._items[i]) for i in sorted(found)]
+        pending = [interval for interval in self._pending if interval[0] < end and interval[1] > start]
+        if pending:
+            result = sorted(result + pending, key=lambda interval: (interval[0], interval[1]))
+        return result
+
+    def is_free(self, start, end) -> bool:
+        return not self.overlapping(start, end)
+
+    def free_slots(self, window_start, window_end, min_length: float = 0.0) -> List[Tuple[float, float]]:
+        """Gaps of at least min_length seconds between busy intervals inside the window"""
+        window_start, window_end = to_timestamp(window_start), to_timestamp(window_end)
+        slots = []
+        cursor = window_start
+        for start, end, _ in self.overlapping(window_start, window_end):
+            if start - cursor >= max(min_length, 1e-9):
+                slots.append((cursor, start))
+            cursor = max(cursor, end)
+        if window_end - cursor >= max(min_length, 1e-9):
+            slots.append((cursor, window_end))
+        return slots
+
+    def next_free(self, start, length: float, limit=None) -> Optional[float]:
+        """Earliest time >= start at which `length` seconds are free (and end by `limit`), or None"""
+        start = to_timestamp(start)
+        limit = None if limit is None else to_timestamp(limit)
+        while limit is None or start + length <= limit:
+            clashes = self.overlapping(start, start + length)
+            if not clashes:
+                return start
+            start = max(end for _, end, _ in clashes)
+        return None
+
+def find_overlaps(intervals: Iterable[Tuple[Any, Any, Any]]) -> List[Tuple[Any, Any]]:
+    """Pairs of items whose intervals overlap, by a sweep over starts (O(n log n + k))"""
+    ordered = sorted(
+        ((to_timestamp(interval[0]), to_timestamp(interval[1]), interval[2]) for interval in intervals),
+        key=lambda interval: interval[0]
+    )
+    active: List[Interval] = []
+    pairs = []
+    for start, end, item in ordered:
+        active = [interval for interval in active if interval[1] > start]
+        pairs.extend((other, item) for _, _, other in active)
+        active.append((start, end, item))
+    return pairs
@@ -0,0 +1,96 @@
+"""
+Leader Election for Autonomous Agent Loops
+Uses an exclusive lock on a local file so that exactly one worker process
+per deployment runs the autonomous agents; the OS drops the lock when the
+leader dies. The lock file sits next to the deployment's blackboard database,
+so separate deployments on one host elect their own leaders
+"""
+import os
+import threading
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+def default_lock_path() -> str:
+    """Lock file beside the blackboard database named by BLACKBOARD_DB_PATH"""
+    return os.path.abspath(os.getenv("BLACKBOARD_DB_PATH", "blackboard.db")) + ".agents.lock"
+
+class LeaderElector:
+    """
+    Tries to take the lock file on start(); if another process holds it, a
+    standby thread retries every retry_interval seconds, so a dead leader is
+    replaced within that bound. on_elected runs once this process becomes leader.
+    """
+
+    def __init__(self, on_elected: Callable[[], None],
+                 on_demoted: Optional[Callable[[], None]] = None,
+                 lock_path: Optional[str] = None,
+                 retry_interval: float = 5.0):
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.lock_path = lock_path or default_lock_path()
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self._fd: Optional[int] = None
+        self._stop = threading.Event()
+        self._standby: Optional[threading.Thread] = None
+
+    def _try_acquire(self) -> bool:
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+
+        # Record the leader pid for operators; the lock itself is what matters
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def _become_leader(self):
+        self.is_leader = True
+        print(f"🗳️ Process {os.getpid()} elected leader for autonomous agents")
+        self.on_elected()
+
+    def _standby_loop(self):
+        while not self._stop.wait(self.retry_interval):
+            if self._try_acquire():
+                self._become_leader()
+                return
+
+    def start(self) -> bool:
+        """Attempt election now; fall back to standby. Returns True if elected."""
+        if self._try_acquire():
+            self._become_leader()
+            return True
+
+        self._standby = threading.Thread(target=self._standby_loop, daemon=True)
+        self._standby.start()
+        return False
+
+    def stop(self):
+        """Leave the election, releasing the lock if this process holds it"""
+        self._stop.set()
+        if self._fd is None:
+            return
+
+        if self.on_demoted:
+            self.on_demoted()
+        if fcntl:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            # msvcrt locks from the current position; the pid write moved it past byte 0
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        os.close(self._fd)
+        self._fd = None
+        self.is_leader = False
@@ -1,22 +1,28 @@
-import os
+import json
+from contextlib import asynccontextmanager
 from typing import List, Optional, Dict, Any
 
 from fastapi import FastAPI, Depends, HTTPException, Request
-from fastapi.responses import RedirectResponse
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import RedirectResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-# Firebase
-import firebase_admin
-from firebase_admin import credentials, auth as firebase_auth
-
 # Google OAuth / Calendar
 from google_auth_oauthlib.flow import Flow
 from google.oauth2.credentials import Credentials
 
-# Agents
-from agent import orchestrator
+# Agents (built in the lifespan hook below, not at import)
+import agent
+from agent import get_orchestrator
+from rag.chroma_client import chroma
+from startup import init_concurrently
+
+# Firebase (initialized once per process; verified tokens are cached until they expire)
+from auth import firebase, verify_firebase_token, revoke_user, issue_stream_ticket, verify_stream_ticket, STREAM_TICKET_TTL
+from status_stream import sse_events
+from http_cache import VersionedView, MIN_COMPRESS_BYTES
+from responses import PLAN_FIELDS, REPLAN_FIELDS, contract_response
 
 # --------------------------------------------------
 # ENV
@@ -26,30 +32,25 @@ load_dotenv()
 # --------------------------------------------------
 # APP
 # --------------------------------------------------
-app = FastAPI(
-    title="Agentic AI Productivity Backend",
-    version="1.0.0"
-)
-
 BASE_URL = "http://localhost:8000"
 
-# --------------------------------------------------
-# FIREBASE AUTH (SECURE)
-# --------------------------------------------------
-cred = credentials.Certificate(
-    os.getenv("FIREBASE_SERVICE_ACCOUNT")
-)
-firebase_admin.initialize_app(cred)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Independent clients come up in parallel, each timed against its budget
+    app.state.startup_report = init_concurrently(
+        [firebase, agent.gemini, chroma, agent.orchestrator_component]
+    )
+    yield
+    get_orchestrator().shutdown()
 
-security = HTTPBearer()
+app = FastAPI(
+    title="Agentic AI Productivity Backend",
+    version="1.0.0",
+    lifespan=lifespan
+)
 
-def verify_firebase_token(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-):
-    try:
-        return firebase_auth.verify_id_token(credentials.credentials)
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid Firebase token")
+# Compress larger responses (views cached by VersionedView arrive already compressed)
+app.add_middleware(GZipMiddleware, minimum_size=MIN_COMPRESS_BYTES)
 
 # --------------------------------------------------
 # GOOGLE CALENDAR OAUTH
@@ -71,9 +72,24 @@ class Subject(BaseModel):
     difficulty: Optional[str] = "Medium"
     exam_date: Optional[str] = None
 
+class BusyTime(BaseModel):
+    start: str  # ISO datetime
+    end: str
+    title: Optional[str] = None
+
 class StudyPlanRequest(BaseModel):
     subjects: List[Subject]
     daily_hours: int
+    enrich: Optional[bool] = None  # LLM-written task descriptions; defaults to STUDY_PLAN_ENRICHMENT
+    busy: Optional[List[BusyTime]] = []  # existing commitments the plan must avoid
+
+class ReplanRequest(BaseModel):
+    type: str  # missed_task, exam_date or daily_hours
+    task_id: Optional[int] = None
+    subject: Optional[str] = None
+    exam_date: Optional[str] = None
+    daily_hours: Optional[float] = None
+    from_date: Optional[str] = None
 
 class NotesRequest(BaseModel):
     content: str
@@ -86,33 +102,118 @@ class ProgressRequest(BaseModel):
     total_tasks: int
     tasks: Optional[List[Dict[str, Any]]] = []
 
+class StudentProgress(BaseModel):
+    student_id: str
+    completed_tasks: int
+    total_tasks: int
+
+class BatchProgressRequest(BaseModel):
+    students: List[StudentProgress]
+    use_llm: Optional[bool] = True
+
 # --------------------------------------------------
 # ROUTES
 # --------------------------------------------------
+@app.get("/healthz")
+def liveness():
+    """Liveness probe for load balancers: touches nothing"""
+    return {"status": "ok"}
+
 @app.get("/")
 def health():
     return {"status": "running"}
 
 @app.post("/study-plan")
-def study_plan(req: StudyPlanRequest, user=Depends(verify_firebase_token)):
-    return orchestrator.plan_study(req.dict())
+def study_plan(req: StudyPlanRequest, fields: Optional[str] = None, user=Depends(verify_firebase_token)):
+    """?fields=study_plan,formatted_schedule returns only those fields (see PLAN_FIELDS)"""
+    result = get_orchestrator().plan_study(req.dict(), user["uid"])
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return contract_response(result, PLAN_FIELDS, fields)
+
+@app.post("/study-plan/replan")
+def replan_study(req: ReplanRequest, fields: Optional[str] = None, user=Depends(verify_firebase_token)):
+    """Revise only the affected days of the stored plan and return the diff (?fields=diff for just that)"""
+    result = get_orchestrator().replan_study(req.dict(), user["uid"])
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return contract_response(result, REPLAN_FIELDS, fields)
 
 @app.post("/upload-notes")
 def upload_notes(req: NotesRequest, user=Depends(verify_firebase_token)):
-    return orchestrator.upload_notes(req.dict())
+    return get_orchestrator().upload_notes(req.dict(), user["uid"])
 
 @app.post("/ask-doubt")
 def ask_doubt(req: DoubtRequest, user=Depends(verify_firebase_token)):
-    return orchestrator.ask_doubt(req.dict())
+    return get_orchestrator().ask_doubt(req.dict())
 
 @app.post("/analyze-progress")
 def analyze(req: ProgressRequest, user=Depends(verify_firebase_token)):
-    return orchestrator.analyze_progress(req.dict())
+    return get_orchestrator().analyze_progress(req.dict(), user["uid"])
+
+@app.post("/analyze-progress/batch")
+def analyze_batch(req: BatchProgressRequest, user=Depends(verify_firebase_token)):
+    """Analyze a whole class; streams one JSON record per line (summary first)"""
+    records = get_orchestrator().analyze_progress_batch([s.dict() for s in req.students], req.use_llm)
+    return StreamingResponse((json.dumps(record) + "\n" for record in records), media_type="application/x-ndjson")
+
+@app.get("/progress/trends")
+def progress_trends(subject: Optional[str] = None, user=Depends(verify_firebase_token)):
+    """Streak, 7-day velocity, completion forecast and daily/weekly progress"""
+    from blackboard import blackboard
+    return blackboard.history_view().trend(user["uid"], subject)
+
+system_status_view = VersionedView("system-status", lambda: get_orchestrator().get_status_view())
 
 @app.get("/system-status")
-def system_status(user=Depends(verify_firebase_token)):
-    """Get status of autonomous agents and recent system events"""
-    return orchestrator.get_system_status()
+def system_status(request: Request, user=Depends(verify_firebase_token)):
+    """
+    Get status of autonomous agents and recent system events. Built once per
+    blackboard version; the ETag is that version, so unchanged polls get a 304
+    """
+    from blackboard import blackboard
+    return system_status_view.respond(request, blackboard.version)
+
+@app.get("/system-status/runtime")
+def system_runtime(user=Depends(verify_firebase_token)):
+    """Agent timings, bus/scheduler counters and this worker's role (always fresh, not cached)"""
+    return get_orchestrator().get_runtime_stats()
+
+@app.post("/system-status/stream-ticket")
+def system_status_stream_ticket(user=Depends(verify_firebase_token)):
+    """Short-lived ticket for opening /system-status/stream (EventSource cannot send headers)"""
+    return {"ticket": issue_stream_ticket(user["uid"]), "expires_in": STREAM_TICKET_TTL}
+
+@app.get("/system-status/stream")
+def system_status_stream(request: Request, ticket: str):
+    """
+    Server-Sent Events: a snapshot of the agents and recent events, then only
+    what changes. Opened with a ticket from /system-status/stream-ticket, so
+    the ID token itself never appears in a URL
+    """
+    try:
+        verify_stream_ticket(ticket)
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    return StreamingResponse(
+        sse_events(request), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/events")
+def list_events(since: Optional[float] = None, until: Optional[float] = None,
+                type: Optional[str] = None, source: Optional[str] = None,
+                cursor: Optional[int] = None, limit: int = 100,
+                user=Depends(verify_firebase_token)):
+    """Page through blackboard event history (since/until are epoch seconds)"""
+    from blackboard import blackboard
+    return blackboard.query_events(since, until, type, source, cursor, max(1, min(limit, 1000)))
+
+@app.post("/auth/logout")
+def logout(user=Depends(verify_firebase_token)):
+    """Drop the user's cached sessions and revoke their Firebase refresh tokens"""
+    revoke_user(user["uid"], revoke_refresh_tokens=True)
+    return {"status": "signed_out"}
 
 # --------------------------------------------------
 # GOOGLE CALENDAR AUTH
@@ -2,17 +2,29 @@
 Development version of main.py without Firebase dependencies
 Use this for testing the agentic AI system
 """
+import json
 import os
 from typing import List, Optional, Dict, Any
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
-# Agents
-from agent import orchestrator
+# Agents (built in the lifespan hook below, not at import)
+import agent
+from agent import get_orchestrator
+from rag.chroma_client import chroma
+from startup import init_concurrently
+from review_engine import review_store
+from status_stream import sse_events
+from http_cache import VersionedView, MIN_COMPRESS_BYTES
+from static_assets import static_app
+from responses import PLAN_FIELDS, REPLAN_FIELDS, contract_response
 
 # --------------------------------------------------
 # ENV
@@ -22,9 +34,17 @@ load_dotenv()
 # --------------------------------------------------
 # APP
 # --------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Independent clients come up in parallel, each timed against its budget
+    app.state.startup_report = init_concurrently([agent.gemini, chroma, agent.orchestrator_component])
+    yield
+    get_orchestrator().shutdown()
+
 app = FastAPI(
     title="Agentic AI Productivity Backend (Dev Mode)",
-    version="1.0.0-dev"
+    version="1.0.0-dev",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -36,8 +56,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Serve static files (frontend)
-app.mount("/static", StaticFiles(directory="../frontend"), name="static")
+# Compress larger responses (views cached by VersionedView arrive already compressed)
+app.add_middleware(GZipMiddleware, minimum_size=MIN_COMPRESS_BYTES)
+
+# Serve static files (frontend): fingerprinted and precompressed once built with static_assets.py
+app.mount("/static", static_app(), name="static")
 
 BASE_URL = "http://localhost:8000"
 
@@ -54,9 +77,24 @@ class Subject(BaseModel):
     difficulty: Optional[str] = "Medium"
     exam_date: Optional[str] = None
 
+class BusyTime(BaseModel):
+    start: str  # ISO datetime
+    end: str
+    title: Optional[str] = None
+
 class StudyPlanRequest(BaseModel):
     subjects: List[Subject]
     daily_hours: int
+    enrich: Optional[bool] = None  # LLM-written task descriptions; defaults to STUDY_PLAN_ENRICHMENT
+    busy: Optional[List[BusyTime]] = []  # existing commitments the plan must avoid
+
+class ReplanRequest(BaseModel):
+    type: str  # missed_task, exam_date or daily_hours
+    task_id: Optional[int] = None
+    subject: Optional[str] = None
+    exam_date: Optional[str] = None
+    daily_hours: Optional[float] = None
+    from_date: Optional[str] = None
 
 class NotesRequest(BaseModel):
     content: str
@@ -69,9 +107,22 @@ class ProgressRequest(BaseModel):
     total_tasks: int
     tasks: Optional[List[Dict[str, Any]]] = []
 
+class StudentProgress(BaseModel):
+    student_id: str
+    completed_tasks: int
+    total_tasks: int
+
+class BatchProgressRequest(BaseModel):
+    students: List[StudentProgress]
+    use_llm: Optional[bool] = True
+
 class CalendarRequest(BaseModel):
     study_plan_data: Dict[str, Any]
 
+class ReviewAnswerRequest(BaseModel):
+    card_id: int
+    quality: int = Field(..., ge=0, le=5)
+
 class NotesUploadRequest(BaseModel):
     content: str
     title: Optional[str] = "Uploaded Notes"
@@ -85,12 +136,18 @@ class QuestionGenerationRequest(BaseModel):
 # --------------------------------------------------
 # ROUTES
 # --------------------------------------------------
+@app.get("/healthz")
+def liveness():
+    """Liveness probe for load balancers: touches nothing"""
+    return {"status": "ok"}
+
 @app.get("/")
 def health():
+    from blackboard import blackboard
     try:
-        agent_count = len(orchestrator.get_system_status()["agents"])
+        agent_count = len(blackboard.agents)
     except Exception as e:
-        print(f"Error getting system status: {e}")
+        print(f"Error counting agents: {e}")
         agent_count = 0
         
     return {
@@ -103,30 +160,40 @@ def health():
     }
 
 @app.post("/study-plan")
-def study_plan(req: StudyPlanRequest):
-    """Create a study plan with autonomous agent monitoring and calendar integration"""
+def study_plan(req: StudyPlanRequest, fields: Optional[str] = None):
+    """
+    Create a study plan with autonomous agent monitoring and calendar integration.
+    ?fields=study_plan,formatted_schedule returns only those fields (see PLAN_FIELDS)
+    """
     try:
         user = mock_auth()  # Mock auth for dev
-        result = orchestrator.plan_study(req.dict())
-        
-        return {
-            "success": True,
-            "user": user["uid"],
-            "plan": result.get("study_plan"),
-            "calendar_events": result.get("calendar_integration"),
-            "formatted_schedule": result.get("formatted_schedule"),
-            "autonomous_monitoring": "enabled",
-            "message": "Study plan created with calendar integration! Autonomous agents are monitoring your progress."
-        }
+        result = get_orchestrator().plan_study(req.dict(), user["uid"])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Study plan creation failed: {str(e)}")
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["error"])
+    
+    return contract_response(dict(
+        result,
+        user=user["uid"],
+        message="Study plan created with calendar integration! Autonomous agents are monitoring your progress."
+    ), PLAN_FIELDS, fields)
+
+@app.post("/study-plan/replan")
+def replan_study(req: ReplanRequest, fields: Optional[str] = None):
+    """Revise only the affected days of the stored plan and return the diff (?fields=diff for just that)"""
+    user = mock_auth()
+    result = get_orchestrator().replan_study(req.dict(), user["uid"])
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return contract_response(dict(result, user=user["uid"]), REPLAN_FIELDS, fields)
 
 @app.post("/ask-doubt")
 def ask_doubt(req: DoubtRequest):
     """Ask a question to the tutor agent - returns natural language response only"""
     try:
         user = mock_auth()
-        result = orchestrator.ask_doubt(req.dict())
+        result = get_orchestrator().ask_doubt(req.dict())
         
         return {
             "success": True,
@@ -143,7 +210,7 @@ def analyze(req: ProgressRequest):
     """Analyze progress (autonomous analysis runs continuously)"""
     try:
         user = mock_auth()
-        result = orchestrator.analyze_progress(req.dict())
+        result = get_orchestrator().analyze_progress(req.dict(), user["uid"])
         
         return {
             "success": True,
@@ -154,6 +221,20 @@ def analyze(req: ProgressRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Progress analysis failed: {str(e)}")
 
+@app.get("/progress/trends")
+def progress_trends(subject: Optional[str] = None):
+    """Streak, 7-day velocity, completion forecast and daily/weekly progress"""
+    from blackboard import blackboard
+    user = mock_auth()
+    return {"success": True, "user": user["uid"], "trends": blackboard.history_view().trend(user["uid"], subject)}
+
+@app.post("/analyze-progress/batch")
+def analyze_batch(req: BatchProgressRequest):
+    """Analyze a whole class; streams one JSON record per line (summary first)"""
+    mock_auth()
+    records = get_orchestrator().analyze_progress_batch([s.dict() for s in req.students], req.use_llm)
+    return StreamingResponse((json.dumps(record) + "\n" for record in records), media_type="application/x-ndjson")
+
 @app.post("/upload-notes")
 def upload_notes(req: NotesUploadRequest):
     """Upload notes with enhanced RAG processing and autonomous processing"""
@@ -166,7 +247,7 @@ def upload_notes(req: NotesUploadRequest):
         result = process_uploaded_notes(req.dict())
         
         # Also use the orchestrator for additional processing
-        orchestrator_result = orchestrator.upload_notes(req.dict())
+        orchestrator_result = get_orchestrator().upload_notes(req.dict(), user["uid"])
         
         return {
             "success": True,
@@ -187,10 +268,14 @@ def generate_questions(req: QuestionGenerationRequest):
         user = mock_auth()
         result = generate_questions_from_notes(req.dict())
         
+        # Keep the questions as spaced-repetition cards
+        card_ids = review_store.add_cards(user["uid"], result.get("questions", []), result.get("type", "mcq"))
+        
         return {
             "success": True,
             "user": user["uid"],
             "questions": result.get("questions", []),
+            "card_ids": card_ids,
             "total_generated": result.get("total_generated", 0),
             "type": result.get("type", "mixed"),
             "message": f"Generated {result.get('total_generated', 0)} questions successfully!"
@@ -207,10 +292,14 @@ def generate_mcqs(req: QuestionGenerationRequest):
         user = mock_auth()
         result = generate_mcqs_from_notes(req.dict())
         
+        # Keep the questions as spaced-repetition cards
+        card_ids = review_store.add_cards(user["uid"], result.get("questions", []), result.get("type", "mcq"))
+        
         return {
             "success": True,
             "user": user["uid"],
             "questions": result.get("questions", []),
+            "card_ids": card_ids,
             "total_generated": result.get("total_generated", 0),
             "type": "mcq",
             "message": f"Generated {result.get('total_generated', 0)} MCQs successfully!"
@@ -218,16 +307,36 @@ def generate_mcqs(req: QuestionGenerationRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"MCQ generation failed: {str(e)}")
 
+@app.get("/reviews/due")
+def reviews_due(limit: int = 20):
+    """Review cards that are due, most overdue first"""
+    user = mock_auth()
+    return {
+        "success": True,
+        "user": user["uid"],
+        "cards": review_store.due(user["uid"], limit=min(limit, 100)),
+        "stats": review_store.stats(user["uid"])
+    }
+
+@app.post("/reviews/answer")
+def review_answer(req: ReviewAnswerRequest):
+    """Grade a review (0 = forgot ... 5 = perfect recall) and schedule the card again"""
+    user = mock_auth()
+    card = review_store.answer(user["uid"], req.card_id, req.quality)
+    if card is None:
+        raise HTTPException(status_code=404, detail=f"Card {req.card_id} not found")
+    return {"success": True, "user": user["uid"], "card": card}
+
 @app.post("/create-calendar-events")
 def create_calendar_events(req: CalendarRequest):
     """Manually create calendar events from study plan"""
     try:
-        from enhanced_tools import create_calendar_events_from_study_plan, format_study_plan_as_table
+        from enhanced_tools import format_study_plan_as_table
         
         user = mock_auth()
         
-        # Create calendar events
-        calendar_result = create_calendar_events_from_study_plan(req.study_plan_data)
+        # Sync calendar events (only new, changed and removed sessions are sent)
+        calendar_result = get_orchestrator().sync_calendar(req.study_plan_data, user["uid"])
         
         # Format as table
         formatted_schedule = format_study_plan_as_table(req.study_plan_data)
@@ -237,31 +346,40 @@ def create_calendar_events(req: CalendarRequest):
             "user": user["uid"],
             "calendar_events": calendar_result,
             "formatted_schedule": formatted_schedule,
-            "message": "Calendar events created successfully!"
+            "message": calendar_result.get("message", "Calendar synced")
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Calendar event creation failed: {str(e)}")
 
+def _system_status_payload():
+    status = get_orchestrator().get_status_view()
+    return {
+        "success": True,
+        "autonomous_agents": status["agents"],
+        "recent_events": status["recent_events"],
+        "shared_context": status["shared_context_keys"],
+        "startup": getattr(app.state, "startup_report", None),
+        "system_health": "operational",
+        "agentic_features": [
+            "Autonomous decision making",
+            "Inter-agent communication", 
+            "Event-driven architecture",
+            "Persistent state management",
+            "Self-evaluation and adaptation"
+        ]
+    }
+
+system_status_view = VersionedView("system-status", _system_status_payload)
+
 @app.get("/system-status")
-def system_status():
-    """Get status of autonomous agents and recent system events"""
+def system_status(request: Request):
+    """
+    Get status of autonomous agents and recent system events. Built once per
+    blackboard version; the ETag is that version, so unchanged polls get a 304
+    """
+    from blackboard import blackboard
     try:
-        status = orchestrator.get_system_status()
-        
-        return {
-            "success": True,
-            "autonomous_agents": status["agents"],
-            "recent_events": status["recent_events"],
-            "shared_context": status["shared_context_keys"],
-            "system_health": "operational",
-            "agentic_features": [
-                "Autonomous decision making",
-                "Inter-agent communication", 
-                "Event-driven architecture",
-                "Persistent state management",
-                "Self-evaluation and adaptation"
-            ]
-        }
+        return system_status_view.respond(request, blackboard.version)
     except Exception as e:
         return {
             "success": False,
@@ -272,6 +390,49 @@ def system_status():
             "system_health": "error"
         }
 
+@app.get("/system-status/runtime")
+def system_runtime():
+    """Agent timings, bus/scheduler counters and this worker's role (always fresh, not cached)"""
+    return get_orchestrator().get_runtime_stats()
+
+@app.get("/system-status/stream")
+def system_status_stream(request: Request):
+    """Server-Sent Events: a snapshot of the agents and recent events, then only what changes"""
+    return StreamingResponse(
+        sse_events(request), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/events")
+def list_events(since: Optional[float] = None, until: Optional[float] = None,
+                type: Optional[str] = None, source: Optional[str] = None,
+                cursor: Optional[int] = None, limit: int = 100):
+    """Page through blackboard event history (since/until are epoch seconds)"""
+    from blackboard import blackboard
+    
+    limit = max(1, min(limit, 1000))
+    page = blackboard.query_events(since, until, type, source, cursor, limit)
+    return {
+        "success": True,
+        "events": page["events"],
+        "count": len(page["events"]),
+        "next_cursor": page["next_cursor"]
+    }
+
+@app.post("/events/replay")
+def replay(since: Optional[float] = None, until: Optional[float] = None,
+           type: Optional[str] = None, source: Optional[str] = None):
+    """Feed a recorded range of events back through the autonomous agents"""
+    from blackboard import blackboard
+    from event_log import replay_events
+    
+    replayed = replay_events(blackboard, since, until, type, source)
+    return {
+        "success": True,
+        "replayed": replayed,
+        "message": f"Replayed {replayed} events through the agents"
+    }
+
 @app.get("/demo")
 def demo_agentic_behavior():
     """Demonstrate autonomous agent behavior"""
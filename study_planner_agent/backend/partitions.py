@@ -0,0 +1,251 @@
+"""
+Per-Student Blackboard Partitions
+Each student (keyed by Firebase uid) gets their own goals and context.
+Every save is written through to SQLite; active students are also kept
+in an LRU map so reads stay in memory
+"""
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, List, Optional
+
+import clock
+from blackboard import StudyGoal
+
+logger = logging.getLogger(__name__)
+
+# Context a student cannot lose to size trimming: their plan, tasks and calendar event map
+ESSENTIAL_KEYS = frozenset({"current_study_plan", "current_tasks", "calendar_sync"})
+
+class PartitionTooLarge(ValueError):
+    """A partition whose essential context alone is over the size limit"""
+
+@dataclass
+class StudentPartition:
+    user_id: str
+    study_goals: List[StudyGoal] = field(default_factory=list)
+    shared_context: Dict[str, Any] = field(default_factory=dict)
+    last_active: float = field(default_factory=lambda: clock.now())
+    # Encoding of each part as last loaded or saved, to tell which parts a save changes
+    _saved: Dict[str, str] = field(default_factory=dict, repr=False, compare=False)
+
+    def set(self, key: str, value: Any):
+        """Set a context value, marking it most recently written (last to be trimmed)"""
+        self.shared_context.pop(key, None)
+        self.shared_context[key] = value
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "user_id": self.user_id,
+            "study_goals": [asdict(goal) for goal in self.study_goals],
+            "shared_context": self.shared_context,
+            "last_active": self.last_active
+        }, default=str)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "StudentPartition":
+        data = json.loads(raw)
+        partition = cls(
+            user_id=data["user_id"],
+            study_goals=[StudyGoal(**goal) for goal in data.get("study_goals", [])],
+            shared_context=data.get("shared_context", {}),
+            last_active=data.get("last_active", clock.now())
+        )
+        partition.mark_saved()
+        return partition
+
+    def _parts(self) -> Dict[str, str]:
+        parts = {"study_goals": json.dumps([asdict(goal) for goal in self.study_goals], default=str)}
+        for key, value in self.shared_context.items():
+            parts["context:" + key] = json.dumps(value, default=str)
+        return parts
+
+    def mark_saved(self):
+        """Record the current goals and context as the stored state"""
+        self._saved = self._parts()
+
+    def merge_into(self, current: "StudentPartition") -> "StudentPartition":
+        """
+        Apply the goals and context keys changed (or removed) here since the
+        last load or save onto current, a fresh copy of the stored partition,
+        so writers touching different keys keep each other's updates
+        """
+        parts = self._parts()
+        for part in self._saved.keys() - parts.keys():
+            current.shared_context.pop(part[len("context:"):], None)
+        for part, encoded in parts.items():
+            if encoded == self._saved.get(part):
+                continue
+            if part == "study_goals":
+                current.study_goals = self.study_goals
+            else:
+                key = part[len("context:"):]
+                current.set(key, self.shared_context[key])
+        current.last_active = max(current.last_active, self.last_active)
+        return current
+
+    def trim_to(self, max_bytes: int) -> str:
+        """
+        Drop the least recently written non-essential context keys until the
+        encoded size fits, and return the encoding. Raises PartitionTooLarge
+        when the essential keys alone do not fit.
+        """
+        encoded = self.to_json()
+        while len(encoded) > max_bytes:
+            dropped = next((key for key in self.shared_context if key not in ESSENTIAL_KEYS), None)
+            if dropped is None:
+                raise PartitionTooLarge(
+                    f"Partition {self.user_id} is {len(encoded)} bytes, over the {max_bytes}-byte limit"
+                )
+            del self.shared_context[dropped]
+            logger.warning("Partition %s over %d bytes, dropped '%s'", self.user_id, max_bytes, dropped)
+            encoded = self.to_json()
+        return encoded
+
+class PartitionStore:
+    """SQLite table holding every saved partition"""
+
+    def __init__(self, path: str = "partitions.db"):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS partitions "
+                "(user_id TEXT PRIMARY KEY, data TEXT NOT NULL, last_active REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS partitions_last_active ON partitions (last_active)")
+            self._local.conn = conn
+        return conn
+
+    def load(self, user_id: str) -> Optional[StudentPartition]:
+        row = self._connection().execute(
+            "SELECT data FROM partitions WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return StudentPartition.from_json(row[0]) if row else None
+
+    def save(self, partition: StudentPartition, encoded: Optional[str] = None):
+        self._connection().execute(
+            "INSERT INTO partitions (user_id, data, last_active) VALUES (?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, last_active = excluded.last_active",
+            (partition.user_id, encoded or partition.to_json(), partition.last_active)
+        )
+
+    def save_merged(self, partition: StudentPartition, max_bytes: int):
+        """
+        Save the changes made to partition over the stored row, reading and
+        writing in one BEGIN IMMEDIATE transaction so a concurrent save from
+        another process is merged rather than overwritten. partition is
+        updated to the merged state that was written.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM partitions WHERE user_id = ?", (partition.user_id,)).fetchone()
+            merged = partition.merge_into(StudentPartition.from_json(row[0])) if row else partition
+            self.save(merged, merged.trim_to(max_bytes))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        partition.study_goals = merged.study_goals
+        partition.shared_context = merged.shared_context
+        partition.last_active = merged.last_active
+        partition.mark_saved()
+
+    def load_active(self, since: float, limit: int) -> List[StudentPartition]:
+        rows = self._connection().execute(
+            "SELECT data FROM partitions WHERE last_active >= ? ORDER BY last_active DESC LIMIT ?",
+            (since, limit)
+        ).fetchall()
+        return [StudentPartition.from_json(row[0]) for row in rows]
+
+class PartitionManager:
+    """
+    O(1) partition lookup over a PartitionStore. Every save writes
+    through, so a restart or crash loses nothing that was saved;
+    max_resident bounds how many students are also held in memory
+    (0 caches nothing, for several processes sharing the store).
+    """
+
+    def __init__(self, store: PartitionStore, max_resident: int = 1000,
+                 max_partition_bytes: int = 256 * 1024, active_window: float = 7 * 86400):
+        self.store = store
+        self.max_resident = max_resident
+        self.max_partition_bytes = max_partition_bytes
+        self.active_window = active_window
+        self._resident: "OrderedDict[str, StudentPartition]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, user_id: str) -> StudentPartition:
+        with self._lock:
+            partition = self._resident.get(user_id)
+            if partition is not None:
+                self._resident.move_to_end(user_id)
+            else:
+                partition = self.store.load(user_id)
+                if partition is None:
+                    partition = StudentPartition(user_id)
+                    partition.mark_saved()
+                if self.max_resident:
+                    self._resident[user_id] = partition
+                    self._evict_overflow()
+            partition.last_active = clock.now()
+            return partition
+
+    def save(self, partition: StudentPartition):
+        """
+        Persist a partition. One too large even without its non-essential
+        context is rejected (PartitionTooLarge) and its resident copy
+        dropped, so the next get() returns the last saved state. With
+        nothing resident the store is shared, so only this copy's changes
+        are merged over the stored row.
+        """
+        if not self.max_resident:
+            self.store.save_merged(partition, self.max_partition_bytes)
+            return
+        try:
+            encoded = partition.trim_to(self.max_partition_bytes)
+        except PartitionTooLarge:
+            with self._lock:
+                if self._resident.get(partition.user_id) is partition:
+                    del self._resident[partition.user_id]
+            raise
+        self.store.save(partition, encoded)
+
+    def _evict_overflow(self):
+        while len(self._resident) > self.max_resident:
+            _, evicted = self._resident.popitem(last=False)
+            self.store.save(evicted)
+
+    def evict_idle(self, max_idle_seconds: float) -> int:
+        """Move students idle for longer than max_idle_seconds to the store"""
+        cutoff = clock.now() - max_idle_seconds
+        evicted = 0
+        with self._lock:
+            # Resident map is in LRU order, so idle students are at the front
+            while self._resident:
+                user_id, partition = next(iter(self._resident.items()))
+                if partition.last_active >= cutoff:
+                    break
+                del self._resident[user_id]
+                self.store.save(partition)
+                evicted += 1
+        return evicted
+
+    def active(self) -> List[StudentPartition]:
+        """Partitions of recently active students"""
+        with self._lock:
+            if self.max_resident:
+                return list(self._resident.values())
+        return self.store.load_active(clock.now() - self.active_window, limit=1000)
+
+    def __len__(self) -> int:
+        return len(self._resident)
@@ -0,0 +1,397 @@
+"""
+Local Study Plan Solver
+Lays out the weekly daily_study_plan from subjects, difficulty, exam dates
+and daily hours in plain Python: time is split into 30-minute blocks by
+difficulty weight and exam proximity, capped at the daily hours
+"""
+import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import clock
+from deadline_index import parse_due_date
+from interval_index import IntervalIndex
+
+BLOCK_MINUTES = 30
+MAX_SESSION_BLOCKS = 3  # sessions of at most 90 minutes
+BREAK_MINUTES = 15
+DAY_START = datetime.time(9, 0)
+DAY_END = datetime.time(22, 0)  # no session runs past this; time that does not fit is reported
+
+DIFFICULTY_WEIGHT = {"Easy": 1.0, "Medium": 1.5, "Hard": 2.0}
+ACTIVITIES = [
+    ("Learn new material", "Study", "Work through the next topic and write short summary notes."),
+    ("Practice problems", "Practice", "Solve practice questions on recent topics and mark the ones you got wrong."),
+    ("Review and self-test", "Review", "Recall key concepts from memory, then check your notes to fill the gaps."),
+]
+# Indexed by days left to the exam, minus one
+EXAM_ACTIVITIES = [
+    ("Final revision", "Review", "Revise weak areas and key formulas; keep the session light the day before the exam."),
+    ("Exam practice", "Practice", "Do a timed past paper or mock test under exam conditions."),
+]
+
+def _subject_weight(subject: Dict[str, Any], day: datetime.date) -> float:
+    """Difficulty weight, raised as the exam gets closer; 0 from the exam day on"""
+    weight = DIFFICULTY_WEIGHT.get(subject["difficulty"], 1.5)
+    exam = subject["exam_date"]
+    if exam is None:
+        return weight
+    days_left = (exam - day).days
+    if days_left <= 0:
+        return 0.0
+    return weight * (1.0 + 3.0 / days_left)
+
+def _apportion(blocks: int, weights: List[float]) -> List[int]:
+    """Split blocks across weights by largest remainder (Hamilton)"""
+    total = sum(weights)
+    if blocks <= 0 or total <= 0:
+        return [0] * len(weights)
+    quotas = [blocks * weight / total for weight in weights]
+    counts = [int(quota) for quota in quotas]
+    by_remainder = sorted(range(len(weights)), key=lambda i: (counts[i] - quotas[i], -weights[i]))
+    for i in by_remainder[:blocks - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+def _format_time(moment: datetime.datetime) -> str:
+    return moment.strftime("%I:%M %p")
+
+def _priority(weight: float) -> str:
+    return "High" if weight >= 3.0 else "Medium" if weight >= 1.5 else "Low"
+
+def _normalize_subjects(subjects: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "name": subject.get("name") or "General",
+            "difficulty": (subject.get("difficulty") or "Medium").capitalize(),
+            "exam_date": parse_due_date(subject.get("exam_date"))
+        }
+        for subject in subjects
+    ]
+
+def _unscheduled(subjects: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Subjects whose exam_date was given but could not be parsed"""
+    return [
+        {"subject": subject.get("name") or "General", "exam_date": subject["exam_date"],
+         "reason": f"Unrecognized exam date '{subject['exam_date']}'"}
+        for subject in subjects
+        if subject.get("exam_date") and parse_due_date(subject["exam_date"]) is None
+    ]
+
+def _busy_index(busy: List[Dict[str, Any]]) -> Optional[IntervalIndex]:
+    """Index of the student's existing commitments ({"start", "end"} ISO times), or None"""
+    if not busy:
+        return None
+    return IntervalIndex((item["start"], item["end"], item.get("title")) for item in busy)
+
+def _layout_day(day: datetime.date, subjects: List[Dict[str, Any]], daily_minutes: int,
+                sessions_done: Dict[str, int], reserved: Optional[Dict[str, int]] = None,
+                busy: Optional[IntervalIndex] = None) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Sessions (without task_id) for one day, and the minutes that did not
+    fit. reserved maps subject name to blocks taken off the top of the day
+    for it (make-up time), laid out after the regular sessions. With a busy
+    index each session starts at the next free slot long enough for it.
+    Sessions that would end after DAY_END are left out and counted.
+    """
+    reserved = reserved or {}
+    weights = [_subject_weight(subject, day) for subject in subjects]
+    blocks = _apportion(daily_minutes // BLOCK_MINUTES - sum(reserved.values()), weights)
+
+    # Cut each subject's blocks into sessions, then deal them out round-robin
+    queues = []
+    for i in sorted(range(len(subjects)), key=lambda i: -weights[i]):
+        remaining, sessions = blocks[i], []
+        while remaining > 0:
+            size = min(MAX_SESSION_BLOCKS, remaining)
+            sessions.append(size)
+            remaining -= size
+        if sessions:
+            queues.append((subjects[i], weights[i], sessions))
+    by_name = {subject["name"]: (subject, weight) for subject, weight in zip(subjects, weights)}
+    for name, count in reserved.items():
+        subject, weight = by_name[name]
+        queues.append((subject, weight, [min(MAX_SESSION_BLOCKS, count - done) for done in range(0, count, MAX_SESSION_BLOCKS)]))
+
+    tasks = []
+    unplaced = 0
+    moment = datetime.datetime.combine(day, DAY_START)
+    day_end = datetime.datetime.combine(day, DAY_END)
+    while any(sessions for _, _, sessions in queues):
+        for subject, weight, sessions in queues:
+            if not sessions:
+                continue
+            minutes = sessions.pop(0) * BLOCK_MINUTES
+            if busy is not None:
+                free_at = busy.next_free(moment, minutes * 60, limit=day_end)
+                if free_at is None:
+                    unplaced += minutes
+                    continue
+                moment = datetime.datetime.fromtimestamp(free_at)
+            elif moment + datetime.timedelta(minutes=minutes) > day_end:
+                unplaced += minutes
+                continue
+            exam = subject["exam_date"]
+            if exam is not None and (exam - day).days <= 2:
+                activity, category, description = EXAM_ACTIVITIES[(exam - day).days - 1]
+            else:
+                activity, category, description = ACTIVITIES[sessions_done.get(subject["name"], 0) % len(ACTIVITIES)]
+            sessions_done[subject["name"]] = sessions_done.get(subject["name"], 0) + 1
+
+            end = moment + datetime.timedelta(minutes=minutes)
+            tasks.append({
+                "task_name": f"{subject['name']}: {activity}",
+                "description": description,
+                "day_of_week": day.strftime("%A"),
+                "date": day.isoformat(),
+                "start_time": _format_time(moment),
+                "end_time": _format_time(end),
+                "estimated_duration_minutes": minutes,
+                "priority": _priority(weight),
+                "category": category,
+                "subject": subject["name"],
+                "difficulty_level": subject["difficulty"]
+            })
+            moment = end + datetime.timedelta(minutes=BREAK_MINUTES)
+    return tasks, unplaced
+
+def _reminders(subjects: List[Dict[str, Any]], start: datetime.date) -> List[Dict[str, Any]]:
+    reminders = [{
+        "id": "R1",
+        "name": "Take your breaks",
+        "description": f"Step away from your desk for the {BREAK_MINUTES}-minute breaks between sessions.",
+        "priority": "Medium",
+        "category": "Well-being",
+        "recurring": "daily"
+    }]
+    for subject in subjects:
+        if subject["exam_date"] is not None and subject["exam_date"] >= start:
+            reminders.append({
+                "id": f"R{len(reminders) + 1}",
+                "name": f"{subject['name']} exam",
+                "description": f"{subject['name']} exam on {subject['exam_date'].strftime('%A, %d %B %Y')}.",
+                "priority": "High",
+                "category": "Exam",
+                "recurring": "none"
+            })
+    return reminders
+
+def _summary(tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    minutes_by_difficulty, subjects = {}, []
+    for task in tasks:
+        if task.get("status") == "missed":
+            continue
+        difficulty = task["difficulty_level"]
+        minutes_by_difficulty[difficulty] = minutes_by_difficulty.get(difficulty, 0) + task["estimated_duration_minutes"]
+        if task["subject"] not in subjects:
+            subjects.append(task["subject"])
+
+    total_minutes = sum(minutes_by_difficulty.values())
+    return {
+        "total_study_hours": round(total_minutes / 60, 1),
+        "subjects_covered": subjects,
+        "break_time_included": True,
+        "difficulty_distribution": {
+            difficulty.lower(): round(100 * minutes / total_minutes)
+            for difficulty, minutes in minutes_by_difficulty.items()
+        } if total_minutes else {}
+    }
+
+def solve_study_plan(payload: Dict[str, Any], start: Optional[datetime.date] = None,
+                     days: int = 7) -> Dict[str, Any]:
+    """
+    Build a plan in the StudyPlannerAgent's JSON schema (daily_study_plan,
+    general_reminders, weekly_summary) for `days` days from `start` (today).
+    Sessions of one subject are interleaved with the others, hardest and
+    most urgent first, with a break between sessions, and around the
+    student's existing commitments in payload["busy"], between DAY_START and
+    DAY_END. Hours that do not fit in a day are listed under
+    unplaced_minutes by date. Subjects with an exam_date that cannot be
+    parsed are listed under unscheduled, naming the subject; callers should
+    not treat such a plan as complete. The normalized inputs are kept under
+    plan_inputs for replan().
+    """
+    start = start or clock.today()
+    daily_hours = float(payload.get("daily_hours", 0))
+    subjects = _normalize_subjects(payload.get("subjects", []))
+    busy_items = payload.get("busy") or []
+    busy = _busy_index(busy_items)
+
+    tasks = []
+    unplaced = {}
+    sessions_done = {}
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        day_tasks, unplaced_minutes = _layout_day(day, subjects, max(0, int(daily_hours * 60)), sessions_done, busy=busy)
+        for task in day_tasks:
+            task["task_id"] = len(tasks) + 1
+            tasks.append(task)
+        if unplaced_minutes:
+            unplaced[day.isoformat()] = unplaced_minutes
+
+    return {
+        "daily_study_plan": tasks,
+        "general_reminders": _reminders(subjects, start),
+        "weekly_summary": _summary(tasks),
+        "unplaced_minutes": unplaced,
+        "unscheduled": _unscheduled(payload.get("subjects", [])),
+        "plan_inputs": {
+            "start": start.isoformat(),
+            "days": days,
+            "daily_hours": daily_hours,
+            "busy": busy_items,
+            "subjects": [
+                dict(subject, exam_date=subject["exam_date"].isoformat() if subject["exam_date"] else None)
+                for subject in subjects
+            ]
+        }
+    }
+
+def replan(plan: Dict[str, Any], change: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Apply one change to a solver-built plan, re-laying out only the days it
+    affects. Changes:
+      {"type": "missed_task", "task_id": 7}  make up its time on the next days
+      {"type": "exam_date", "subject": "Math", "exam_date": "2025-03-20"}
+      {"type": "daily_hours", "daily_hours": 2, "from_date": "2025-03-12"}
+    Returns {"status", "plan", "diff"}; the diff lists changed days, removed
+    task_ids, added tasks and the minutes (make-up or regular) that did not fit.
+    """
+    inputs = plan.get("plan_inputs")
+    if not inputs:
+        return {"status": "error", "message": "Plan was not built by the local solver; create a new plan"}
+
+    start = datetime.date.fromisoformat(inputs["start"])
+    days = [start + datetime.timedelta(days=offset) for offset in range(inputs["days"])]
+    today = clock.today()
+    subjects = _normalize_subjects(inputs["subjects"])
+    daily_hours = inputs["daily_hours"]
+    busy = _busy_index(inputs.get("busy"))
+    tasks = [dict(task) for task in plan.get("daily_study_plan", [])]
+    reserved: Dict[datetime.date, Dict[str, int]] = {}
+    affected = set()
+    updated_ids = []
+    unplaced_minutes = 0
+
+    change_type = change.get("type")
+    if change_type == "missed_task":
+        missed = next((task for task in tasks if task.get("task_id") == change.get("task_id")), None)
+        if missed is None or missed.get("status") == "missed":
+            return {"status": "error", "message": f"No open task {change.get('task_id')} in the plan"}
+        missed["status"] = "missed"
+        updated_ids.append(missed["task_id"])
+
+        # Make up the blocks on the following days, at most half of each day, before the exam
+        subject = next(s for s in subjects if s["name"] == missed["subject"])
+        debt = missed["estimated_duration_minutes"] // BLOCK_MINUTES
+        capacity = int(daily_hours * 60) // BLOCK_MINUTES // 2
+        missed_day = datetime.date.fromisoformat(missed["date"])
+        for day in days:
+            if debt <= 0:
+                break
+            if day <= missed_day or day < today or _subject_weight(subject, day) == 0:
+                continue
+            take = min(debt, capacity)
+            if take:
+                reserved[day] = {subject["name"]: take}
+                affected.add(day)
+                debt -= take
+        unplaced_minutes = debt * BLOCK_MINUTES
+
+    elif change_type == "exam_date":
+        subject = next((s for s in subjects if s["name"] == change.get("subject")), None)
+        if subject is None:
+            return {"status": "error", "message": f"Subject {change.get('subject')} is not in the plan"}
+        exam_date = parse_due_date(change.get("exam_date"))
+        if exam_date is None:
+            return {"status": "error", "message": f"Unrecognized exam date '{change.get('exam_date')}' for {subject['name']}"}
+        old_subject = dict(subject)
+        subject["exam_date"] = exam_date
+        # Only days whose weights change need a new layout
+        affected = {
+            day for day in days
+            if day >= today and _subject_weight(old_subject, day) != _subject_weight(subject, day)
+        }
+
+    elif change_type == "daily_hours":
+        daily_hours = float(change.get("daily_hours", daily_hours))
+        since = parse_due_date(change.get("from_date")) or today
+        affected = {day for day in days if day >= max(since, today)}
+
+    else:
+        return {"status": "error", "message": f"Unknown change type: {change_type}"}
+
+    # Re-lay out the affected days, carrying each subject's session count forward for activity rotation
+    next_id = max((task["task_id"] for task in tasks), default=0) + 1
+    removed, added = [], []
+    new_tasks = []
+    unplaced_by_day = dict(plan.get("unplaced_minutes") or {})
+    for day in days:
+        old_day = [task for task in tasks if task["date"] == day.isoformat()]
+        if day not in affected:
+            new_tasks.extend(old_day)
+            continue
+        sessions_done = {}
+        for task in new_tasks:
+            if task.get("status") != "missed":
+                sessions_done[task["subject"]] = sessions_done.get(task["subject"], 0) + 1
+        old_by_slot = {(t["start_time"], t["end_time"], t["task_name"]): t for t in old_day if t.get("status") != "missed"}
+        day_tasks, day_unplaced = _layout_day(day, subjects, max(0, int(daily_hours * 60)), sessions_done, reserved.get(day), busy)
+        unplaced_minutes += day_unplaced
+        unplaced_by_day.pop(day.isoformat(), None)
+        if day_unplaced:
+            unplaced_by_day[day.isoformat()] = day_unplaced
+        for task in day_tasks:
+            same = old_by_slot.pop((task["start_time"], task["end_time"], task["task_name"]), None)
+            if same is not None:
+                new_tasks.append(same)  # unchanged slot keeps its id and description
+                continue
+            task["task_id"] = next_id
+            next_id += 1
+            new_tasks.append(task)
+            added.append(task)
+        removed.extend(task["task_id"] for task in old_by_slot.values())
+        new_tasks.extend(t for t in old_day if t.get("status") == "missed")
+
+    new_plan = dict(plan)
+    new_plan["daily_study_plan"] = new_tasks
+    new_plan["weekly_summary"] = _summary(new_tasks)
+    new_plan["unplaced_minutes"] = unplaced_by_day
+    new_plan["general_reminders"] = _reminders(subjects, start)
+    new_plan["plan_inputs"] = dict(inputs, daily_hours=daily_hours, subjects=[
+        dict(subject, exam_date=subject["exam_date"].isoformat() if subject["exam_date"] else None)
+        for subject in subjects
+    ])
+    return {
+        "status": "success" if affected or updated_ids else "unchanged",
+        "plan": new_plan,
+        "diff": {
+            "changed_days": sorted(day.isoformat() for day in affected),
+            "removed_task_ids": removed,
+            "added": added,
+            "updated_task_ids": updated_ids,
+            "unplaced_minutes": unplaced_minutes
+        }
+    }
+
+def plan_tasks(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Deadline-bearing tasks for the blackboard: one per subject, due on its
+    exam date, or at the end of the plan for subjects without an exam
+    """
+    sessions = [task for task in plan.get("daily_study_plan", []) if task.get("status") != "missed"]
+    last_day = max((task["date"] for task in sessions if task.get("date")), default=clock.today().isoformat())
+    tasks = []
+    for subject in plan.get("plan_inputs", {}).get("subjects", []):
+        name = subject["name"]
+        own = [task for task in sessions if task.get("subject") == name]
+        exam = parse_due_date(subject.get("exam_date"))
+        tasks.append({
+            "title": f"Prepare for {name} exam" if exam else f"Complete this week's {name} sessions",
+            "due_date": exam.isoformat() if exam else last_day,
+            "subject": name,
+            "kind": "exam" if exam else "weekly",
+            "sessions": len(own),
+            "estimated_duration_minutes": sum(task["estimated_duration_minutes"] for task in own),
+            "priority": "High" if exam else "Medium"
+        })
+    return {"tasks": tasks}
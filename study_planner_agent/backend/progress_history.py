@@ -0,0 +1,337 @@
+"""
+Progress History Time-Series Store
+Append-only history of progress samples per student and subject. Recent
+samples sit in a preallocated columnar buffer that spills to disk as
+fixed-size segments; daily and weekly rollups are updated on append, so
+streaks, 7-day velocity and completion forecasts are vectorized reads
+"""
+import datetime
+import glob
+import json
+import os
+import secrets
+import threading
+import warnings
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+import clock
+
+SECONDS_PER_DAY = 86400
+SAMPLE_DTYPE = np.dtype([("user", "<i4"), ("subject", "<i4"), ("progress", "<f4"), ("timestamp", "<f8")])
+ALL_SUBJECTS = -1  # rollup key for a student's activity across subjects
+FORECAST_HORIZON_DAYS = 3650  # slower trends than this get no forecast
+
+def _day(timestamp: float) -> int:
+    """UTC day number of a timestamp"""
+    return int(timestamp // SECONDS_PER_DAY)
+
+def _week(day: int) -> int:
+    # Day 0 (1970-01-01) was a Thursday; weeks start on Monday
+    return (day + 3) // 7
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+    """Carry the last non-NaN value forward (leading NaNs stay NaN)"""
+    index = np.where(np.isnan(values), 0, np.arange(len(values)))
+    np.maximum.accumulate(index, out=index)
+    return values[index]
+
+class _Rollup:
+    """
+    Per-day and per-week rollups of one series, as growable arrays indexed
+    from the first day / week seen: closing progress and sample count.
+    """
+    __slots__ = ("first_day", "close", "count", "first_week", "week_close", "week_days")
+
+    def __init__(self, day: int):
+        self.first_day = day
+        self.close = np.full(16, np.nan, dtype=np.float32)
+        self.count = np.zeros(16, dtype=np.int32)
+        self.first_week = _week(day)
+        self.week_close = np.full(4, np.nan, dtype=np.float32)
+        self.week_days = np.zeros(4, dtype=np.int16)
+
+    @staticmethod
+    def _fit(array: np.ndarray, index: int, fill) -> np.ndarray:
+        if index < len(array):
+            return array
+        grown = np.full(max(2 * len(array), index + 1), fill, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def add(self, day: int, progress: float, samples: int = 1):
+        if day < self.first_day:
+            return  # history is append-only; late samples before the series start are ignored
+        i, w = day - self.first_day, _week(day) - self.first_week
+        self.close = self._fit(self.close, i, np.nan)
+        self.count = self._fit(self.count, i, 0)
+        self.week_close = self._fit(self.week_close, w, np.nan)
+        self.week_days = self._fit(self.week_days, w, 0)
+        if self.count[i] == 0:
+            self.week_days[w] += 1
+        self.count[i] += samples
+        self.close[i] = progress
+        self.week_close[w] = progress
+
+    def daily(self, today: int, days: int) -> np.ndarray:
+        """Forward-filled closing progress for the `days` days ending today"""
+        end = today - self.first_day + 1
+        if end <= 0:
+            return np.full(days, np.nan, dtype=np.float32)
+        closes = _ffill(np.concatenate([self.close[:end], np.full(max(0, end - len(self.close)), np.nan, np.float32)]))
+        window = closes[max(0, end - days):end]
+        return np.concatenate([np.full(days - len(window), np.nan, np.float32), window])
+
+    def active(self, today: int) -> np.ndarray:
+        """Whether each day up to today had any sample"""
+        end = today - self.first_day + 1
+        counts = self.count[:max(0, end)]
+        return np.concatenate([counts > 0, np.zeros(max(0, end - len(counts)), dtype=bool)])
+
+class ProgressHistory:
+    """
+    Append-only store. append() writes to the in-memory buffer and updates
+    the rollups in O(1); a full buffer is written to `directory` as one
+    segment (a structured .npy file read back with mmap) and reset. With
+    directory=None segments stay in memory. Existing segments are replayed
+    into the rollups on startup. Samples are expected in time order.
+
+    Several processes may share one directory: each writes only its own
+    files (segment-<writer>-N.npy and vocabulary-<writer>.json, under a
+    writer id unique to the instance), and other writers' segments are
+    mapped onto this instance's user and subject indices when loaded.
+    """
+
+    def __init__(self, directory: Optional[str] = "progress_history", segment_size: int = 65536):
+        self.directory = directory
+        self.segment_size = segment_size
+        self._users: Dict[str, int] = {}
+        self._user_ids: List[str] = []
+        self._subjects: Dict[str, int] = {}
+        self._subject_names: List[str] = []
+        self._rollups: Dict[Tuple[int, int], _Rollup] = {}
+        self._user_subjects: Dict[int, List[int]] = {}
+        self._buffer = np.zeros(segment_size, dtype=SAMPLE_DTYPE)
+        self._size = 0
+        # (path, or array when there is no directory; index maps for other writers' segments)
+        self._segments: List[Tuple[Any, Optional[Tuple[np.ndarray, np.ndarray]]]] = []
+        self.writer = f"{os.getpid()}-{secrets.token_hex(4)}"
+        self._written = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def _intern_user(self, user_id: str) -> int:
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = len(self._user_ids)
+            self._user_ids.append(user_id)
+        return user
+
+    def _intern_subject(self, subject: str) -> int:
+        subject_idx = self._subjects.get(subject)
+        if subject_idx is None:
+            subject_idx = self._subjects[subject] = len(self._subject_names)
+            self._subject_names.append(subject)
+        return subject_idx
+
+    def _intern(self, user_id: str, subject: str) -> Tuple[int, int]:
+        return self._intern_user(user_id), self._intern_subject(subject)
+
+    def _rollup(self, user: int, subject: int, day: int) -> _Rollup:
+        rollup = self._rollups.get((user, subject))
+        if rollup is None:
+            rollup = self._rollups[(user, subject)] = _Rollup(day)
+            if subject != ALL_SUBJECTS:
+                self._user_subjects.setdefault(user, []).append(subject)
+        return rollup
+
+    def append(self, user_id: str, subject: str, progress: float, timestamp: float = None):
+        timestamp = clock.now() if timestamp is None else timestamp
+        day = _day(timestamp)
+        with self._lock:
+            user, subject_idx = self._intern(user_id, subject)
+            self._buffer[self._size] = (user, subject_idx, progress, timestamp)
+            self._size += 1
+            self._rollup(user, subject_idx, day).add(day, progress)
+            self._rollup(user, ALL_SUBJECTS, day).add(day, 0.0)
+            if self._size == self.segment_size:
+                self._spill()
+
+    def _spill(self):
+        segment = self._buffer[:self._size].copy()
+        if self.directory:
+            path = os.path.join(self.directory, f"segment-{self.writer}-{self._written:06d}.npy")
+            staging = os.path.join(self.directory, f"staging-{self.writer}.npy")
+            np.save(staging, segment)
+            # The vocabulary goes first, so a published segment never holds unknown ids
+            self._write_vocabulary()
+            os.replace(staging, path)
+            self._written += 1
+            self._segments.append((path, None))
+        else:
+            self._segments.append((segment, None))
+        self._size = 0
+
+    def _write_vocabulary(self):
+        path = os.path.join(self.directory, f"vocabulary-{self.writer}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump({"users": self._user_ids, "subjects": self._subject_names}, f)
+        os.replace(path + ".tmp", path)
+
+    def flush(self):
+        """Write buffered samples out as a (short) segment, e.g. at shutdown"""
+        with self._lock:
+            if self._size:
+                self._spill()
+
+    def _load(self):
+        for vocabulary_path in sorted(glob.glob(os.path.join(self.directory, "vocabulary-*.json"))):
+            writer = os.path.basename(vocabulary_path)[len("vocabulary-"):-len(".json")]
+            with open(vocabulary_path) as f:
+                vocabulary = json.load(f)
+            # The writer's indices -> this instance's
+            remap = (np.array([self._intern_user(user_id) for user_id in vocabulary["users"]], dtype=np.int32),
+                     np.array([self._intern_subject(subject) for subject in vocabulary["subjects"]], dtype=np.int32))
+            for path in sorted(glob.glob(os.path.join(self.directory, f"segment-{writer}-*.npy"))):
+                self._segments.append((path, remap))
+                self._replay(self._read(path, remap))
+
+    @staticmethod
+    def _read(segment, remap) -> np.ndarray:
+        """A segment's samples, with user and subject indices in this instance's terms"""
+        data = np.load(segment, mmap_mode="r") if isinstance(segment, str) else segment
+        if remap is None:
+            return data
+        data = np.array(data)
+        data["user"] = remap[0][data["user"]]
+        data["subject"] = remap[1][data["subject"]]
+        return data
+
+    def _replay(self, segment: np.ndarray):
+        """Fold a whole segment into the rollups, one update per (user, subject, day)"""
+        days = (segment["timestamp"] // SECONDS_PER_DAY).astype(np.int64)
+        for users, subjects in ((segment["user"], segment["subject"]),
+                                (segment["user"], np.full(len(segment), ALL_SUBJECTS, dtype=np.int32))):
+            order = np.lexsort((segment["timestamp"], days, subjects, users))
+            keys = np.stack([users[order], subjects[order], days[order]], axis=1)
+            last = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1).tolist() + [True])
+            counts = np.diff(np.concatenate([[-1], last]))
+            progress = segment["progress"][order][last]
+            for (user, subject, day), value, count in zip(keys[last].tolist(), progress.tolist(), counts.tolist()):
+                self._rollup(user, subject, day).add(day, value if subject != ALL_SUBJECTS else 0.0, count)
+
+    def samples(self, user_id: str, subject: Optional[str] = None, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Raw samples of one student (optionally one subject), oldest first"""
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return []
+            segments = list(self._segments) + [(self._buffer[:self._size].copy(), None)]
+            subject_idx = self._subjects.get(subject) if subject is not None else None
+
+        result = []
+        for segment, remap in segments:
+            data = self._read(segment, remap)
+            mask = data["user"] == user
+            if subject_idx is not None:
+                mask &= data["subject"] == subject_idx
+            if since is not None:
+                mask &= data["timestamp"] >= since
+            for row in data[mask]:
+                result.append({
+                    "subject": self._subject_names[row["subject"]],
+                    "progress": float(row["progress"]),
+                    "timestamp": float(row["timestamp"])
+                })
+        return result
+
+    def trend(self, user_id: str, subject: Optional[str] = None, days: int = 14, weeks: int = 8) -> Dict[str, Any]:
+        """
+        Streak of consecutive active days, current progress, 7-day velocity
+        (progress per day), least-squares forecast of the completion date,
+        and the daily / weekly closing progress, for one subject or the
+        mean over all of the student's subjects.
+        """
+        today = _day(clock.now())
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return {"user_id": user_id, "samples": 0}
+            if subject is not None:
+                keys = [(user, self._subjects[subject])] if subject in self._subjects else []
+            else:
+                keys = [(user, subject_idx) for subject_idx in self._user_subjects.get(user, [])]
+            rollups = [self._rollups[key] for key in keys if key in self._rollups]
+            activity = self._rollups[(user, ALL_SUBJECTS)]
+            window = max(days, 8)
+            daily = np.array([rollup.daily(today, window) for rollup in rollups], dtype=np.float64).reshape(len(rollups), window)
+            week_closes = [
+                (rollup.first_week, _ffill(rollup.week_close.astype(np.float64))) for rollup in rollups
+            ]
+            active = activity.active(today)
+            week_days = activity.week_days.copy()
+            first_week = activity.first_week
+
+        # Mean over subjects that have started; all-NaN days stay NaN
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            series = np.nanmean(daily, axis=0) if len(daily) else np.full(window, np.nan)
+
+        # Streak: consecutive active days ending today (or yesterday, if today has no sample yet)
+        recent = active[::-1]
+        if len(recent) and not recent[0]:
+            recent = recent[1:]
+        streak = int(np.argmin(recent)) if len(recent) and not recent.all() else len(recent)
+
+        current = float(series[-1]) if not np.isnan(series[-1]) else None
+        velocity = None
+        if current is not None and not np.isnan(series[-8]):
+            velocity = (current - float(series[-8])) / 7.0
+
+        forecast = None
+        known = ~np.isnan(series)
+        if known.sum() >= 2:
+            x = np.arange(window, dtype=np.float64)[known]
+            slope = float(np.polyfit(x, series[known], 1)[0])
+            if slope > 0 and current is not None and current < 1.0:
+                days_left = int(np.ceil((1.0 - current) / slope))
+                if days_left <= FORECAST_HORIZON_DAYS:
+                    forecast = (datetime.date(1970, 1, 1) + datetime.timedelta(days=today + days_left)).isoformat()
+            elif current is not None and current >= 1.0:
+                forecast = (datetime.date(1970, 1, 1) + datetime.timedelta(days=today)).isoformat()
+
+        this_week = _week(today)
+        weekly = []
+        for offset in range(weeks - 1, -1, -1):
+            week = this_week - offset
+            closes = [float(closes[week - start]) for start, closes in week_closes
+                      if 0 <= week - start < len(closes) and not np.isnan(closes[week - start])]
+            index = week - first_week
+            weekly.append({
+                "week_start": (datetime.date(1970, 1, 1) + datetime.timedelta(days=7 * week - 3)).isoformat(),
+                "progress": round(sum(closes) / len(closes), 4) if closes else None,
+                "active_days": int(week_days[index]) if 0 <= index < len(week_days) else 0
+            })
+
+        return {
+            "user_id": user_id,
+            "subject": subject,
+            "samples": int(activity.count.sum()),
+            "current_progress": None if current is None else round(current, 4),
+            "streak_days": streak,
+            "velocity_7d": None if velocity is None else round(velocity, 4),
+            "forecast_completion": forecast,
+            "daily": [None if np.isnan(value) else round(float(value), 4) for value in series[-days:]],
+            "weekly": weekly
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "students": len(self._user_ids),
+            "series": len(self._rollups),
+            "buffered_samples": self._size,
+            "segments": len(self._segments)
+        }
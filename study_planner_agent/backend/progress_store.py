@@ -0,0 +1,134 @@
+"""
+Columnar Progress Store
+Keeps the latest progress of every (student, subject) pair in NumPy arrays,
+plus a short ring of recent samples per row, so the progress analyzer can
+scan the whole cohort with vectorized operations
+"""
+import threading
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+import clock
+
+SECONDS_PER_DAY = 86400.0
+
+class ProgressStore:
+    """
+    One row per (user, subject). Columns: user index, subject index, latest
+    progress, last update time, and the last `history` samples (progress and
+    time) used for the trend slope. Arrays grow by doubling.
+    """
+
+    def __init__(self, capacity: int = 1024, history: int = 8):
+        self.history = history
+        self._user_index: Dict[str, int] = {}
+        self._user_ids: List[str] = []
+        self._subject_index: Dict[str, int] = {}
+        self._rows: Dict[Tuple[int, int], int] = {}
+        self._user_rows: Dict[int, List[int]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.user = np.zeros(capacity, dtype=np.int32)
+        self.subject = np.zeros(capacity, dtype=np.int32)
+        self.progress = np.zeros(capacity, dtype=np.float32)
+        self.updated_at = np.zeros(capacity, dtype=np.float64)
+        self.sample_progress = np.full((capacity, history), np.nan, dtype=np.float32)
+        self.sample_time = np.full((capacity, history), np.nan, dtype=np.float64)
+        self.sample_count = np.zeros(capacity, dtype=np.int64)
+
+    def _grow(self, capacity: int):
+        def grow(array, fill):
+            new = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            new[:self._size] = array[:self._size]
+            return new
+
+        self.user = grow(self.user, 0)
+        self.subject = grow(self.subject, 0)
+        self.progress = grow(self.progress, 0)
+        self.updated_at = grow(self.updated_at, 0)
+        self.sample_progress = grow(self.sample_progress, np.nan)
+        self.sample_time = grow(self.sample_time, np.nan)
+        self.sample_count = grow(self.sample_count, 0)
+
+    def _row_for(self, user_id: str, subject: str) -> int:
+        user = self._user_index.get(user_id)
+        if user is None:
+            user = self._user_index[user_id] = len(self._user_ids)
+            self._user_ids.append(user_id)
+        subject_idx = self._subject_index.setdefault(subject, len(self._subject_index))
+
+        row = self._rows.get((user, subject_idx))
+        if row is None:
+            if self._size == len(self.progress):
+                self._grow(2 * len(self.progress))
+            row = self._rows[(user, subject_idx)] = self._size
+            self._user_rows.setdefault(user, []).append(row)
+            self._size += 1
+            self.user[row] = user
+            self.subject[row] = subject_idx
+        return row
+
+    def record(self, user_id: str, subject: str, progress: float, timestamp: float = None):
+        """Record the latest progress (0.0-1.0) of one student in one subject"""
+        timestamp = clock.now() if timestamp is None else timestamp
+        with self._lock:
+            row = self._row_for(user_id, subject)
+            self.progress[row] = progress
+            self.updated_at[row] = timestamp
+            slot = self.sample_count[row] % self.history
+            self.sample_progress[row, slot] = progress
+            self.sample_time[row, slot] = timestamp
+            self.sample_count[row] += 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def student_count(self) -> int:
+        return len(self._user_ids)
+
+    def student_average(self, user_id: str, default: float = 0.5) -> float:
+        """Mean latest progress across one student's subjects"""
+        with self._lock:
+            user = self._user_index.get(user_id)
+            if user is None:
+                return default
+            return float(np.mean(self.progress[self._user_rows[user]]))
+
+    def analyze(self, threshold: float = 0.3) -> Dict[str, Any]:
+        """
+        Vectorized cohort scan. Returns per-student average progress and
+        trend slope (progress per day, least squares over recent samples),
+        and the indices of students whose average is below threshold.
+        """
+        with self._lock:
+            n = self._size
+            users = self.user[:n].copy()
+            progress = self.progress[:n].astype(np.float64)
+            sample_p = self.sample_progress[:n].astype(np.float64)
+            sample_t = self.sample_time[:n] / SECONDS_PER_DAY
+            user_ids = list(self._user_ids)
+
+        student_count = len(user_ids)
+        if n == 0:
+            return {"user_ids": [], "average": np.zeros(0), "slope": np.zeros(0), "below": np.zeros(0, dtype=np.int64)}
+
+        rows_per_student = np.bincount(users, minlength=student_count)
+        average = np.bincount(users, weights=progress, minlength=student_count) / np.maximum(rows_per_student, 1)
+
+        # Per-row least squares slope over the valid (non-NaN) samples
+        valid = ~np.isnan(sample_p)
+        counts = valid.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t_mean = np.nansum(sample_t, axis=1) / counts
+            p_mean = np.nansum(sample_p, axis=1) / counts
+            dt = np.where(valid, sample_t - t_mean[:, None], 0.0)
+            dp = np.where(valid, sample_p - p_mean[:, None], 0.0)
+            denominator = (dt * dt).sum(axis=1)
+            row_slope = np.where((counts >= 2) & (denominator > 0), (dt * dp).sum(axis=1) / denominator, 0.0)
+        slope = np.bincount(users, weights=row_slope, minlength=student_count) / np.maximum(rows_per_student, 1)
+
+        below = np.flatnonzero(average < threshold)
+        return {"user_ids": user_ids, "average": average, "slope": slope, "below": below}
@@ -1,25 +1,35 @@
-import chromadb
-from chromadb.config import Settings
-import google.generativeai as genai
 import os
+from startup import LazyComponent
 
 CHROMA_PATH = "chroma_db"
 
-# Use Gemini for embeddings instead of sentence-transformers
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+def _open_collection():
+    import chromadb
+    from chromadb.config import Settings
+    import google.generativeai as genai
 
-client = chromadb.Client(
-    Settings(
-        persist_directory=CHROMA_PATH,
-        anonymized_telemetry=False
+    # Use Gemini for embeddings instead of sentence-transformers
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+
+    client = chromadb.Client(
+        Settings(
+            persist_directory=CHROMA_PATH,
+            anonymized_telemetry=False
+        )
     )
-)
+    return client.get_or_create_collection("study_materials")
 
-collection = client.get_or_create_collection("study_materials")
+# Opened by the app's lifespan hook (or on first RAG call), not at import time
+chroma = LazyComponent("chroma", _open_collection, budget_ms=3000)
+
+def get_collection():
+    return chroma.get()
 
 def embed(text: str):
     """Use Gemini's embedding API for text embeddings"""
     try:
+        import google.generativeai as genai
+
         result = genai.embed_content(
             model="models/embedding-001",
             content=text,
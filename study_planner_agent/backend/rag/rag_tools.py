@@ -1,5 +1,5 @@
 from typing import Dict, List
-from .chroma_client import collection, embed
+from .chroma_client import get_collection, embed
 import json
 
 def add_to_rag(data: Dict) -> Dict[str, str]:
@@ -22,7 +22,7 @@ def add_to_rag(data: Dict) -> Dict[str, str]:
         # Generate unique ID
         doc_id = str(abs(hash(text + str(metadata))))
         
-        collection.add(
+        get_collection().add(
             documents=[text],
             embeddings=[embed(text)],
             ids=[doc_id],
@@ -49,7 +49,7 @@ def retrieve_from_rag(data: Dict) -> Dict[str, str]:
             return {"context": "No query provided", "sources": []}
             
         # Retrieve with more results for better context
-        results = collection.query(
+        results = get_collection().query(
             query_embeddings=[embed(query)],
             n_results=5,
             include=["documents", "metadatas", "distances"]
@@ -102,7 +102,7 @@ def search_rag_by_subject(data: Dict) -> Dict[str, any]:
             return {"status": "error", "message": "No subject specified"}
         
         # Query with subject-specific search
-        results = collection.query(
+        results = get_collection().query(
             query_embeddings=[embed(subject)],
             n_results=10,
             include=["documents", "metadatas"],
@@ -137,7 +137,7 @@ def get_rag_statistics() -> Dict[str, any]:
     """
     try:
         # Get collection info
-        collection_info = collection.get()
+        collection_info = get_collection().get()
         
         total_documents = len(collection_info.get("documents", []))
         metadatas = collection_info.get("metadatas", [])
@@ -0,0 +1,57 @@
+"""
+Response Contracts and Sparse Fieldsets
+Plan endpoints return a fixed set of top-level fields; ?fields= picks a
+subset, and the result is serialized in one pass (orjson when installed)
+straight into the response body
+"""
+import json
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Always sent, whatever ?fields= asks for
+ALWAYS = ("success", "error")
+
+PLAN_FIELDS = ("user", "study_plan", "calendar_events", "formatted_schedule", "planner",
+               "autonomous_monitoring", "message")
+REPLAN_FIELDS = ("user", "status", "diff", "calendar_events", "study_plan")
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=str, separators=(",", ":")).encode()
+
+class FastJSONResponse(Response):
+    """JSON response serialized once by dumps(), skipping FastAPI's jsonable_encoder pass"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def parse_fields(fields: Optional[str], allowed: Tuple[str, ...]) -> Optional[Tuple[str, ...]]:
+    """The requested field names (None for all), rejecting names outside the contract"""
+    if not fields:
+        return None
+    requested = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in allowed and name not in ALWAYS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields {', '.join(unknown)}; choose from {', '.join(allowed)}"
+        )
+    return requested
+
+def select_fields(payload: Dict[str, Any], allowed: Iterable[str], fields: Optional[str] = None) -> Dict[str, Any]:
+    """The contract's fields of payload (or just the requested ones), plus success/error"""
+    allowed = tuple(allowed)
+    requested = parse_fields(fields, allowed) or allowed
+    return {name: payload[name] for name in ALWAYS + requested if name in payload}
+
+def contract_response(payload: Dict[str, Any], allowed: Iterable[str], fields: Optional[str] = None) -> FastJSONResponse:
+    return FastJSONResponse(select_fields(payload, allowed, fields))
@@ -0,0 +1,150 @@
+"""
+Spaced-Repetition Review Engine
+Generated questions become SM-2 review cards in SQLite. An index on
+(user_id, due) acts as every user's due queue, so serving due cards is an
+index range read and only the cards being reviewed are ever in memory
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional
+
+import clock
+
+SECONDS_PER_DAY = 86400.0
+MIN_EASE = 1.3
+
+def sm2(quality: int, reps: int, interval: float, ease: float):
+    """
+    One SM-2 step. quality is 0-5 (>= 3 means recalled). Returns the new
+    (reps, interval in days, ease).
+    """
+    if quality < 3:
+        reps, interval = 0, 1.0
+    else:
+        reps += 1
+        interval = 1.0 if reps == 1 else 6.0 if reps == 2 else round(interval * ease, 1)
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return reps, interval, ease
+
+class ReviewStore:
+    """
+    cards table: one compact row per (user, question), deduplicated by a
+    hash of the question text, with SM-2 state and the next due time.
+    """
+
+    def __init__(self, path: str = "reviews.db"):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cards ("
+                "id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, question_hash BLOB NOT NULL, "
+                "card TEXT NOT NULL, due REAL NOT NULL, interval REAL NOT NULL DEFAULT 0, "
+                "ease REAL NOT NULL DEFAULT 2.5, reps INTEGER NOT NULL DEFAULT 0, "
+                "lapses INTEGER NOT NULL DEFAULT 0, last_review REAL)"
+            )
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS cards_question ON cards (user_id, question_hash)")
+            conn.execute("CREATE INDEX IF NOT EXISTS cards_due ON cards (user_id, due)")
+            self._local.conn = conn
+        return conn
+
+    def add_cards(self, user_id: str, questions: List[Dict[str, Any]], source: str = "notes") -> List[int]:
+        """Store questions as new cards due now; a question the user already has keeps its card"""
+        now = clock.now()
+        rows = []
+        for question in questions:
+            if not question.get("question"):
+                continue
+            card = {key: question[key] for key in ("type", "difficulty", "question", "options", "correct_answer", "explanation") if key in question}
+            card["source"] = source
+            digest = hashlib.blake2b(question["question"].strip().lower().encode(), digest_size=12).digest()
+            rows.append((user_id, digest, json.dumps(card, separators=(",", ":")), now))
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO cards (user_id, question_hash, card, due) VALUES (?, ?, ?, ?)", rows
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        ids = []
+        for user, digest, _, _ in rows:
+            row = conn.execute(
+                "SELECT id FROM cards WHERE user_id = ? AND question_hash = ?", (user, digest)
+            ).fetchone()
+            ids.append(row[0])
+        return ids
+
+    @staticmethod
+    def _to_dict(row) -> Dict[str, Any]:
+        card_id, card, due, interval, ease, reps, lapses = row
+        return dict(json.loads(card), card_id=card_id, due=due, interval_days=interval,
+                    ease=round(ease, 2), reps=reps, lapses=lapses)
+
+    def due(self, user_id: str, limit: int = 20, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Cards due by now, most overdue first (an index range read)"""
+        now = clock.now() if now is None else now
+        rows = self._connection().execute(
+            "SELECT id, card, due, interval, ease, reps, lapses FROM cards "
+            "WHERE user_id = ? AND due <= ? ORDER BY due LIMIT ?",
+            (user_id, now, limit)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def answer(self, user_id: str, card_id: int, quality: int) -> Optional[Dict[str, Any]]:
+        """Record a review (quality 0-5) and schedule the card's next due time"""
+        quality = max(0, min(5, int(quality)))
+        now = clock.now()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT interval, ease, reps, lapses FROM cards WHERE id = ? AND user_id = ?", (card_id, user_id)
+            ).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return None
+            interval, ease, reps, lapses = row
+            reps, interval, ease = sm2(quality, reps, interval, ease)
+            lapses += quality < 3
+            conn.execute(
+                "UPDATE cards SET due = ?, interval = ?, ease = ?, reps = ?, lapses = ?, last_review = ? WHERE id = ?",
+                (now + interval * SECONDS_PER_DAY, interval, ease, reps, lapses, now, card_id)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        row = conn.execute(
+            "SELECT id, card, due, interval, ease, reps, lapses FROM cards WHERE id = ?", (card_id,)
+        ).fetchone()
+        return self._to_dict(row)
+
+    def stats(self, user_id: str) -> Dict[str, Any]:
+        conn = self._connection()
+        now = clock.now()
+        due_now = conn.execute("SELECT COUNT(*) FROM cards WHERE user_id = ? AND due <= ?", (user_id, now)).fetchone()[0]
+        total = conn.execute("SELECT COUNT(*) FROM cards WHERE user_id = ?", (user_id,)).fetchone()[0]
+        next_due = conn.execute(
+            "SELECT MIN(due) FROM cards WHERE user_id = ? AND due > ?", (user_id, now)
+        ).fetchone()[0]
+        return {
+            "total_cards": total,
+            "due_now": due_now,
+            "next_due_in": None if next_due is None else round(next_due - now, 1)
+        }
+
+# Global review store shared by the API routes
+review_store = ReviewStore(os.getenv("REVIEW_DB_PATH", "reviews.db"))
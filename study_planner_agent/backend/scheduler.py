@@ -0,0 +1,212 @@
+"""
+Timer-Heap Scheduler for Autonomous Agents
+One dispatcher thread keeps a heap of next-run times and hands due agent
+cycles to a small worker pool, instead of one sleeping thread per agent
+"""
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+import clock
+
+logger = logging.getLogger(__name__)
+
+class _Entry:
+    def __init__(self, agent):
+        self.agent = agent
+        self.failures = 0
+        self.runs = 0
+        self.next_run = 0.0
+        self.generation = 0  # bumped on re-add so stale heap items are ignored
+        self.running = False
+        self.woken_at: Optional[float] = None  # wake() that arrived while a cycle was in flight
+
+class AgentScheduler:
+    """
+    Drives agent.run_cycle() for every registered agent. run_cycle returns
+    the seconds until the agent wants to run again; that delay gets +/- jitter
+    so agents don't wake in lockstep (unless the agent sets timer_jitter =
+    False to wake exactly). A failing cycle is retried with exponential
+    backoff (base_backoff doubling up to max_backoff).
+    """
+
+    def __init__(self, max_workers: int = 4, jitter: float = 0.1,
+                 base_backoff: float = 5.0, max_backoff: float = 3600.0, seed: Optional[int] = None):
+        self.max_workers = max_workers
+        self.jitter = jitter
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._heap: List[tuple] = []
+        self._entries: Dict[str, _Entry] = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._random = random.Random(seed)
+        self.cycles_run = 0
+        self.cycle_errors = 0
+        self.cycle_seconds = 0.0
+
+    def add_agent(self, agent, delay: float = 0.0, start: bool = True):
+        """
+        Register an agent (replacing one with the same name) and run it after
+        delay. Pass start=False to drive the scheduler with run_until() instead.
+        """
+        with self._cond:
+            entry = _Entry(agent)
+            previous = self._entries.get(agent.name)
+            if previous:
+                entry.generation = previous.generation + 1
+            self._entries[agent.name] = entry
+            self._push(entry, delay)
+        if start:
+            self.start()
+
+    def remove_agent(self, name: str):
+        """Stop scheduling an agent; a cycle already in flight finishes normally"""
+        with self._cond:
+            self._entries.pop(name, None)
+            self._cond.notify()
+
+    def wake(self, name: str, at: float):
+        """Bring an agent's next run forward to timestamp `at` (no-op if it already runs sooner)"""
+        with self._cond:
+            entry = self._entries.get(name)
+            if entry is None:
+                return
+            if entry.running:
+                # Applied when the cycle reschedules, which would otherwise overwrite it
+                entry.woken_at = at if entry.woken_at is None else min(entry.woken_at, at)
+                return
+            if at >= entry.next_run:
+                return
+            entry.next_run = at
+            heapq.heappush(self._heap, (at, next(self._counter), name, entry.generation))
+            self._cond.notify()
+
+    def _push(self, entry: _Entry, delay: float):
+        entry.next_run = clock.now() + delay
+        heapq.heappush(self._heap, (entry.next_run, next(self._counter), entry.agent.name, entry.generation))
+        self._cond.notify()
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="agent-worker")
+            self._thread = threading.Thread(target=self._dispatch_loop, daemon=True, name="agent-scheduler")
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._pool:
+            self._pool.shutdown(wait=False)
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, _, name, generation = self._heap[0]
+                wait = due - clock.now()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                heapq.heappop(self._heap)
+                entry = self._entries.get(name)
+                if entry is None or entry.generation != generation or entry.next_run != due:
+                    continue
+                entry.running = True
+            try:
+                self._pool.submit(self._run_cycle, entry)
+            except RuntimeError:
+                # Pool shut down (scheduler stopped or interpreter exiting)
+                return
+
+    def run_until(self, until: float) -> int:
+        """
+        Run every cycle due by `until` synchronously, in due-time order,
+        moving the installed clock forward to each due time. Requires a
+        clock.VirtualClock and is used instead of start() for simulations;
+        returns the number of cycles run.
+        """
+        runs = 0
+        while True:
+            with self._cond:
+                if not self._heap or self._heap[0][0] > until:
+                    break
+                due, _, name, generation = heapq.heappop(self._heap)
+                entry = self._entries.get(name)
+                if entry is None or entry.generation != generation or entry.next_run != due:
+                    continue
+                entry.running = True
+            clock.get_clock().set_time(due)
+            self._run_cycle(entry)
+            runs += 1
+        clock.get_clock().set_time(until)
+        return runs
+
+    def _run_cycle(self, entry: _Entry):
+        started = time.perf_counter()
+        failed = False
+        delay = self.base_backoff
+        try:
+            try:
+                delay = entry.agent.run_cycle()
+            except Exception as e:
+                failed = True
+                with self._cond:
+                    entry.failures += 1
+                    delay = min(self.max_backoff, self.base_backoff * 2 ** (entry.failures - 1))
+                try:
+                    entry.agent.on_cycle_error(e, delay)
+                except Exception:
+                    logger.exception("%s: error handler failed after a failed cycle", entry.agent.name)
+        finally:
+            # Always rescheduled, or a raising hook would stop the agent for good.
+            # Cycles finish on several worker threads at once, hence the lock.
+            elapsed = time.perf_counter() - started
+            with self._cond:
+                if not failed:
+                    entry.failures = 0
+                entry.runs += 1
+                self.cycles_run += 1
+                self.cycle_errors += failed
+                self.cycle_seconds += elapsed
+                if getattr(entry.agent, "timer_jitter", True):
+                    delay *= 1 + self._random.uniform(-self.jitter, self.jitter)
+                if entry.woken_at is not None:
+                    delay = min(delay, entry.woken_at - clock.now())
+                    entry.woken_at = None
+                entry.running = False
+                # Only reschedule if the agent is still registered as this entry
+                if self._entries.get(entry.agent.name) is entry:
+                    self._push(entry, max(0.0, delay))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "agents": len(self._entries),
+                "workers": self.max_workers,
+                "queued_timers": len(self._heap),
+                "cycles_run": self.cycles_run,
+                "cycle_errors": self.cycle_errors,
+                "cycle_seconds": round(self.cycle_seconds, 3),
+                "next_run_in": max(0.0, self._heap[0][0] - clock.now()) if self._heap else None,
+                "failures": {name: entry.failures for name, entry in self._entries.items() if entry.failures}
+            }
+
+# Global scheduler shared by all autonomous agents
+scheduler = AgentScheduler()
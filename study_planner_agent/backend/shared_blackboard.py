@@ -0,0 +1,391 @@
+"""
+SQLite-backed Blackboard shared across worker processes
+Every uvicorn/gunicorn worker on one host opens the same WAL-mode database,
+so agent state, goals, shared context and events are visible to all of them
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping, Sequence
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Dict, Any, List, Optional, Tuple
+
+import clock
+from blackboard import Blackboard, AgentState, AgentStatus, StudyGoal
+from partitions import PartitionManager, PartitionStore
+from deadline_index import DeadlineIndex
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS agents (name TEXT PRIMARY KEY, state TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS study_goals (subject TEXT PRIMARY KEY, goal TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS shared_context (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp REAL NOT NULL,
+    type TEXT NOT NULL,
+    source TEXT NOT NULL,
+    data TEXT NOT NULL,
+    origin INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS progress_samples (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    progress REAL NOT NULL,
+    timestamp REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS revocations (uid TEXT PRIMARY KEY, revoked_before REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS events_timestamp ON events (timestamp);
+CREATE INDEX IF NOT EXISTS events_type_timestamp ON events (type, timestamp);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+"""
+
+class SQLiteStore:
+    """Thread-local SQLite connections plus a write helper that bumps the board version"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self.connection().executescript(SCHEMA)
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def read(self, sql: str, params: tuple = ()) -> List[tuple]:
+        return self.connection().execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self):
+        """
+        BEGIN IMMEDIATE ... COMMIT with the version bump: takes the write lock
+        up front, so a read-modify-write inside it cannot lose another
+        process's update
+        """
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def write(self, sql: str, params: tuple = ()) -> int:
+        """Run one write and the version bump in a single transaction, return lastrowid"""
+        with self.transaction() as conn:
+            return conn.execute(sql, params).lastrowid
+
+    def write_many(self, sql: str, rows: List[tuple]):
+        """Run one statement for many rows and bump the version once, in one transaction"""
+        with self.transaction() as conn:
+            conn.executemany(sql, rows)
+
+    def version(self) -> int:
+        return self.read("SELECT value FROM meta WHERE key = 'version'")[0][0]
+
+    def bump_version(self):
+        self.write("UPDATE meta SET value = value WHERE key = 'version'")
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=str)
+
+class SharedContext(MutableMapping):
+    """dict-like view over the shared_context table (values are JSON encoded)"""
+
+    def __init__(self, store: SQLiteStore):
+        self._store = store
+
+    def __getitem__(self, key: str) -> Any:
+        rows = self._store.read("SELECT value FROM shared_context WHERE key = ?", (key,))
+        if not rows:
+            raise KeyError(key)
+        return json.loads(rows[0][0])
+
+    def __setitem__(self, key: str, value: Any):
+        self._store.write(
+            "INSERT INTO shared_context (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, _dumps(value))
+        )
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        self._store.write("DELETE FROM shared_context WHERE key = ?", (key,))
+
+    def __contains__(self, key: object) -> bool:
+        return bool(self._store.read("SELECT 1 FROM shared_context WHERE key = ?", (key,)))
+
+    def __iter__(self):
+        return iter([row[0] for row in self._store.read("SELECT key FROM shared_context ORDER BY key")])
+
+    def __len__(self) -> int:
+        return self._store.read("SELECT COUNT(*) FROM shared_context")[0][0]
+
+class SharedEventLog(Sequence):
+    """list-like, append-only view over the events table ordered by insertion"""
+
+    def __init__(self, store: SQLiteStore):
+        self._store = store
+
+    @staticmethod
+    def _row_to_event(row: tuple) -> Dict[str, Any]:
+        return {"id": row[0], "type": row[2], "data": json.loads(row[4]), "source": row[3], "timestamp": row[1]}
+
+    INSERT = "INSERT INTO events (timestamp, type, source, data, origin) VALUES (?, ?, ?, ?, ?)"
+
+    @staticmethod
+    def _event_row(event: Dict[str, Any]) -> tuple:
+        return (event["timestamp"], event["type"], event["source"], _dumps(event["data"]), os.getpid())
+
+    def append(self, event: Dict[str, Any]):
+        self._store.write(self.INSERT, self._event_row(event))
+
+    def extend(self, events: List[Dict[str, Any]]):
+        self._store.write_many(self.INSERT, [self._event_row(event) for event in events])
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None,
+              event_type: Optional[str] = None, source: Optional[str] = None,
+              cursor: Optional[int] = None, limit: int = 100) -> Dict[str, Any]:
+        """Same contract as EventLog.query, answered from the timestamp/type indexes"""
+        clauses, params = [], []
+        for clause, value in (("timestamp >= ?", since), ("timestamp < ?", until),
+                              ("type = ?", event_type), ("source = ?", source), ("id >= ?", cursor)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._store.read(
+            f"SELECT * FROM events {where} ORDER BY id LIMIT ?", tuple(params) + (limit + 1,)
+        )
+        page = [self._row_to_event(row) for row in rows]
+        next_cursor = page[limit]["id"] if len(page) > limit else None
+        return {"events": page[:limit], "next_cursor": next_cursor}
+
+    def last_id(self) -> int:
+        return self._store.read("SELECT COALESCE(MAX(id), 0) FROM events")[0][0]
+
+    def foreign_since(self, last_id: int) -> List[tuple]:
+        """(id, event) pairs posted by other processes after last_id"""
+        rows = self._store.read(
+            "SELECT * FROM events WHERE id > ? AND origin != ? ORDER BY id", (last_id, os.getpid())
+        )
+        return [(row[0], self._row_to_event(row)) for row in rows]
+
+    def __len__(self) -> int:
+        return self._store.read("SELECT COUNT(*) FROM events")[0][0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if stop <= start:
+                return []
+            rows = self._store.read(
+                "SELECT * FROM events ORDER BY id LIMIT ? OFFSET ?", (stop - start, start)
+            )
+            return [self._row_to_event(row) for row in rows][::step]
+
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("event index out of range")
+        rows = self._store.read("SELECT * FROM events ORDER BY id LIMIT 1 OFFSET ?", (index,))
+        return self._row_to_event(rows[0])
+
+class SharedBlackboard(Blackboard):
+    """
+    Blackboard with the same API as the in-memory one, persisted in SQLite WAL.
+    Change notification is the version counter in the meta table, bumped by every write.
+    """
+
+    def __init__(self, path: str = "blackboard.db", poll_interval: float = 0.1):
+        self._store = SQLiteStore(path)
+        self.shared_context = SharedContext(self._store)
+        self.events = SharedEventLog(self._store)
+        self.poll_interval = poll_interval
+        self._init_event_bus()
+        self._synced_event_id = self.events.last_id()
+        self._sync_lock = threading.Lock()
+        self._progress = None
+        self._history = None
+        self._synced_progress_id = 0
+        self.deadlines = DeadlineIndex()
+        # Nothing cached per process: every partition read/write goes to the shared file
+        self.partitions = PartitionManager(PartitionStore(path), max_resident=0)
+
+    @property
+    def agents(self) -> Dict[str, AgentState]:
+        agents = {}
+        for name, state in self._store.read("SELECT name, state FROM agents"):
+            data = json.loads(state)
+            data["status"] = AgentStatus(data["status"])
+            agents[name] = AgentState(**data)
+        return agents
+
+    @property
+    def study_goals(self) -> Tuple[StudyGoal, ...]:
+        """
+        Snapshot of the goals (a tuple, so an append fails loudly instead of
+        being lost); change them with add_goal() and update_goal()
+        """
+        rows = self._store.read("SELECT goal FROM study_goals ORDER BY rowid")
+        return tuple(StudyGoal(**json.loads(row[0])) for row in rows)
+
+    def add_goal(self, goal: StudyGoal):
+        """Add a board-wide study goal, replacing any goal for the same subject"""
+        self._store.write(
+            "INSERT INTO study_goals (subject, goal) VALUES (?, ?) "
+            "ON CONFLICT(subject) DO UPDATE SET goal = excluded.goal",
+            (goal.subject, _dumps(asdict(goal)))
+        )
+
+    def update_goal(self, subject: str, **changes) -> Optional[StudyGoal]:
+        """Set fields of the board-wide goal for subject; returns it, or None if there is none"""
+        with self._store.transaction() as conn:
+            row = conn.execute("SELECT goal FROM study_goals WHERE subject = ?", (subject,)).fetchone()
+            if row is None:
+                return None
+            goal = StudyGoal(**dict(json.loads(row[0]), **changes))
+            conn.execute("UPDATE study_goals SET goal = ? WHERE subject = ?", (_dumps(asdict(goal)), subject))
+        return goal
+
+    @property
+    def version(self) -> int:
+        return self._store.version()
+
+    def _changed(self):
+        # Every SQLiteStore.write already bumps the version inside its transaction
+        pass
+
+    def wait_for_change(self, since_version: int, timeout: Optional[float] = None) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            version = self.version
+            if version != since_version:
+                return version
+            if deadline is not None and time.monotonic() >= deadline:
+                return version
+            time.sleep(self.poll_interval)
+
+    def sync_events(self) -> int:
+        """
+        Deliver events other workers posted since the last sync to local queued
+        subscribers. Inline reactions already ran (and were persisted) in the
+        posting process, so they are skipped here.
+        """
+        with self._sync_lock:
+            foreign = self.events.foreign_since(self._synced_event_id)
+            if foreign:
+                self._synced_event_id = foreign[-1][0]
+        for _, event in foreign:
+            self.bus.publish(event, inline=False)
+        return len(foreign)
+
+    def record_progress(self, user_id: str, subject: str, progress: float):
+        """Add a progress sample; other workers pick it up in progress_view()"""
+        self._store.write(
+            "INSERT INTO progress_samples (user_id, subject, progress, timestamp) VALUES (?, ?, ?, ?)",
+            (user_id, subject, progress, clock.now())
+        )
+
+    @property
+    def history(self):
+        # The progress_samples table is the durable copy; the history here is a local in-memory view
+        if self._history is None:
+            from progress_history import ProgressHistory
+            self._history = ProgressHistory(directory=None)
+        return self._history
+
+    def _sync_progress(self):
+        """Top up the local stores with samples recorded by any worker"""
+        with self._sync_lock:
+            rows = self._store.read(
+                "SELECT id, user_id, subject, progress, timestamp FROM progress_samples WHERE id > ? ORDER BY id",
+                (self._synced_progress_id,)
+            )
+            for _, user_id, subject, progress, timestamp in rows:
+                self.progress.record(user_id, subject, progress, timestamp)
+                self.history.append(user_id, subject, progress, timestamp)
+            if rows:
+                self._synced_progress_id = rows[-1][0]
+
+    def progress_view(self):
+        """Local columnar store, topped up with samples recorded by any worker"""
+        self._sync_progress()
+        return self.progress
+
+    def history_view(self):
+        """Local progress history, topped up with samples recorded by any worker"""
+        self._sync_progress()
+        return self.history
+
+    def save_partition(self, partition):
+        """Persist changes made to a student partition"""
+        self.partitions.save(partition)
+        self._store.bump_version()
+
+    def revoke_tokens(self, uid: str, revoked_before: float, forget_before: float):
+        """
+        Reject uid's tokens issued before revoked_before in every worker, and
+        drop revocations made before forget_before (their tokens have expired).
+        Not a board change, so the version is left alone.
+        """
+        conn = self._store.connection()
+        conn.execute(
+            "INSERT INTO revocations (uid, revoked_before) VALUES (?, ?) "
+            "ON CONFLICT(uid) DO UPDATE SET revoked_before = max(revoked_before, excluded.revoked_before)",
+            (uid, revoked_before)
+        )
+        conn.execute("DELETE FROM revocations WHERE revoked_before < ?", (forget_before,))
+
+    def tokens_revoked_before(self, uid: str) -> Optional[float]:
+        rows = self._store.read("SELECT revoked_before FROM revocations WHERE uid = ?", (uid,))
+        return rows[0][0] if rows else None
+
+    def _save_agent(self, state: AgentState):
+        data = asdict(state)
+        data["status"] = state.status.value
+        self._store.write(
+            "INSERT INTO agents (name, state) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET state = excluded.state",
+            (state.name, _dumps(data))
+        )
+
+    def register_agent(self, agent_name: str):
+        """Register an agent with the blackboard"""
+        self._save_agent(AgentState(
+            name=agent_name,
+            status=AgentStatus.IDLE,
+            current_goal="",
+            last_action="initialized",
+            performance_score=1.0,
+            timestamp=clock.now()
+        ))
+
+    def _update_agent(self, agent_name: str, **changes):
+        """Set fields of one agent's state in a single transaction (no-op for unknown agents)"""
+        with self._store.transaction() as conn:
+            row = conn.execute("SELECT state FROM agents WHERE name = ?", (agent_name,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE agents SET state = ? WHERE name = ?",
+                             (_dumps(dict(json.loads(row[0]), **changes)), agent_name))
+
+    def update_agent_status(self, agent_name: str, status: AgentStatus, goal: str = ""):
+        """Update agent status and current goal"""
+        self._update_agent(agent_name, status=status.value, current_goal=goal, timestamp=clock.now())
+
+    def update_agent_performance(self, agent_name: str, score: float):
+        """Record an agent's rolling performance score"""
+        self._update_agent(agent_name, performance_score=round(score, 3))
@@ -0,0 +1,70 @@
+"""
+Lazy, Timed Startup of Heavy Components
+Clients such as Gemini, Chroma and Firebase are built on first use (or by the
+FastAPI lifespan hook), each exactly once, with its init time checked
+against a per-component budget
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+class LazyComponent:
+    """Builds its value with factory() on the first get(), once, thread-safely"""
+
+    def __init__(self, name: str, factory: Callable[[], Any], budget_ms: float = 1000.0):
+        self.name = name
+        self.factory = factory
+        self.budget_ms = budget_ms
+        self.elapsed_ms = None
+        self._value = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def get(self) -> Any:
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                started = time.perf_counter()
+                self._value = self.factory()
+                self.elapsed_ms = (time.perf_counter() - started) * 1000
+                self._ready = True
+                marker = "✅" if self.elapsed_ms <= self.budget_ms else "⚠️ over budget:"
+                print(f"{marker} {self.name} ready in {self.elapsed_ms:.0f}ms (budget {self.budget_ms:.0f}ms)")
+        return self._value
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self._ready,
+            "elapsed_ms": None if self.elapsed_ms is None else round(self.elapsed_ms, 1),
+            "budget_ms": self.budget_ms,
+            "within_budget": self.elapsed_ms is None or self.elapsed_ms <= self.budget_ms
+        }
+
+def init_concurrently(components: List[LazyComponent]) -> Dict[str, Any]:
+    """
+    Initialize independent components in parallel. A component that fails is
+    logged and left uninitialized, so it retries (and raises) on first use.
+    """
+    started = time.perf_counter()
+
+    def init(component: LazyComponent):
+        try:
+            component.get()
+        except Exception as e:
+            print(f"❌ {component.name} failed to initialize: {e}")
+
+    with ThreadPoolExecutor(max_workers=max(1, len(components))) as pool:
+        list(pool.map(init, components))
+
+    total_ms = (time.perf_counter() - started) * 1000
+    print(f"🚀 Startup of {len(components)} components took {total_ms:.0f}ms")
+    return {
+        "total_ms": round(total_ms, 1),
+        "components": {component.name: component.report() for component in components}
+    }
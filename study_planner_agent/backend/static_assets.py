@@ -0,0 +1,142 @@
+"""
+Fingerprinted, Precompressed Frontend Assets
+build() copies the frontend into a dist directory with content-hashed names
+and .gz/.br variants written once at build time; PrecompressedStaticFiles
+serves the variant the client accepts, and hashed files as immutable
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend")
+DIST_DIR = os.path.join(FRONTEND_DIR, "dist")
+FINGERPRINTED = (".js", ".css")
+COMPRESSIBLE = (".js", ".css", ".html", ".json", ".svg")
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.[a-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+def _write_variants(path: str, data: bytes) -> Dict[str, int]:
+    """Write path plus .gz (and .br, with brotli installed) next to it; returns sizes"""
+    sizes = {"identity": len(data)}
+    with open(path, "wb") as f:
+        f.write(data)
+    if not path.endswith(COMPRESSIBLE):
+        return sizes
+    compressed = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    brotli = _brotli()
+    if brotli is not None:
+        compressed[".br"] = brotli.compress(data, quality=11)
+    for suffix, body in compressed.items():
+        if len(body) < len(data):
+            with open(path + suffix, "wb") as f:
+                f.write(body)
+            sizes[suffix[1:]] = len(body)
+    return sizes
+
+def build(source: str = FRONTEND_DIR, output: str = DIST_DIR) -> Dict[str, str]:
+    """
+    Write fingerprinted copies of the frontend's scripts and styles, and an
+    index.html that points at them, to output. Returns the name -> hashed
+    name manifest (also saved as manifest.json).
+    """
+    if os.path.isdir(output):
+        shutil.rmtree(output)
+    os.makedirs(output)
+    manifest: Dict[str, str] = {}
+    report = {}
+    for name in sorted(os.listdir(source)):
+        path = os.path.join(source, name)
+        if not os.path.isfile(path) or name == "index.html":
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        if name.endswith(FINGERPRINTED):
+            stem, extension = os.path.splitext(name)
+            manifest[name] = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+        else:
+            manifest[name] = name
+        report[manifest[name]] = _write_variants(os.path.join(output, manifest[name]), data)
+
+    with open(os.path.join(source, "index.html"), encoding="utf-8") as f:
+        html = f.read()
+    html = re.sub(
+        r'((?:src|href)=")([^"]+)(")',
+        lambda match: match.group(1) + manifest.get(match.group(2), match.group(2)) + match.group(3),
+        html
+    )
+    report["index.html"] = _write_variants(os.path.join(output, "index.html"), html.encode("utf-8"))
+    with open(os.path.join(output, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    for name, sizes in report.items():
+        print(f"  {name}: " + ", ".join(f"{encoding} {size:,} B" for encoding, size in sizes.items()))
+    return manifest
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that answers with a prebuilt .br or .gz sibling when the
+    client accepts it (Content-Encoding set, type taken from the original
+    name). Fingerprinted names are cached for a year as immutable; anything
+    else (index.html) is revalidated on each load and usually gets a 304.
+    """
+
+    ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+    def _variant(self, full_path: str, accept_encoding: str) -> Optional[tuple]:
+        accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+        for encoding, suffix in self.ENCODINGS:
+            if encoding in accepted:
+                try:
+                    return encoding, full_path + suffix, os.stat(full_path + suffix)
+                except OSError:
+                    continue
+        return None
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        headers = {
+            "Cache-Control": IMMUTABLE if HASHED_NAME.search(full_path) else "no-cache",
+            "Vary": "Accept-Encoding"
+        }
+        variant = self._variant(full_path, request_headers.get("accept-encoding", ""))
+        if variant is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        else:
+            encoding, path, variant_stat = variant
+            headers["Content-Encoding"] = encoding
+            response = FileResponse(path, status_code=status_code, stat_result=variant_stat, headers=headers,
+                                    media_type=mimetypes.guess_type(full_path)[0] or "text/plain")
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+def static_app() -> PrecompressedStaticFiles:
+    """The built dist directory when there is one, else the frontend sources as they are"""
+    built = os.path.isfile(os.path.join(DIST_DIR, "manifest.json"))
+    if not built:
+        print("⚠️ Serving unbuilt frontend; run `python static_assets.py` for fingerprinted, precompressed assets")
+    return PrecompressedStaticFiles(directory=DIST_DIR if built else FRONTEND_DIR, html=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed frontend assets")
+    parser.add_argument("--source", default=FRONTEND_DIR)
+    parser.add_argument("--output", default=DIST_DIR)
+    args = parser.parse_args()
+    build(args.source, args.output)
@@ -0,0 +1,213 @@
+"""
+Push Channel for System Status
+One watcher thread per process waits on the blackboard version and turns each
+change into a delta (agents whose state changed, events posted since the last
+delta) that is fanned out to connected dashboards as Server-Sent Events
+"""
+import asyncio
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+def agent_view(state) -> Dict[str, Any]:
+    return {
+        "name": state.name,
+        "status": state.status.value,
+        "current_goal": state.current_goal,
+        "last_action": state.last_action,
+        "performance_score": state.performance_score
+    }
+
+def _last_event_id(board) -> int:
+    events = board.events
+    if hasattr(events, "last_id"):
+        return events.last_id()
+    return events[-1]["id"] if len(events) else -1
+
+class StatusClient:
+    """
+    One connected dashboard. Pending updates are coalesced rather than
+    queued: agent changes merge by name (latest wins) and at most max_events
+    events are kept (oldest dropped and counted), so a slow client costs a
+    bounded amount of memory however bursty the board is.
+    """
+
+    def __init__(self, max_events: int = 50, wake: Optional[Callable[[], None]] = None):
+        self.max_events = max_events
+        self.wake = wake
+        self._agents: Dict[str, Dict[str, Any]] = {}
+        self._events: List[Dict[str, Any]] = []
+        self._version: Optional[int] = None
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def push(self, delta: Dict[str, Any]):
+        with self._lock:
+            if self._version is not None:
+                self.coalesced += 1
+            self._version = delta["version"]
+            self._agents.update(delta.get("agents", {}))
+            self._events.extend(delta.get("events", ()))
+            self._dropped += delta.get("events_dropped", 0)
+            overflow = len(self._events) - self.max_events
+            if overflow > 0:
+                del self._events[:overflow]
+                self._dropped += overflow
+        if self.wake is not None:
+            self.wake()
+
+    def take(self) -> Optional[Dict[str, Any]]:
+        """The coalesced update pending for this client (None if nothing changed)"""
+        with self._lock:
+            if self._version is None:
+                return None
+            delta = {"version": self._version, "agents": self._agents, "events": self._events}
+            if self._dropped:
+                delta["events_dropped"] = self._dropped
+            self._agents, self._events, self._version, self._dropped = {}, [], None, 0
+            return delta
+
+class StatusStream:
+    """
+    Fan-out of blackboard deltas to StatusClients. The watcher thread runs
+    only while at least one client is connected and sleeps in
+    wait_for_change() between writes, so idle dashboards cost nothing.
+    """
+
+    def __init__(self, board=None, max_events: int = 50, idle_timeout: float = 5.0):
+        self._board = board
+        self.max_events = max_events
+        self.idle_timeout = idle_timeout
+        self._clients: List[StatusClient] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._version = 0
+        self._agents: Dict[str, Dict[str, Any]] = {}
+        self._cursor = 0  # id of the next event not yet sent
+        self.deltas = 0
+
+    @property
+    def board(self):
+        if self._board is None:
+            from blackboard import blackboard
+            self._board = blackboard
+        return self._board
+
+    def _baseline(self):
+        self._version = self.board.version
+        self._agents = {name: agent_view(state) for name, state in self.board.agents.items()}
+        self._cursor = _last_event_id(self.board) + 1
+
+    def connect(self, wake: Optional[Callable[[], None]] = None) -> StatusClient:
+        """
+        Register a client and queue it a snapshot (all agents, the last few
+        events) consistent with the deltas that follow it
+        """
+        client = StatusClient(self.max_events, wake)
+        with self._lock:
+            if self._thread is None:
+                self._baseline()
+                self._thread = threading.Thread(target=self._watch, name="status-stream", daemon=True)
+                self._thread.start()
+            recent = self.board.query_events(cursor=max(0, self._cursor - 5), limit=5)["events"]
+            client.push({
+                "version": self._version,
+                "agents": dict(self._agents),
+                "events": [event for event in recent if event["id"] < self._cursor]
+            })
+            self._clients.append(client)
+        return client
+
+    def disconnect(self, client: StatusClient):
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+
+    def _watch(self):
+        while True:
+            with self._lock:
+                if not self._clients:
+                    self._thread = None
+                    return
+            version = self.board.wait_for_change(self._version, timeout=self.idle_timeout)
+            if version == self._version:
+                continue
+            try:
+                with self._lock:
+                    delta = self._delta(version)
+                    clients = list(self._clients)
+            except Exception as e:
+                print(f"Warning: status stream could not read the blackboard: {e}")
+                continue
+            if delta["agents"] or delta["events"]:
+                self.deltas += 1
+                for client in clients:
+                    client.push(delta)
+
+    def _delta(self, version: int) -> Dict[str, Any]:
+        self._version = version
+        agents = {}
+        for name, state in self.board.agents.items():
+            view = agent_view(state)
+            if self._agents.get(name) != view:
+                self._agents[name] = agents[name] = view
+
+        # A burst larger than max_events only sends its newest events
+        last_id = _last_event_id(self.board)
+        start = max(self._cursor, last_id + 1 - self.max_events)
+        events = self.board.query_events(cursor=start, limit=self.max_events)["events"] if last_id >= start else []
+        delta = {"version": version, "agents": agents, "events": events}
+        if start > self._cursor:
+            delta["events_dropped"] = start - self._cursor
+        self._cursor = max(self._cursor, last_id + 1)
+        return delta
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self._clients),
+            "watching": self._thread is not None,
+            "deltas": self.deltas,
+            "coalesced": sum(client.coalesced for client in self._clients)
+        }
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"id: {data['version']}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def sse_events(request, stream: Optional["StatusStream"] = None, keepalive: float = 15.0):
+    """
+    Server-Sent Events body for one request: a "snapshot" event, then one
+    "delta" event per coalesced change, with comment lines as keepalives
+    """
+    stream = stream or status_stream
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+
+    def wake():
+        try:
+            loop.call_soon_threadsafe(ready.set)
+        except RuntimeError:
+            pass  # the event loop is gone; disconnect() follows
+
+    client = await asyncio.to_thread(stream.connect, wake)
+    try:
+        yield format_sse("snapshot", client.take())
+        while not await request.is_disconnected():
+            try:
+                await asyncio.wait_for(ready.wait(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            ready.clear()
+            delta = client.take()
+            if delta is not None:
+                yield format_sse("delta", delta)
+    finally:
+        stream.disconnect(client)
+
+# Global stream shared by the status endpoints
+status_stream = StatusStream(
+    max_events=int(os.getenv("STATUS_STREAM_MAX_EVENTS", "50")),
+    idle_timeout=float(os.getenv("STATUS_STREAM_IDLE_TIMEOUT", "5"))
+)
@@ -0,0 +1,1200 @@
+"""
+Core Agentic System Tests
+Runs the blackboard, scheduler and autonomous agents on a virtual clock,
+without Gemini or FastAPI
+"""
+import datetime
+import glob
+import itertools
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+os.environ.setdefault("PARTITION_DB_PATH", os.path.join(tempfile.mkdtemp(), "partitions.db"))
+os.environ.setdefault("PROGRESS_HISTORY_DIR", os.path.join(tempfile.mkdtemp(), "progress_history"))
+
+import clock
+import auth
+from auth import VerifiedTokenCache
+from agent_stats import RollingStats
+from blackboard import blackboard, StudyGoal
+from datetime_parsing import parse_date, parse_time, benchmark
+from deadline_index import DeadlineIndex
+import calendar_client
+import tools
+from calendar_client import CalendarClientCache
+from calendar_sync import sync_calendar
+from http_cache import VersionedView
+from event_bus import EventBus
+from event_log import EventLog
+from enhanced_tools import analyze_productivity, analyze_productivity_batch
+from progress_history import ProgressHistory
+from progress_store import ProgressStore, SECONDS_PER_DAY
+from leader_election import LeaderElector
+from interval_index import IntervalIndex, find_overlaps
+from plan_solver import solve_study_plan, replan
+from responses import PLAN_FIELDS, contract_response, select_fields
+from review_engine import ReviewStore
+from scheduler import AgentScheduler
+from simulation import run_simulation
+from startup import LazyComponent, init_concurrently
+from static_assets import PrecompressedStaticFiles, build
+from status_stream import StatusStream
+
+class CountingAgent:
+    def __init__(self, name: str, interval: float):
+        self.name = name
+        self.interval = interval
+        self.ran_at = []
+
+    def run_cycle(self) -> float:
+        self.ran_at.append(clock.now())
+        return self.interval
+
+    def on_cycle_error(self, error, retry_in):
+        pass
+
+class CalendarStandIn(BaseHTTPRequestHandler):
+    """
+    Answers Calendar requests locally: inserts get new ids, patches echo,
+    deletes return 204. Single (non-batch) inserts are kept in `inserted`.
+    """
+    batches = []
+    inserted = []
+    ids = itertools.count(1)
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        if self.headers["Content-Type"].startswith("application/json"):
+            event = json.loads(body)
+            CalendarStandIn.inserted.append(dict(event))
+            return self._reply("application/json", json.dumps(dict(event, id=f"evt{next(self.ids)}")).encode())
+        boundary = re.search(r'boundary="?([^";]+)', self.headers["Content-Type"]).group(1)
+        calls, parts = [], []
+        for part in body.split("--" + boundary)[1:-1]:
+            headers, request = part.split("\r\n\r\n", 1) if "\r\n\r\n" in part else part.split("\n\n", 1)
+            content_id = re.search(r"Content-ID: <(.+)>", headers).group(1)
+            request_line, _, payload = request.replace("\r\n", "\n").partition("\n\n")
+            method, path = request_line.split()[:2]
+            calls.append((method, path.split("?")[0]))
+            if method == "DELETE":
+                status, result = "204 No Content", ""
+            else:
+                event = json.loads(payload or "{}")
+                event.setdefault("id", f"evt{next(self.ids)}" if method == "POST" else path.split("?")[0].rsplit("/", 1)[1])
+                status, result = "200 OK", json.dumps(event)
+            parts.append(f"--batch_reply\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                         f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n\r\n{result}\r\n")
+        CalendarStandIn.batches.append(calls)
+        self._reply("multipart/mixed; boundary=batch_reply", ("".join(parts) + "--batch_reply--").encode())
+
+    def _reply(self, content_type: str, reply: bytes):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+def calendar_stand_in():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CalendarStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    CalendarStandIn.batches = []
+    CalendarStandIn.inserted = []
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+def test_virtual_clock_only_moves_forward():
+    virtual = clock.VirtualClock(start=1000.0)
+    previous = clock.set_clock(virtual)
+    try:
+        assert clock.now() == 1000.0
+        clock.sleep(3600)
+        assert clock.now() == 4600.0
+        virtual.set_time(10.0)
+        assert clock.now() == 4600.0
+    finally:
+        clock.set_clock(previous)
+    assert clock.now() != 4600.0
+
+def test_scheduler_run_until_is_deterministic():
+    def run():
+        previous = clock.set_clock(clock.VirtualClock(start=0.0))
+        try:
+            sim_scheduler = AgentScheduler(seed=7)
+            fast, slow = CountingAgent("fast", 60), CountingAgent("slow", 3600)
+            sim_scheduler.add_agent(fast, start=False)
+            sim_scheduler.add_agent(slow, start=False)
+            cycles = sim_scheduler.run_until(86400)
+            assert clock.now() == 86400
+            return cycles, fast.ran_at, slow.ran_at
+        finally:
+            clock.set_clock(previous)
+
+    cycles, fast_runs, slow_runs = run()
+    assert run() == (cycles, fast_runs, slow_runs)
+    assert cycles == len(fast_runs) + len(slow_runs)
+    assert 20 <= len(slow_runs) <= 28
+    assert fast_runs == sorted(fast_runs)
+
+def test_scheduler_backs_off_jitters_and_wakes():
+    class FlakyAgent(CountingAgent):
+        def __init__(self, name, interval, failures):
+            super().__init__(name, interval)
+            self.failures = failures
+            self.retries = []
+
+        def run_cycle(self):
+            super().run_cycle()
+            if len(self.ran_at) <= self.failures:
+                raise RuntimeError("boom")
+            return self.interval
+
+        def on_cycle_error(self, error, retry_in):
+            self.retries.append(retry_in)
+
+    previous = clock.set_clock(clock.VirtualClock(start=0.0))
+    try:
+        # Failures back off exponentially up to max_backoff, then the normal interval resumes
+        sim_scheduler = AgentScheduler(jitter=0.0, base_backoff=5, max_backoff=30, seed=1)
+        flaky = FlakyAgent("flaky", 100, failures=5)
+        sim_scheduler.add_agent(flaky, start=False)
+        sim_scheduler.run_until(500)
+        assert flaky.retries == [5, 10, 20, 30, 30]
+        assert flaky.ran_at[:7] == [0, 5, 15, 35, 65, 95, 195]
+        assert sim_scheduler.stats()["cycle_errors"] == 5 and sim_scheduler.stats()["failures"] == {}
+
+        # Jitter spreads delays within +/- jitter; timer_jitter = False keeps them exact
+        sim_scheduler = AgentScheduler(jitter=0.2, seed=1)
+        jittered, exact = CountingAgent("jittered", 100), CountingAgent("exact", 100)
+        exact.timer_jitter = False
+        sim_scheduler.add_agent(jittered, start=False)
+        sim_scheduler.add_agent(exact, start=False)
+        sim_scheduler.run_until(clock.now() + 5000)
+        gaps = [later - earlier for earlier, later in zip(jittered.ran_at, jittered.ran_at[1:])]
+        assert all(80 <= gap <= 120 for gap in gaps) and len(set(gaps)) > 1
+        assert {later - earlier for earlier, later in zip(exact.ran_at, exact.ran_at[1:])} == {100}
+
+        # wake() brings a run forward, and is kept when it arrives during the agent's own cycle
+        sim_scheduler = AgentScheduler(jitter=0.0)
+
+        class SelfWakingAgent(CountingAgent):
+            def run_cycle(self):
+                super().run_cycle()
+                if len(self.ran_at) == 2:
+                    sim_scheduler.wake(self.name, clock.now() + 10)
+                return self.interval
+
+        start = clock.now()
+        agent = SelfWakingAgent("waking", 1000)
+        sim_scheduler.add_agent(agent, start=False)
+        sim_scheduler.run_until(start + 1)
+        sim_scheduler.wake("waking", start + 50)
+        sim_scheduler.wake("waking", start + 900)  # later than the pending wake: no-op
+        sim_scheduler.run_until(start + 1100)
+        assert [at - start for at in agent.ran_at] == [0, 50, 60, 1060]
+
+        # An error hook that raises is logged, and the agent still gets its backoff retry
+        class BrokenHookAgent(FlakyAgent):
+            def on_cycle_error(self, error, retry_in):
+                raise RuntimeError("blackboard unavailable")
+
+        broken = BrokenHookAgent("broken", 100, failures=2)
+        sim_scheduler.add_agent(broken, start=False)
+        start = clock.now()
+        sim_scheduler.run_until(start + 200)
+        assert [at - start for at in broken.ran_at] == [0, 5, 15, 115]
+    finally:
+        clock.set_clock(previous)
+
+def test_rolling_stats_ewma_and_windowed_latency():
+    stats = RollingStats(window=20, alpha=0.5, initial_score=1.0)
+    assert stats.snapshot() == {"ewma_score": 1.0, "latency_mean_ms": 0.0, "latency_p95_ms": 0.0,
+                                "success_rate": 1.0, "samples": 0}
+
+    stats.record(0.001, True, score=0.6)   # 1.0 -> 0.8
+    stats.record(0.002, True)              # no score: EWMA unchanged
+    stats.record(0.003, False, score=0.9)  # failures count as 0.0 -> 0.4
+    assert stats.snapshot()["ewma_score"] == 0.4
+
+    # Only the last `window` cycles count towards latency and success rate
+    for n in range(4, 26):
+        stats.record(n / 1000, n % 4 != 0)
+    snapshot = stats.snapshot()
+    assert snapshot["samples"] == 25
+    assert snapshot["latency_mean_ms"] == 15.5  # cycles 6..25
+    assert snapshot["latency_p95_ms"] == 25.0   # nearest rank: the 20th of 20
+    assert snapshot["success_rate"] == 0.75     # 8, 12, 16, 20, 24 failed
+
+def test_components_start_once_lazily_and_in_parallel():
+    builds = []
+
+    def slow(name, seconds=0.2):
+        def factory():
+            builds.append(name)
+            time.sleep(seconds)
+            return name
+        return factory
+
+    # Nothing is built until first use, then exactly once however many threads ask
+    lazy = LazyComponent("lazy", slow("lazy", 0.05), budget_ms=1)
+    assert not lazy.ready and lazy.report()["within_budget"]
+    barrier = threading.Barrier(8)
+    results = []
+
+    def get():
+        barrier.wait()
+        results.append(lazy.get())
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["lazy"] * 8 and builds == ["lazy"]
+    assert lazy.ready and not lazy.report()["within_budget"]
+
+    # Independent components start concurrently; a failure is reported and retried on first use
+    def broken():
+        raise RuntimeError("no credentials")
+
+    components = [LazyComponent(name, slow(name), budget_ms=5000) for name in ("a", "b", "c")]
+    failing = LazyComponent("failing", broken)
+    report = init_concurrently(components + [failing])
+    assert report["total_ms"] < 500
+    assert all(report["components"][name]["within_budget"] for name in ("a", "b", "c"))
+    assert report["components"]["failing"] == {"ready": False, "elapsed_ms": None, "budget_ms": 1000.0,
+                                               "within_budget": True}
+    try:
+        failing.get()
+        assert False, "a failed component should raise on first use"
+    except RuntimeError:
+        pass
+
+def test_date_parsing_matches_strptime_formats():
+    for text, expected in [("2025-03-05", datetime.date(2025, 3, 5)), ("3/5/2025", datetime.date(2025, 3, 5)),
+                           (" 05-03-2025 ", datetime.date(2025, 3, 5)), ("2025-02-30", None), ("13/01/2025", None),
+                           ("2025-03-05T10:00", None), ("", None)]:
+        assert parse_date(text, "test") == expected
+    for text, expected in [("09:00 AM", datetime.time(9)), ("12:30 pm", datetime.time(12, 30)),
+                           ("12:00 AM", datetime.time(0)), ("18:45", datetime.time(18, 45)),
+                           ("13:00 PM", None), ("24:00", None)]:
+        assert parse_time(text, "test") == expected
+    report = benchmark(tasks=2000)
+    assert report["parsing_us_per_task"] < report["strptime_us_per_task"]
+
+def test_deadline_timers_fire_at_day_thresholds():
+    start = datetime.datetime(2025, 3, 10, 15, 30).timestamp()
+    previous = clock.set_clock(clock.VirtualClock(start=start))
+    try:
+        index = DeadlineIndex()
+        index.set_tasks("student", [
+            {"title": "Essay", "due_date": "2025-03-15"},
+            {"title": "Quiz", "due_date": "03/12/2025"},
+            {"title": "Undated"}
+        ])
+        # Quiz is 2 days out: its 2-day alert fires immediately
+        assert [(a["task"], a["days_left"]) for a in index.pop_due()] == [("Quiz", 2)]
+
+        fired = []
+        while index.next_due() is not None:
+            due = index.next_due()
+            clock.get_clock().set_time(due)
+            fired += [(datetime.datetime.fromtimestamp(due), a["task"], a["days_left"]) for a in index.pop_due()]
+        assert fired == [
+            (datetime.datetime(2025, 3, 11), "Quiz", 1),
+            (datetime.datetime(2025, 3, 12), "Essay", 3),
+            (datetime.datetime(2025, 3, 13), "Essay", 2),
+            (datetime.datetime(2025, 3, 14), "Essay", 1),
+        ]
+
+        # Re-indexing unchanged tasks schedules nothing new
+        index.set_tasks("student", [{"title": "Essay", "due_date": "2025-03-15"}])
+        assert index.next_due() is None and len(index) == 1
+    finally:
+        clock.set_clock(previous)
+
+def test_local_plan_respects_daily_hours_and_exam_dates():
+    payload = {
+        "subjects": [
+            {"name": "Math", "difficulty": "Hard", "exam_date": "2025-03-13"},
+            {"name": "History", "difficulty": "Easy", "exam_date": None}
+        ],
+        "daily_hours": 3
+    }
+    plan = solve_study_plan(payload, start=datetime.date(2025, 3, 10))
+    sessions = plan["daily_study_plan"]
+
+    minutes_per_day = {}
+    for task in sessions:
+        minutes_per_day[task["date"]] = minutes_per_day.get(task["date"], 0) + task["estimated_duration_minutes"]
+    assert len(minutes_per_day) == 7 and all(minutes <= 180 for minutes in minutes_per_day.values())
+    assert all(task["date"] < "2025-03-13" for task in sessions if task["subject"] == "Math")
+
+    # Math gets more time than History while its exam is ahead
+    day_one = [task for task in sessions if task["date"] == "2025-03-10"]
+    math = sum(t["estimated_duration_minutes"] for t in day_one if t["subject"] == "Math")
+    assert math > 180 - math
+    assert plan["weekly_summary"]["total_study_hours"] == 21
+
+def test_unparseable_exam_dates_are_reported_not_dropped():
+    import agent
+
+    payload = {
+        "subjects": [
+            {"name": "Math", "difficulty": "Hard", "exam_date": "next friday"},
+            {"name": "History", "difficulty": "Easy", "exam_date": None}
+        ],
+        "daily_hours": 2
+    }
+    plan = solve_study_plan(payload, start=datetime.date(2025, 3, 10))
+    assert [(item["subject"], item["exam_date"]) for item in plan["unscheduled"]] == [("Math", "next friday")]
+
+    result = agent.AgenticOrchestrator(mode="off").plan_study(payload, user_id="bad-dates")
+    assert not result["success"] and "Math" in result["error"] and "study_plan" not in result
+
+    payload["subjects"][0]["exam_date"] = "2025-03-14"
+    plan = solve_study_plan(payload, start=datetime.date(2025, 3, 10))
+    assert plan["unscheduled"] == []
+    revised = replan(plan, {"type": "exam_date", "subject": "Math", "exam_date": "14/3"})
+    assert revised["status"] == "error" and "Math" in revised["message"]
+
+def test_local_plan_stops_at_day_end_without_busy_times():
+    payload = {"subjects": [{"name": "Math", "difficulty": "Hard"}, {"name": "Art", "difficulty": "Easy"}], "daily_hours": 14}
+    plan = solve_study_plan(payload, start=datetime.date(2025, 3, 10))
+    for task in plan["daily_study_plan"]:
+        start = datetime.datetime.strptime(f"{task['date']} {task['start_time']}", "%Y-%m-%d %I:%M %p")
+        end = start + datetime.timedelta(minutes=task["estimated_duration_minutes"])
+        assert end.date() == start.date() and end.time() <= datetime.time(22, 0)
+
+    scheduled = sum(t["estimated_duration_minutes"] for t in plan["daily_study_plan"] if t["date"] == "2025-03-10")
+    assert plan["unplaced_minutes"]["2025-03-10"] == 14 * 60 - scheduled > 0
+    assert len(plan["unplaced_minutes"]) == 7
+
+    previous = clock.set_clock(clock.VirtualClock(start=datetime.datetime(2025, 3, 10, 8, 0).timestamp()))
+    try:
+        fewer_hours = replan(plan, {"type": "daily_hours", "daily_hours": 2, "from_date": "2025-03-16"})
+    finally:
+        clock.set_clock(previous)
+    assert "2025-03-16" not in fewer_hours["plan"]["unplaced_minutes"]
+    assert "2025-03-15" in fewer_hours["plan"]["unplaced_minutes"]
+
+def test_replan_touches_only_affected_days():
+    previous = clock.set_clock(clock.VirtualClock(start=datetime.datetime(2025, 3, 10, 8, 0).timestamp()))
+    try:
+        payload = {"subjects": [{"name": "Math", "difficulty": "Hard"}, {"name": "Art", "difficulty": "Easy"}], "daily_hours": 3}
+        plan = solve_study_plan(payload)
+        missed = plan["daily_study_plan"][0]
+
+        result = replan(plan, {"type": "missed_task", "task_id": missed["task_id"]})
+        diff = result["diff"]
+        assert result["status"] == "success" and diff["changed_days"] == ["2025-03-11"]
+        assert {task["date"] for task in diff["added"]} == {"2025-03-11"}
+        assert diff["unplaced_minutes"] == 0
+
+        untouched = [t for t in plan["daily_study_plan"] if t["date"] not in ("2025-03-10", "2025-03-11")]
+        assert [t for t in result["plan"]["daily_study_plan"] if t["date"] not in ("2025-03-10", "2025-03-11")] == untouched
+        assert any(t["task_id"] == missed["task_id"] and t["status"] == "missed" for t in result["plan"]["daily_study_plan"])
+
+        fewer_hours = replan(result["plan"], {"type": "daily_hours", "daily_hours": 1, "from_date": "2025-03-15"})
+        assert fewer_hours["diff"]["changed_days"] == ["2025-03-15", "2025-03-16"]
+    finally:
+        clock.set_clock(previous)
+
+def test_interval_index_matches_brute_force():
+    rng = random.Random(3)
+    intervals = []
+    for i in range(500):
+        start = rng.uniform(0, 10000)
+        intervals.append((start, start + rng.uniform(1, 120), i))
+    index = IntervalIndex(intervals[:400])
+    for interval in intervals[400:]:
+        index.add(*interval)  # some land in the unsorted buffer
+    for _ in range(200):
+        start = rng.uniform(0, 10000)
+        end = start + rng.uniform(1, 300)
+        expected = sorted(i for s, e, i in intervals if s < end and e > start)
+        assert sorted(item for _, _, item in index.overlapping(start, end)) == expected
+
+    busy = IntervalIndex([(10, 20, "a"), (15, 30, "b"), (50, 60, "c")])
+    assert busy.free_slots(0, 100, min_length=15) == [(30, 50), (60, 100)]
+    assert busy.next_free(12, 15) == 30 and busy.next_free(12, 25) == 60
+    assert sorted(find_overlaps([(10, 20, "a"), (15, 30, "b"), (30, 40, "c")])) == [("a", "b")]
+
+def test_local_plan_avoids_busy_times():
+    lecture = {"start": "2025-03-10T09:30:00", "end": "2025-03-10T12:00:00", "title": "Lecture"}
+    payload = {"subjects": [{"name": "Math", "difficulty": "Hard"}], "daily_hours": 3, "busy": [lecture]}
+    plan = solve_study_plan(payload, start=datetime.date(2025, 3, 10))
+    busy = IntervalIndex([(lecture["start"], lecture["end"], "Lecture")])
+    for task in plan["daily_study_plan"]:
+        start = datetime.datetime.strptime(f"{task['date']} {task['start_time']}", "%Y-%m-%d %I:%M %p")
+        assert busy.is_free(start, start + datetime.timedelta(minutes=task["estimated_duration_minutes"]))
+    assert plan["daily_study_plan"][0]["start_time"] == "12:00 PM"
+    assert plan["weekly_summary"]["total_study_hours"] == 21
+
+def test_review_cards_follow_sm2_intervals():
+    previous = clock.set_clock(clock.VirtualClock(start=1_000_000.0))
+    try:
+        store = ReviewStore(os.path.join(tempfile.mkdtemp(), "reviews.db"))
+        ids = store.add_cards("student", [{"question": "What is 2+2?", "correct_answer": "4"},
+                                          {"question": "what is 2+2? "}, {"question": "Define entropy"}])
+        assert ids[0] == ids[1] and len(set(ids)) == 2
+        assert [card["card_id"] for card in store.due("student")] == [ids[0], ids[2]]
+
+        intervals = []
+        for _ in range(3):
+            card = store.answer("student", ids[0], 5)
+            intervals.append(card["interval_days"])
+            clock.sleep(card["interval_days"] * 86400)
+        assert intervals == [1.0, 6.0, 16.2]
+
+        assert store.answer("student", ids[2], 1)["lapses"] == 1
+        assert store.answer("someone_else", ids[2], 5) is None
+    finally:
+        clock.set_clock(previous)
+
+def test_progress_history_rollups_survive_restart():
+    start = datetime.datetime(2025, 3, 3, 12, 0, tzinfo=datetime.timezone.utc).timestamp()
+    previous = clock.set_clock(clock.VirtualClock(start=start))
+    try:
+        directory = os.path.join(tempfile.mkdtemp(), "history")
+        history = ProgressHistory(directory, segment_size=4)
+        # Ten days of steady progress on Math (two samples a day), with a gap on day 5
+        for day in range(10):
+            if day != 5:
+                history.append("student", "Math", 0.05 * day, start + day * 86400)
+                history.append("student", "Math", 0.05 * day + 0.05, start + day * 86400 + 3600)
+        clock.get_clock().set_time(start + 9 * 86400 + 7200)
+
+        trend = history.trend("student", "Math")
+        assert trend["streak_days"] == 4
+        assert trend["current_progress"] == 0.5
+        assert trend["velocity_7d"] == 0.05
+        assert trend["forecast_completion"] == "2025-03-23"
+        assert [week["active_days"] for week in trend["weekly"][-2:]] == [6, 3]
+
+        history.flush()
+        reloaded = ProgressHistory(directory, segment_size=4)
+        assert reloaded.trend("student", "Math") == trend
+        assert len(reloaded.samples("student", "Math")) == 18
+        assert reloaded.trend("nobody") == {"user_id": "nobody", "samples": 0}
+    finally:
+        clock.set_clock(previous)
+
+def test_progress_updates_record_each_sample_once():
+    partition = blackboard.get_partition("once-student")
+    partition.study_goals.append(StudyGoal("Math", "2025-06-01", 0.0, 1, "active"))
+    blackboard.save_partition(partition)
+
+    # With or without a matching goal, one update is one sample
+    blackboard.update_study_progress("Math", 0.5, "once-student")
+    blackboard.update_study_progress("overall", 0.25, "once-student")
+    assert len(blackboard.history.samples("once-student", "Math")) == 1
+    assert len(blackboard.history.samples("once-student", "overall")) == 1
+    assert blackboard.get_partition("once-student").study_goals[0].current_progress == 0.5
+    assert abs(blackboard.progress.student_average("once-student") - 0.375) < 1e-6
+
+def test_progress_history_writers_share_a_directory():
+    directory = os.path.join(tempfile.mkdtemp(), "history")
+    start = 1_741_600_800.0
+    # Two workers with their own interning order, spilling into the same directory
+    first, second = ProgressHistory(directory, segment_size=3), ProgressHistory(directory, segment_size=3)
+    for n in range(7):
+        first.append("ann", "Math", 0.1 * n, start + n * 3600)
+        second.append("bob", "Physics", 0.05 * n, start + n * 3600)
+        second.append("ann", "History", 0.2, start + n * 3600)
+    first.flush()
+    second.flush()
+    assert len(glob.glob(os.path.join(directory, "vocabulary-*.json"))) == 2
+
+    reloaded = ProgressHistory(directory, segment_size=3)
+    assert [round(sample["progress"], 2) for sample in reloaded.samples("ann", "Math")] == [round(0.1 * n, 2) for n in range(7)]
+    assert {sample["subject"] for sample in reloaded.samples("ann")} == {"Math", "History"}
+    assert len(reloaded.samples("bob", "Physics")) == 7 and not reloaded.samples("bob", "Math")
+    clock_at = clock.set_clock(clock.VirtualClock(start=start + 6 * 3600))
+    try:
+        assert reloaded.trend("bob", "Physics")["current_progress"] == 0.3
+        assert reloaded.trend("ann", "Math")["current_progress"] == 0.6
+    finally:
+        clock.set_clock(clock_at)
+
+def test_progress_store_scan_matches_per_student_math():
+    rng = random.Random(5)
+    store = ProgressStore(capacity=2, history=3)
+    samples = {}
+    for step in range(200):
+        user_id, subject = f"s{rng.randrange(12)}", rng.choice(["Math", "Physics", "History"])
+        progress = round(rng.random(), 3)
+        timestamp = step * 3600.0
+        store.record(user_id, subject, progress, timestamp)
+        samples.setdefault(user_id, {}).setdefault(subject, []).append((timestamp, progress))
+
+    # Capacity doubled from 2 as rows were added
+    assert len(store) == sum(len(subjects) for subjects in samples.values())
+    report = store.analyze(threshold=0.5)
+    assert sorted(report["user_ids"]) == sorted(samples)
+
+    for index, user_id in enumerate(report["user_ids"]):
+        subjects = samples[user_id].values()
+        average = np.mean([rows[-1][1] for rows in subjects])
+        # Slope uses only the last `history` samples of each subject, in progress per day
+        slopes = [np.polyfit([t / SECONDS_PER_DAY for t, _ in rows[-3:]], [p for _, p in rows[-3:]], 1)[0]
+                  if len(rows) >= 2 else 0.0 for rows in subjects]
+        assert abs(report["average"][index] - average) < 1e-5
+        assert abs(report["slope"][index] - np.mean(slopes)) < 1e-3
+        assert (index in report["below"]) == (average < 0.5)
+        assert abs(store.student_average(user_id) - average) < 1e-5
+
+    assert store.student_average("nobody", default=0.7) == 0.7
+    assert len(ProgressStore().analyze()["below"]) == 0
+
+def test_batch_productivity_matches_single_analysis():
+    rows = [{"completed_tasks": c, "total_tasks": t} for c, t in [(0, 4), (3, 4), (2, 4), (9, 10), (1, 3), (5, 0)]]
+    batch = analyze_productivity_batch(rows)
+    for row, result in zip(rows[:-1], batch):
+        assert {k: v for k, v in result.items() if k != "z_score"} == analyze_productivity(row)
+    assert batch[-1]["productivity_score"] == 0.0 and batch[-1]["status"] == "low"
+    assert batch[3]["z_score"] > 0 > batch[0]["z_score"]
+
+def test_calendar_events_are_inserted_in_batches():
+    server, api_root = calendar_stand_in()
+    try:
+        clients = CalendarClientCache(api_root=api_root, concurrency=2)
+        token = {"access_token": "token", "refresh_token": "refresh"}
+        service = clients.get("student", token)
+        assert clients.get("student", token) is service and clients.builds == 1
+
+        events = [{"title": f"Session {i}", "start_time": "2025-03-10T09:00:00Z", "end_time": "2025-03-10T09:30:00Z"}
+                  for i in range(120)]
+        results = service.insert_events(events)
+        assert len(CalendarStandIn.batches) == 3  # 50 + 50 + 20
+        assert all(call == ("POST", "/calendar/v3/calendars/primary/events") for batch in CalendarStandIn.batches for call in batch)
+        assert [result["response"]["summary"] for result in results] == [event["title"] for event in events]
+
+        clients.get("student", {"access_token": "token", "refresh_token": "other"})
+        assert clients.builds == 2
+
+        # The single-event tool keeps its own event body and needs to know whose calendar it writes
+        previous, tools.calendar_clients = tools.calendar_clients, clients
+        try:
+            event = dict(token, title="Exam review", start_time="2025-03-10T09:00:00Z", end_time="2025-03-10T10:00:00Z")
+            try:
+                tools.create_calendar_event(event)
+                assert False, "create_calendar_event needs a user_id"
+            except KeyError:
+                pass
+            created = tools.create_calendar_event(dict(event, user_id="student"))
+            assert created["status"] == "created" and created["event_id"].startswith("evt")
+            assert CalendarStandIn.inserted == [{"summary": "Exam review", "start": {"dateTime": "2025-03-10T09:00:00Z"},
+                                                 "end": {"dateTime": "2025-03-10T10:00:00Z"}}]
+        finally:
+            tools.calendar_clients = previous
+
+        # The enhanced tool sends the same event_body it reports back
+        import enhanced_tools
+        previous, calendar_client.calendar_clients = calendar_client.calendar_clients, clients
+        try:
+            created = enhanced_tools.create_calendar_event(dict(event, user_id="student"))
+            assert created["mode"] == "real" and CalendarStandIn.inserted[-1] == calendar_client.event_body(event)
+        finally:
+            calendar_client.calendar_clients = previous
+    finally:
+        server.shutdown()
+
+def test_calendar_sync_sends_only_changes():
+    server, api_root = calendar_stand_in()
+    previous_clients = calendar_client.calendar_clients
+    calendar_client.calendar_clients = CalendarClientCache(api_root=api_root)
+    previous = clock.set_clock(clock.VirtualClock(start=datetime.datetime(2025, 3, 10, 8, 0).timestamp()))
+    try:
+        token = {"access_token": "token"}
+        partition = blackboard.get_partition("calendar_student")
+        partition.shared_context.pop("calendar_sync", None)  # partitions persist between test runs
+        plan = solve_study_plan({"subjects": [{"name": "Math", "difficulty": "Hard"}], "daily_hours": 2})
+
+        first = sync_calendar(partition, plan, token)
+        assert first["events_created"] == len(plan["daily_study_plan"]) == first["api_calls"]
+        assert sync_calendar(partition, plan, token)["api_calls"] == 0
+
+        events = partition.shared_context["calendar_sync"]["events"]
+        patched_id = events[str(plan["daily_study_plan"][3]["task_id"])][0]
+        deleted_id = events[str(plan["daily_study_plan"][5]["task_id"])][0]
+        moved = json.loads(json.dumps(plan))
+        moved["daily_study_plan"][3]["description"] = "Past papers"
+        del moved["daily_study_plan"][5]
+        result = sync_calendar(partition, moved, token)
+        assert (result["events_updated"], result["events_deleted"], result["api_calls"]) == (1, 1, 2)
+        assert CalendarStandIn.batches[-1] == [
+            ("PATCH", f"/calendar/v3/calendars/primary/events/{patched_id}"),
+            ("DELETE", f"/calendar/v3/calendars/primary/events/{deleted_id}")
+        ]
+        assert len(partition.shared_context["calendar_sync"]["events"]) == len(moved["daily_study_plan"])
+    finally:
+        clock.set_clock(previous)
+        calendar_client.calendar_clients = previous_clients
+        server.shutdown()
+
+def test_verified_tokens_are_cached_until_expiry():
+    previous = clock.set_clock(clock.VirtualClock(start=1_000_000.0))
+    try:
+        verified = []
+
+        def verifier(token):
+            verified.append(token)
+            if token == "forged":
+                raise ValueError("bad signature")
+            return {"uid": token.split(":")[0], "iat": int(clock.now()), "exp": clock.now() + 3600}
+
+        cache = VerifiedTokenCache(max_entries=2)
+        assert cache.verify("alice:1", verifier)["uid"] == "alice"
+        assert cache.verify("alice:1", verifier)["uid"] == "alice"
+        assert verified == ["alice:1"]
+
+        try:
+            cache.verify("forged", verifier)
+            assert False, "forged token accepted"
+        except ValueError:
+            pass
+
+        clock.sleep(3601)  # expired: verified again
+        cache.verify("alice:1", verifier)
+        assert verified.count("alice:1") == 2
+
+        cache.verify("bob:1", verifier)
+        cache.verify("carol:1", verifier)  # over the cap: alice's entry is evicted
+        assert cache.stats()["entries"] == 2 and cache.get("alice:1") is None
+
+        revoked = []
+        cache.add_revocation_listener(revoked.append)
+        clock.sleep(5)
+        cache.revoke_user("bob")
+        assert revoked == ["bob"] and cache.get("bob:1") is None
+        verified.clear()
+        stale = {"uid": "bob", "iat": int(clock.now()) - 10, "exp": clock.now() + 3600}
+        try:
+            cache.verify("bob:old", lambda token: stale)
+            assert False, "token issued before revocation accepted"
+        except PermissionError:
+            pass
+        assert cache.verify("bob:2", verifier)["uid"] == "bob"
+
+        # A revocation is forgotten once every token issued before it has expired
+        cache.revoke_user("carol")
+        assert cache.stats()["revoked_users"] == 2
+        clock.sleep(auth.ID_TOKEN_LIFETIME)
+        cache.revoke_user("dave")
+        assert cache.stats()["revoked_users"] == 1
+        assert not cache.is_revoked({"uid": "bob", "iat": int(clock.now()) - 10})
+        assert cache.is_revoked({"uid": "dave", "iat": int(clock.now()) - 10})
+    finally:
+        clock.set_clock(previous)
+
+def test_revocations_reach_every_worker_through_the_shared_blackboard():
+    from shared_blackboard import SharedBlackboard
+
+    previous = clock.set_clock(clock.VirtualClock(start=3_000_000.0))
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "blackboard.db")
+            # Two workers, each with its own cache and connection to the shared board
+            first = VerifiedTokenCache(revocations=SharedBlackboard(path))
+            second = VerifiedTokenCache(revocations=SharedBlackboard(path))
+            claims = {"uid": "erin", "iat": int(clock.now()), "exp": clock.now() + 3600}
+            assert first.verify("erin:1", lambda token: claims) is claims
+            assert second.verify("erin:1", lambda token: claims) is claims
+            version = second.revocations.version
+
+            clock.sleep(5)
+            first.revoke_user("erin")
+            # The other worker's cached token is rejected on its next use
+            assert second.get("erin:1") is None
+            try:
+                second.verify("erin:1", lambda token: claims)
+                assert False, "token revoked by another worker accepted"
+            except PermissionError:
+                pass
+            fresh = {"uid": "erin", "iat": int(clock.now()), "exp": clock.now() + 3600}
+            assert second.verify("erin:2", lambda token: fresh) is fresh
+            assert second.revocations.version == version  # revocations are not board changes
+
+            # Shared revocations are forgotten once their tokens have expired
+            clock.sleep(auth.ID_TOKEN_LIFETIME + 1)
+            second.revoke_user("frank")
+            assert first.revocations.tokens_revoked_before("erin") is None
+            assert first.revocations.tokens_revoked_before("frank") == int(clock.now())
+    finally:
+        clock.set_clock(previous)
+
+def test_stream_tickets_are_short_lived_and_signed():
+    previous = clock.set_clock(clock.VirtualClock(start=2_000_000.0))
+    try:
+        ticket = auth.issue_stream_ticket("alice.smith")
+        assert "eyJ" not in ticket and auth.verify_stream_ticket(ticket) == "alice.smith"
+        for forged in (ticket.replace("alice", "mallory"), ticket[:-1] + ("1" if ticket.endswith("0") else "0"), "garbage"):
+            try:
+                auth.verify_stream_ticket(forged)
+                assert False, "forged ticket accepted"
+            except ValueError:
+                pass
+
+        clock.sleep(auth.STREAM_TICKET_TTL + 1)
+        try:
+            auth.verify_stream_ticket(ticket)
+            assert False, "expired ticket accepted"
+        except ValueError:
+            pass
+
+        stale = auth.issue_stream_ticket("bob")
+        clock.sleep(1)
+        auth.token_cache.revoke_user("bob")
+        try:
+            auth.verify_stream_ticket(stale)
+            assert False, "ticket issued before revocation accepted"
+        except ValueError:
+            pass
+    finally:
+        clock.set_clock(previous)
+
+def test_status_stream_pushes_coalesced_deltas():
+    stream = StatusStream(blackboard, max_events=3, idle_timeout=0.05)
+    client = stream.connect()
+    snapshot = client.take()
+    assert snapshot["agents"] == stream._agents and client.take() is None
+
+    blackboard.register_agent("StreamProbeAgent")
+    for i in range(5):
+        blackboard.post_event("stream_probe", {"i": i}, "test")
+    for _ in range(500):
+        if client._events and client._events[-1]["data"] == {"i": 4}:
+            break
+        threading.Event().wait(0.01)
+
+    # Everything since the snapshot arrives as one update, with only the newest events kept
+    delta = client.take()
+    assert delta["agents"]["StreamProbeAgent"]["status"] == "idle"
+    assert [event["data"]["i"] for event in delta["events"]] == [2, 3, 4]
+    assert delta["events_dropped"] == 2
+    assert client.take() is None
+
+    stream.disconnect(client)
+    for _ in range(100):
+        if not stream.stats()["watching"]:
+            break
+        threading.Event().wait(0.01)
+    assert stream.stats()["clients"] == 0 and not stream.stats()["watching"]
+    del blackboard.agents["StreamProbeAgent"]
+
+def test_versioned_view_answers_304_until_the_version_changes():
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+
+    state = {"version": 1}
+    view = VersionedView("status", lambda: {"version": state["version"], "filler": "x" * 4000}, instance_id="w1")
+    other_worker = VersionedView("status", lambda: {"version": state["version"], "filler": "x" * 4000}, instance_id="w2")
+    app = FastAPI()
+
+    @app.get("/status")
+    def status(request: Request):
+        return view.respond(request, state["version"])
+
+    @app.get("/other")
+    def other(request: Request):
+        return other_worker.respond(request, state["version"])
+
+    client = TestClient(app)
+    first = client.get("/status", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200 and first.headers["content-encoding"] == "gzip"
+    assert first.json()["version"] == 1 and first.headers["etag"] == '"status-w1-1"'
+
+    repeat = client.get("/status", headers={"If-None-Match": first.headers["etag"]})
+    assert repeat.status_code == 304 and repeat.content == b"" and repeat.headers["etag"] == first.headers["etag"]
+    weak = client.get("/status", headers={"If-None-Match": 'W/"stale", W/' + first.headers["etag"]})
+    assert weak.status_code == 304
+
+    # The same version number in another worker is a different body: its tag must not validate there
+    assert client.get("/other", headers={"If-None-Match": first.headers["etag"]}).status_code == 200
+
+    state["version"] = 2
+    changed = client.get("/status", headers={"If-None-Match": first.headers["etag"], "Accept-Encoding": "identity"})
+    assert changed.status_code == 200 and "content-encoding" not in changed.headers
+    assert changed.json()["version"] == 2
+    assert view.stats() == {"version": 2, "builds": 2, "not_modified": 2}
+
+def test_built_assets_are_fingerprinted_and_served_precompressed():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as output:
+        script = b"console.log('study planner');\n" * 200
+        with open(os.path.join(source, "app.js"), "wb") as f:
+            f.write(script)
+        with open(os.path.join(source, "index.html"), "w") as f:
+            f.write('<html><script src="app.js"></script></html>')
+        manifest = build(source, output)
+        hashed = manifest["app.js"]
+        assert hashed != "app.js" and hashed in open(os.path.join(output, "index.html")).read()
+
+        app = FastAPI()
+        app.mount("/static", PrecompressedStaticFiles(directory=output, html=True), name="static")
+        client = TestClient(app)
+
+        asset = client.get(f"/static/{hashed}", headers={"Accept-Encoding": "gzip"})
+        assert asset.headers["content-encoding"] == "gzip" and asset.content == script
+        assert asset.headers["content-type"].startswith(("text/javascript", "application/javascript"))
+        assert "immutable" in asset.headers["cache-control"]
+        plain = client.get(f"/static/{hashed}", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers and plain.content == script
+
+        page = client.get("/static/index.html", headers={"Accept-Encoding": "identity"})
+        assert page.headers["cache-control"] == "no-cache"
+        again = client.get("/static/index.html", headers={"Accept-Encoding": "identity", "If-None-Match": page.headers["etag"]})
+        assert again.status_code == 304
+
+def test_plan_responses_return_only_requested_fields():
+    from fastapi import HTTPException
+
+    plan = solve_study_plan({"subjects": [{"name": "Physics", "exam_date": "2025-03-20"}], "daily_hours": 2},
+                           start=datetime.date(2025, 3, 10))
+    result = {"success": True, "study_plan": plan, "formatted_schedule": {"schedule_table": []},
+              "calendar_events": {"status": "success"}, "internal": "not part of the contract"}
+
+    assert set(select_fields(result, PLAN_FIELDS)) == {"success", "study_plan", "formatted_schedule", "calendar_events"}
+    response = contract_response(result, PLAN_FIELDS, "study_plan")
+    assert json.loads(response.body) == {"success": True, "study_plan": json.loads(json.dumps(plan, default=str))}
+    try:
+        select_fields(result, PLAN_FIELDS, "study_plan,internal")
+        assert False, "field outside the contract returned"
+    except HTTPException as e:
+        assert e.status_code == 400
+
+def test_partitions_survive_a_restart_and_keep_their_plan():
+    from partitions import PartitionManager, PartitionStore, PartitionTooLarge
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "partitions.db")
+        manager = PartitionManager(PartitionStore(path), max_resident=10, max_partition_bytes=2000)
+        partition = manager.get("alice")
+        partition.set("current_study_plan", {"sessions": ["Math"] * 40})
+        partition.set("calendar_events", {"message": "x" * 900})
+        manager.save(partition)
+
+        # A fresh manager (a restarted process) sees the saved plan while alice is still resident above
+        restarted = PartitionManager(PartitionStore(path), max_resident=10)
+        assert restarted.get("alice").shared_context["current_study_plan"]["sessions"][0] == "Math"
+
+        # Over the limit: the report goes, the plan stays
+        partition.set("last_report", "y" * 900)
+        manager.save(partition)
+        assert "current_study_plan" in partition.shared_context and "calendar_events" not in partition.shared_context
+
+        # A plan too big to store is rejected and the last saved one survives
+        partition.set("current_study_plan", {"sessions": ["Physics"] * 500})
+        try:
+            manager.save(partition)
+            assert False, "oversize plan saved"
+        except PartitionTooLarge:
+            pass
+        assert manager.get("alice").shared_context["current_study_plan"]["sessions"][0] == "Math"
+
+def test_shared_blackboard_goals_and_cross_process_events():
+    import subprocess
+    import sys
+    from blackboard import StudyGoal
+    from shared_blackboard import SharedBlackboard
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "blackboard.db")
+        board = SharedBlackboard(path)
+        board.add_goal(StudyGoal("Math", "2025-06-01", 0.0, 1, "active"))
+        board.update_study_progress("Math", 0.6)
+        assert [(goal.subject, goal.current_progress) for goal in board.study_goals] == [("Math", 0.6)]
+        assert SharedBlackboard(path).study_goals[0].current_progress == 0.6  # another worker's view
+        try:
+            board.study_goals.append(StudyGoal("Art", "", 0.0, 1, "active"))
+            assert False, "append to a snapshot was silently dropped"
+        except AttributeError:
+            pass
+
+        inbox = board.subscribe("probe", "worker_*", max_queue=10)
+        board.post_event("worker_local", {}, "test")
+        assert [event["type"] for event in inbox.drain()] == ["worker_local"]
+        before = board.version
+
+        # Events posted by another process reach local queued subscribers on sync, once
+        script = (
+            "import sys; sys.path.insert(0, sys.argv[1]); from shared_blackboard import SharedBlackboard; "
+            "board = SharedBlackboard(sys.argv[2]); "
+            "board.post_events([('worker_other', {'n': 1}), ('worker_other', {'n': 2})], 'other')"
+        )
+        env = dict(os.environ, PARTITION_DB_PATH=os.path.join(directory, "partitions.db"))
+        subprocess.run([sys.executable, "-c", script, os.path.dirname(os.path.abspath(__file__)), path],
+                       check=True, env=env, cwd=directory)
+        assert board.wait_for_change(before, timeout=1.0) != before
+        assert [id_ for id_, _ in board.events.foreign_since(0)] == [2, 3]
+        assert board.sync_events() == 2 and board.sync_events() == 0
+        assert [event["data"]["n"] for event in inbox.drain()] == [1, 2]
+        assert len(board.query_events(event_type="worker_other")["events"]) == 2
+
+def test_leader_election_fails_over_to_a_standby():
+    with tempfile.TemporaryDirectory() as directory:
+        lock_path = os.path.join(directory, "agents.lock")
+        calls = []
+        second_elected = threading.Event()
+        first = LeaderElector(lambda: calls.append("first elected"), lambda: calls.append("first demoted"),
+                              lock_path=lock_path, retry_interval=0.02)
+        second = LeaderElector(lambda: (calls.append("second elected"), second_elected.set()),
+                               lock_path=lock_path, retry_interval=0.02)
+
+        # One leader; the other keeps retrying in its standby thread without being elected
+        assert first.start() and not second.start()
+        assert not second_elected.wait(0.1)
+        assert first.is_leader and not second.is_leader
+        with open(lock_path) as f:
+            assert f.read() == str(os.getpid())
+
+        # When the leader leaves, the standby takes over within its retry interval
+        first.stop()
+        assert second_elected.wait(2.0)
+        assert second.is_leader and not first.is_leader
+        assert calls == ["first elected", "first demoted", "second elected"]
+        second.stop()
+        assert not second.is_leader
+
+        # Without an explicit path, each deployment's lock sits beside its own blackboard database
+        previous = os.environ.get("BLACKBOARD_DB_PATH")
+        try:
+            os.environ["BLACKBOARD_DB_PATH"] = os.path.join(directory, "one", "blackboard.db")
+            one = LeaderElector(lambda: None).lock_path
+            os.environ["BLACKBOARD_DB_PATH"] = os.path.join(directory, "two", "blackboard.db")
+            two = LeaderElector(lambda: None).lock_path
+        finally:
+            if previous is None:
+                os.environ.pop("BLACKBOARD_DB_PATH")
+            else:
+                os.environ["BLACKBOARD_DB_PATH"] = previous
+        assert one == os.path.join(directory, "one", "blackboard.db.agents.lock") and one != two
+
+def test_external_mode_keeps_agent_loops_out_of_request_workers():
+    from agent import AgenticOrchestrator
+    orchestrator = AgenticOrchestrator(mode="external")
+    assert orchestrator.leader is None and not orchestrator.runs_autonomous_loops()
+    assert not any(agent.is_running for agent in orchestrator._autonomous_agents())
+    orchestrator.shutdown()
+
+def test_event_bus_fans_out_and_bounds_each_queue():
+    bus = EventBus()
+    exact = bus.subscribe("exact", "deadline_approaching", max_queue=2)
+    wildcard = bus.subscribe("wildcard", ["deadline_*", "goal_*"], max_queue=2, drop_newest=True)
+    seen = []
+    bus.subscribe("inline", "*", handler=seen.append)
+    bus.subscribe("broken", "deadline_*", handler=lambda event: 1 / 0)
+
+    for n in range(3):
+        assert bus.publish({"type": "deadline_approaching", "n": n}) == 4
+    assert bus.publish({"type": "goal_added", "n": 3}) == 2
+    assert bus.publish({"type": "unrelated", "n": 4}) == 1
+
+    # A full queue drops its oldest event (or the newest one, if asked), counting each drop
+    assert [event["n"] for event in exact.drain()] == [1, 2]
+    assert exact.stats()["dropped"] == 1
+    assert [event["n"] for event in wildcard.drain()] == [0, 1]
+    assert wildcard.dropped == 2
+    # A failing handler does not stop delivery to the others
+    assert [event["n"] for event in seen] == [0, 1, 2, 3, 4]
+
+    # Routes are cached per topic and rebuilt when subscriptions change
+    assert bus.stats()["topics_routed"] == 3
+    late = bus.subscribe("late", "goal_*")
+    bus.publish({"type": "goal_added", "n": 5}, inline=False)
+    assert [event["n"] for event in late.drain()] == [5]
+    assert len(seen) == 5  # inline=False skips handlers
+    bus.unsubscribe("late")
+    bus.publish({"type": "goal_added", "n": 6})
+    assert late.pending() == 0 and bus.published == 7
+
+def test_event_log_pages_time_ranges_like_a_scan():
+    rng = random.Random(3)
+    log = EventLog(max_events=400)
+    timestamp = 1000.0
+    for n in range(500):
+        timestamp += rng.choice([0.0, 0.5, 1.0])
+        log.append({"type": rng.choice(["a", "b", "c"]), "source": rng.choice(["x", "y"]),
+                    "timestamp": timestamp, "n": n})
+
+    # Trimming drops the oldest tenth at a time but keeps sequence ids stable
+    assert len(log) == 380 and log[0]["id"] == 120 and log[-1]["id"] == 499
+
+    def scan(since, until, event_type, source):
+        return [event["id"] for event in log
+                if (since is None or event["timestamp"] >= since)
+                and (until is None or event["timestamp"] < until)
+                and event_type in (None, event["type"]) and source in (None, event["source"])]
+
+    def paged(since, until, event_type, source, limit):
+        ids, cursor = [], None
+        while True:
+            page = log.query(since, until, event_type, source, cursor, limit)
+            assert len(page["events"]) <= limit
+            ids += [event["id"] for event in page["events"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return ids
+
+    for _ in range(50):
+        since = rng.choice([None, rng.uniform(1000, 1300)])
+        until = rng.choice([None, rng.uniform(1000, 1300)])
+        event_type = rng.choice([None, "a", "b"])
+        source = rng.choice([None, "y"])
+        assert paged(since, until, event_type, source, rng.choice([1, 7, 100])) == scan(since, until, event_type, source)
+
+    # A cursor from before the trim starts at the oldest kept event
+    assert log.query(cursor=0, limit=1)["events"][0]["id"] == 120
+
+    # Out-of-order timestamps are clamped, so they still sort into range queries
+    log.append({"type": "late", "source": "x", "timestamp": 0.0})
+    assert log.query(since=timestamp, event_type="late")["events"][0]["timestamp"] == 0.0
+
+def test_plan_study_keeps_tasks_on_the_shared_blackboard():
+    import agent
+    from shared_blackboard import SharedBlackboard
+
+    start = datetime.datetime(2025, 3, 10, 8, 0).timestamp()
+    previous_clock = clock.set_clock(clock.VirtualClock(start=start))
+    with tempfile.TemporaryDirectory() as directory:
+        board = SharedBlackboard(os.path.join(directory, "blackboard.db"))
+        previous_board, agent.blackboard = agent.blackboard, board
+        try:
+            orchestrator = agent.AgenticOrchestrator(mode="off")
+            result = orchestrator.plan_study({
+                "subjects": [{"name": "Math", "difficulty": "Hard", "exam_date": "2025-03-14"}],
+                "daily_hours": 2
+            }, user_id="planner")
+            assert result["success"], result
+
+            # Every write lands in the one stored copy, tasks included
+            stored = SharedBlackboard(os.path.join(directory, "blackboard.db")).get_partition("planner")
+            assert {"current_study_plan", "calendar_events", "calendar_sync", "current_tasks"} <= set(stored.shared_context)
+            assert stored.shared_context["current_tasks"]
+            assert [goal.subject for goal in stored.study_goals] == ["Math"]
+
+            revised = board.replan_study_plan("planner", {"type": "daily_hours", "daily_hours": 1})
+            assert revised["status"] == "success", revised
+            assert board.get_partition("planner").shared_context["current_tasks"]
+        finally:
+            agent.blackboard = previous_board
+            clock.set_clock(previous_clock)
+
+def test_shared_blackboard_updates_from_two_workers_are_not_lost():
+    from blackboard import AgentStatus, StudyGoal
+    from shared_blackboard import SharedBlackboard
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "blackboard.db")
+        first, second = SharedBlackboard(path), SharedBlackboard(path)
+        first.register_agent("coach")
+        first.add_goal(StudyGoal("Math", "2025-06-01", 0.0, 1, "active"))
+
+        # Each worker updates different fields of the same rows at once; every field keeps its last write
+        def statuses():
+            for n in range(100):
+                first.update_agent_status("coach", AgentStatus.WORKING, f"goal {n}")
+                first.update_goal("Math", status=f"pass {n}")
+
+        def scores():
+            for n in range(100):
+                second.update_agent_performance("coach", n / 100)
+                second.update_goal("Math", current_progress=n / 100)
+
+        workers = [threading.Thread(target=statuses), threading.Thread(target=scores)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        state, goal = first.agents["coach"], first.study_goals[0]
+        assert (state.status, state.current_goal, state.performance_score) == (AgentStatus.WORKING, "goal 99", 0.99)
+        assert (goal.status, goal.current_progress) == ("pass 99", 0.99)
+
+        # Two copies of one partition saving different keys keep both
+        first.save_partition(first.get_partition("alice"))
+        mine, theirs = first.get_partition("alice"), second.get_partition("alice")
+        mine.set("current_tasks", ["read"])
+        theirs.set("calendar_sync", {"read": "event-1"})
+        theirs.study_goals = [StudyGoal("Art", "", 0.0, 1, "active")]
+        first.save_partition(mine)
+        second.save_partition(theirs)
+        stored = SharedBlackboard(path).get_partition("alice")
+        assert stored.shared_context == {"current_tasks": ["read"], "calendar_sync": {"read": "event-1"}}
+        assert [goal.subject for goal in stored.study_goals] == ["Art"]
+        assert theirs.shared_context == stored.shared_context
+
+        # A removed key stays removed, and the other worker's keys stay
+        del mine.shared_context["current_tasks"]
+        first.save_partition(mine)
+        assert SharedBlackboard(path).get_partition("alice").shared_context == {"calendar_sync": {"read": "event-1"}}
+
+def test_progress_analyzer_flags_each_drop_below_threshold_once():
+    from autonomous_agents import AutonomousProgressAnalyzer
+    analyzer = AutonomousProgressAnalyzer("FlagProbe", None, "", [])
+
+    def flags():
+        events = blackboard.query_events(event_type="low_productivity_detected", source="FlagProbe", limit=1000)["events"]
+        return [event["data"]["user_id"] for event in events]
+
+    blackboard.record_progress("flag-a", "Math", 0.1)
+    blackboard.record_progress("flag-b", "Math", 0.2)
+    analyzer._take_autonomous_action({})
+    analyzer._take_autonomous_action({})
+    assert sorted(flags()) == ["flag-a", "flag-b"]
+
+    # Recovering clears the flag, so a later drop is reported again
+    blackboard.record_progress("flag-a", "Math", 0.9)
+    assert analyzer._take_autonomous_action({})["students_newly_flagged"] == 0
+    blackboard.record_progress("flag-a", "Math", 0.1)
+    analyzer._take_autonomous_action({})
+    assert sorted(flags()) == ["flag-a", "flag-a", "flag-b"]
+
+def test_behavior_coach_answers_events_only_for_their_students():
+    from autonomous_agents import AutonomousBehaviorCoach
+    coach = AutonomousBehaviorCoach("CoachProbe", None, "", [])
+    blackboard.get_partition("coach-other")  # active, but never flagged
+
+    def next_id():
+        return blackboard.events[-1]["id"] + 1 if len(blackboard.events) else 0
+
+    def messaged(cursor):
+        events = blackboard.query_events(event_type="motivation_provided", source="CoachProbe", cursor=cursor, limit=1000)["events"]
+        return [event["data"]["user_id"] for event in events]
+
+    blackboard.shared_context["last_motivation"] = clock.now()
+    cursor = next_id()
+    triggered = [{"type": "low_productivity_detected", "data": {"user_id": "coach-flagged"}},
+                 {"type": "low_progress_detected", "data": {"user_id": "coach-flagged", "subject": "Math"}},
+                 {"type": "low_progress_detected", "data": {"subject": "Math"}}]
+    result = coach._take_autonomous_action({"triggered_events": triggered})
+    assert messaged(cursor) == ["coach-flagged"] and list(result["interventions"]) == ["coach-flagged"]
+
+    # The daily pass still reaches every active student
+    blackboard.shared_context["last_motivation"] = clock.now() - 86401
+    cursor = next_id()
+    coach._take_autonomous_action({})
+    assert "coach-other" in messaged(cursor)
+    assert len(messaged(cursor)) == len(blackboard.active_partitions())
+
+def test_simulated_week_runs_in_seconds():
+    report = run_simulation(students=20, days=7, seed=1)
+    assert report["cycle_errors"] == 0
+    assert report["cycles_run"] > 100
+    assert report["events_by_type"].get("motivation_provided", 0) > 0
+    # Flagged on crossing the threshold, not on every hourly scan (other tests' students count too)
+    assert report["events_by_type"].get("low_productivity_detected", 0) < 2 * report["students"]
+    # One daily message per student, plus replies to the students who were flagged
+    assert report["events_by_type"]["motivation_provided"] < 3 * report["students"] * report["simulated_days"]
+    assert report["wall_seconds"] < 30
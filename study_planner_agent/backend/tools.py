@@ -1,7 +1,8 @@
 import datetime
 from typing import Dict, Any
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
+
+from calendar_client import calendar_clients
+from datetime_parsing import parse_date
 
 
 def store_data(data: Dict[str, Any]) -> Dict[str, str]:
@@ -68,7 +69,9 @@ def check_upcoming_deadlines(data: Dict[str, Any]) -> Dict[str, Any]:
         if not due_date_str:
             continue
 
-        due_date = datetime.datetime.strptime(due_date_str, "%Y-%m-%d").date()
+        due_date = parse_date(due_date_str, "due_date")
+        if due_date is None:
+            continue
         days_left = (due_date - today).days
 
         if days_left <= 3:
@@ -126,29 +129,15 @@ def log_agent_action(data: Dict[str, Any]) -> Dict[str, str]:
 
 def create_calendar_event(data: dict):
     """
-    Creates a Google Calendar event.
+    Creates a Google Calendar event through the user's cached Calendar service.
     """
-    creds = Credentials(
-        token=data["access_token"],
-        refresh_token=data["refresh_token"],
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=data["client_id"],
-        client_secret=data["client_secret"],
-        scopes=["https://www.googleapis.com/auth/calendar"]
-    )
-
-    service = build("calendar", "v3", credentials=creds)
-
     event = {
         "summary": data["title"],
         "start": {"dateTime": data["start_time"]},
         "end": {"dateTime": data["end_time"]}
     }
 
-    created_event = service.events().insert(
-        calendarId="primary",
-        body=event
-    ).execute()
+    created_event = calendar_clients.get(data["user_id"], data).insert_event(data, body=event)
 
     return {
         "event_id": created_event["id"],
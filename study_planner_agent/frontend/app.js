@@ -289,11 +289,14 @@ function showMainApp() {
     // Initialize main app event listeners
     initializeMainAppListeners();
     
-    // Load initial data
-    refreshSystemStatus();
+    // Load initial data and follow system status as it changes
+    statusStreamFailures = 0;
+    startStatusStream();
 }
 
 function logout() {
+    stopStatusStream();
+    
     // Clear session data
     clearSessionData();
     currentUser = null;
@@ -457,18 +460,9 @@ function displayStudyPlan(data) {
         // Handle new enhanced response format
         if (data.formatted_schedule && data.formatted_schedule.schedule_table) {
             html = formatScheduleTable(data.formatted_schedule.schedule_table);
-        } else if (data.plan) {
+        } else if (data.study_plan) {
             try {
-                const planText = typeof data.plan === 'string' ? data.plan : JSON.stringify(data.plan);
-                
-                // Try to parse as JSON first
-                let planData;
-                try {
-                    planData = JSON.parse(planText);
-                } catch (e) {
-                    // If not JSON, treat as plain text
-                    planData = planText;
-                }
+                const planData = data.study_plan;
                 
                 // Check if it's the new complex JSON structure with daily_study_plan
                 if (typeof planData === 'object' && planData.daily_study_plan) {
@@ -484,7 +478,7 @@ function displayStudyPlan(data) {
                     html = `<div class="plan-text">${planData}</div>`;
                 }
             } catch (e) {
-                html = `<div class="plan-text">${data.plan}</div>`;
+                html = `<div class="plan-text">${JSON.stringify(data.study_plan)}</div>`;
             }
         } else {
             html = `<div class="plan-text">Study plan generated successfully! Check the response for details.</div>`;
@@ -508,8 +502,8 @@ function displayStudyPlan(data) {
             `;
         }
         
-    } else if (data.plan) {
-        html = `<div class="plan-text">${data.plan}</div>`;
+    } else if (data.error) {
+        html = `<div class="plan-text">${data.error}</div>`;
     } else {
         html = `<div class="plan-text">Study plan generated successfully! Check the response for details.</div>`;
     }
@@ -1431,6 +1425,114 @@ async function refreshSystemStatus() {
     }
 }
 
+// Push updates: a snapshot, then only the agents and events that changed.
+// Falls back to polling when the stream cannot be opened.
+let statusStream = null;
+let statusPoll = null;
+let statusStreamFailures = 0;
+const STATUS_POLL_MS = 30000;
+const STATUS_STREAM_MAX_FAILURES = 3;
+
+async function statusStreamUrl() {
+    if (!currentUser || !currentUser.idToken) {
+        return `${BASE_URL}/system-status/stream`;  // development backend: no auth
+    }
+    // Trade the ID token for a short-lived ticket, so the token never appears in a URL
+    const response = await fetch(`${BASE_URL}/system-status/stream-ticket`, {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${currentUser.idToken}` }
+    });
+    if (!response.ok) {
+        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+    const data = await response.json();
+    return `${BASE_URL}/system-status/stream?ticket=${encodeURIComponent(data.ticket)}`;
+}
+
+async function startStatusStream() {
+    stopStatusStream();
+    if (!window.EventSource) {
+        startStatusPolling();
+        return;
+    }
+    
+    let url;
+    try {
+        url = await statusStreamUrl();
+    } catch (error) {
+        console.error('System status stream ticket error:', error);
+        startStatusPolling();
+        return;
+    }
+    if (!currentUser) return;  // logged out while waiting for the ticket
+    
+    const stream = statusStream = new EventSource(url);
+    stream.addEventListener('snapshot', (e) => {
+        const snapshot = JSON.parse(e.data);
+        statusStreamFailures = 0;
+        sessionData.systemStatus = {
+            success: true,
+            autonomous_agents: snapshot.agents,
+            recent_events: snapshot.events
+        };
+        renderSystemStatus();
+    });
+    stream.addEventListener('delta', (e) => {
+        const delta = JSON.parse(e.data);
+        const status = sessionData.systemStatus;
+        if (!status) return;
+        Object.assign(status.autonomous_agents, delta.agents);
+        status.recent_events = status.recent_events.concat(delta.events).slice(-5);
+        renderSystemStatus();
+    });
+    stream.onerror = () => {
+        if (stream !== statusStream) return;
+        statusStreamFailures += 1;
+        if (statusStreamFailures >= STATUS_STREAM_MAX_FAILURES) {
+            console.error('System status stream unavailable, falling back to polling');
+            startStatusPolling();
+        } else if (stream.readyState === EventSource.CLOSED) {
+            // Rejected (e.g. an expired ticket): open it again with a fresh one
+            setTimeout(() => {
+                if (stream === statusStream) startStatusStream();
+            }, 2000);
+        }
+        // Otherwise EventSource reconnects by itself and gets a fresh snapshot
+    };
+}
+
+function startStatusPolling() {
+    if (statusStream) {
+        statusStream.close();
+        statusStream = null;
+    }
+    refreshSystemStatus();
+    if (!statusPoll) {
+        statusPoll = setInterval(() => {
+            if (currentUser && !document.getElementById('mainApp').classList.contains('hidden')) {
+                refreshSystemStatus();
+            }
+        }, STATUS_POLL_MS);
+    }
+}
+
+function stopStatusStream() {
+    if (statusStream) {
+        statusStream.close();
+        statusStream = null;
+    }
+    if (statusPoll) {
+        clearInterval(statusPoll);
+        statusPoll = null;
+    }
+}
+
+function renderSystemStatus() {
+    const data = sessionData.systemStatus;
+    displaySystemStatus(data);
+    updateAgentCount(Object.keys(data.autonomous_agents || {}).length);
+}
+
 function displaySystemStatus(data) {
     const statusContainer = document.getElementById('systemStatus');
     if (!statusContainer) return;
@@ -1500,8 +1602,10 @@ async function triggerDemo() {
         
         showNotification('Autonomous behavior triggered! Check system status.', 'success');
         
-        // Refresh status after a delay
-        setTimeout(refreshSystemStatus, 2000);
+        // The status stream shows the agents reacting; when polling, refresh after a delay
+        if (!statusStream) {
+            setTimeout(refreshSystemStatus, 2000);
+        }
         
     } catch (error) {
         console.error('Demo trigger error:', error);
@@ -1528,13 +1632,6 @@ function showNotification(message, type = 'info') {
     }, 5000);
 }
 
-// Auto-refresh system status every 30 seconds
-setInterval(() => {
-    if (currentUser && !document.getElementById('mainApp').classList.contains('hidden')) {
-        refreshSystemStatus();
-    }
-}, 30000);
-
 // Helper function to format chat responses
 function formatChatResponse(responseObj) {
     if (typeof responseObj === 'string') {
@@ -118,7 +118,7 @@ function loadDemoData() {
     setTimeout(() => {
         displayStudyPlan({
             success: true,
-            plan: JSON.stringify(DEMO_STUDY_PLAN)
+            study_plan: DEMO_STUDY_PLAN
         });
     }, 1000);
     